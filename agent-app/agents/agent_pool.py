@@ -0,0 +1,149 @@
+from functools import lru_cache
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from uuid import uuid4
+
+from phi.agent import Agent, RunResponse
+
+from agents.registry import AgentRegistry
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI as AsyncOpenAIClient
+    from openai import OpenAI as OpenAIClient
+
+
+@lru_cache
+def get_openai_client() -> "OpenAIClient":
+    """Return the process-wide OpenAI client.
+
+    `OpenAIChat` builds a new client, and with it a new HTTP connection pool, on every request
+    unless one is passed in. Sharing this client keeps connections warm across agents and runs.
+    """
+    # Imported on first use, the openai package takes a while to import
+    from openai import OpenAI as OpenAIClient
+
+    return OpenAIClient()
+
+
+@lru_cache
+def get_async_openai_client() -> "AsyncOpenAIClient":
+    """Return the process-wide async OpenAI client, used by agents run with `arun`."""
+    from openai import AsyncOpenAI as AsyncOpenAIClient
+
+    return AsyncOpenAIClient()
+
+
+def copy_agent(template: Agent, session_id: Optional[str] = None, user_id: Optional[str] = None) -> Agent:
+    """Return a cheap per-run copy of a template agent.
+
+    The copy shares the template's configuration, toolkits and model client, while the model
+    state, memory, session and run state are fresh so concurrent runs never see each other's
+    messages. Templates themselves should never be run.
+
+    Args:
+        template (Agent): The agent to copy.
+        session_id (Optional[str]): Session to continue, its history is loaded from storage on the first run.
+            A new session is started if None.
+        user_id (Optional[str]): User the session belongs to, defaults to the template's.
+    """
+    model = None
+    if template.model is not None:
+        model = template.model.model_copy(
+            update={
+                "metrics": {},
+                "tools": None,
+                "functions": None,
+                "function_call_stack": None,
+                "session_id": None,
+            }
+        )
+
+    agent = template.model_copy(
+        update={
+            "model": model,
+            "memory": template.memory.deep_copy(),
+            "session_id": session_id or str(uuid4()),
+            "user_id": user_id or template.user_id,
+            "session_name": None,
+            "session_data": None,
+            "run_id": None,
+            "run_input": None,
+            "run_response": RunResponse(),
+        }
+    )
+    agent._agent_session = None
+    return agent
+
+
+class AgentPool:
+    """Hands out a fresh copy of a template agent for every request.
+
+    A shared agent carries its session id, memory and run state from one request into the
+    next, so concurrent users would see each other's conversations. The pool keeps one template
+    per agent id, built once, and `get_agent` returns a `copy_agent` of it bound to the
+    request's session. Copies share the template's model client, toolkits, storage and
+    knowledge, so each request costs a few object copies rather than new connections.
+    Templates of agents in `registry` are only built when their agent is first requested.
+
+    Args:
+        templates (Optional[List[Agent]]): One agent per agent id. Templates are never run.
+        registry (Optional[AgentRegistry]): Builds the templates of the other agents on first use.
+        template_kwargs (Optional[Dict[str, Any]]): Passed to the registry's factories, for example `debug_mode`.
+    """
+
+    def __init__(
+        self,
+        templates: Optional[List[Agent]] = None,
+        registry: Optional[AgentRegistry] = None,
+        template_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        self.templates: Dict[str, Agent] = {}
+        self.registry = registry
+        self.template_kwargs = template_kwargs or {}
+        self._lock = Lock()
+        for template in templates or []:
+            self._add_template(template)
+
+    @property
+    def agent_ids(self) -> List[str]:
+        agent_ids = list(self.templates)
+        if self.registry is not None:
+            agent_ids += [agent_id for agent_id in self.registry.agent_ids if agent_id not in self.templates]
+        return agent_ids
+
+    def get_template(self, agent_id: str) -> Optional[Agent]:
+        """Return the template of `agent_id`, building it on first use, or None if there is no agent with this id."""
+
+        template = self.templates.get(agent_id)
+        if template is not None or self.registry is None:
+            return template
+        with self._lock:
+            # Another request may have built it while this one waited
+            if agent_id not in self.templates:
+                template = self.registry.create_agent(agent_id, **self.template_kwargs)
+                if template is None:
+                    return None
+                self._add_template(template)
+            return self.templates.get(agent_id)
+
+    def get_templates(self) -> List[Agent]:
+        """Return the template of every agent, building the ones that were not requested yet."""
+
+        return [
+            template for agent_id in self.agent_ids if (template := self.get_template(agent_id)) is not None
+        ]
+
+    def get_agent(
+        self, agent_id: str, session_id: Optional[str] = None, user_id: Optional[str] = None
+    ) -> Optional[Agent]:
+        """Return a new agent bound to `session_id`, or None if there is no agent with this id."""
+
+        template = self.get_template(agent_id)
+        if template is None:
+            return None
+        return copy_agent(template, session_id=session_id, user_id=user_id)
+
+    def _add_template(self, template: Agent) -> None:
+        if template.agent_id is None:
+            raise ValueError(f"Agent {template.name} needs an agent_id to be pooled")
+        self.templates[template.agent_id] = template
@@ -0,0 +1,446 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from threading import Event, Lock, Thread
+from typing import Callable, Dict, List, Optional, cast
+from uuid import uuid4
+
+from phi.agent import Agent, RunResponse
+from phi.utils.log import logger
+from sqlalchemy import CursorResult, func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from agents.settings import agent_settings
+from db.tables import BatchItem, BatchJob
+
+
+def get_provider(agent: Agent) -> str:
+    """Return the model provider of the agent, like `OpenAI`, which rate limits are keyed by."""
+
+    if agent.model is None or not agent.model.provider:
+        return ""
+    # phi's OpenAIChat reports "OpenAI gpt-4o"
+    return agent.model.provider.split(" ")[0]
+
+
+class ProviderRateLimiter:
+    """Spaces out agent runs so each provider gets at most its limit of runs per minute.
+
+    A run makes one model call, plus one more per round of tool calls, so the model calls per
+    minute can be a few times the limit. Runs on providers without a limit start right away.
+
+    Args:
+        limits (Dict[str, float]): Runs started per minute, by provider.
+    """
+
+    def __init__(self, limits: Dict[str, float]):
+        self.intervals = {provider: 60 / limit for provider, limit in limits.items() if limit > 0}
+        self._next_run_at: Dict[str, float] = {}
+        self._lock = Lock()
+
+    def acquire(self, provider: str) -> None:
+        """Wait until a run on `provider` may start."""
+
+        interval = self.intervals.get(provider)
+        if interval is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_run_at.get(provider, now))
+            self._next_run_at[provider] = start_at + interval
+        time.sleep(start_at - now)
+
+
+@dataclass
+class BatchJobStatus:
+    job_id: str
+    agent_id: str
+    user_id: Optional[str]
+    status: str
+    total_items: int
+    completed_items: int
+    failed_items: int
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+@dataclass
+class BatchItemResult:
+    item_id: str
+    position: int
+    input: str
+    status: str
+    output: Optional[str] = None
+    error: Optional[str] = None
+    session_id: Optional[str] = None
+    attempts: int = 0
+    finished_at: Optional[datetime] = None
+
+
+@dataclass
+class BatchItemPage:
+    items: List[BatchItemResult] = field(default_factory=list)
+    offset: int = 0
+    has_more: bool = False
+
+
+@dataclass
+class _ClaimedItem:
+    item_id: str
+    job_id: str
+    agent_id: str
+    user_id: Optional[str]
+    input: str
+    attempts: int
+
+
+class BatchRunner:
+    """Runs the items of batch jobs stored in Postgres on a bounded pool of workers.
+
+    `submit` stores a job and its items and returns right away. A dispatcher thread claims
+    queued items as workers become free and runs each on its own agent from `get_agent`, after
+    waiting for the run limit of the agent's model provider. Items are claimed with
+    `FOR UPDATE SKIP LOCKED`, so several Api processes can share the queue, and items left
+    running by a process that stopped are queued again after `item_timeout` seconds. Failed
+    items are retried with a growing delay until they have been attempted `max_attempts` times.
+
+    Args:
+        session_factory (Callable[[], Session]): Creates database sessions, for example `SessionLocal`.
+        get_agent (Callable[[str, Optional[str]], Optional[Agent]]): Returns a new agent for an
+            agent id and user id, or None if there is no such agent.
+        max_workers (Optional[int]): Items run at the same time.
+        runs_per_minute (Optional[Dict[str, float]]): Agent runs started per minute, by provider.
+        poll_interval (Optional[float]): Seconds between checks for items submitted by other processes.
+        max_attempts (Optional[int]): Attempts per item before it fails.
+        item_timeout (Optional[float]): Seconds after which a running item is run again, or fails
+            if it has been attempted `max_attempts` times.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        get_agent: Callable[[str, Optional[str]], Optional[Agent]],
+        max_workers: Optional[int] = None,
+        runs_per_minute: Optional[Dict[str, float]] = None,
+        poll_interval: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        item_timeout: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self.get_agent = get_agent
+        self.max_workers = max_workers or agent_settings.batch_workers
+        self.rate_limiter = ProviderRateLimiter(
+            agent_settings.batch_runs_per_minute if runs_per_minute is None else runs_per_minute
+        )
+        self.poll_interval = poll_interval or agent_settings.batch_poll_interval
+        self.max_attempts = max_attempts or agent_settings.batch_max_attempts
+        self.item_timeout = item_timeout or agent_settings.batch_item_timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="batch")
+        self._running = 0
+        self._lock = Lock()
+        self._wake = Event()
+        self._stopped = Event()
+        self._dispatcher: Optional[Thread] = None
+
+    def start(self) -> None:
+        """Start the dispatcher thread, if it is not running yet."""
+
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = Thread(target=self._dispatch, name="batch-dispatcher", daemon=True)
+                self._dispatcher.start()
+
+    def stop(self) -> None:
+        """Stop claiming items and wait for the running ones to finish."""
+
+        self._stopped.set()
+        self._wake.set()
+        if self._dispatcher is not None:
+            self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def submit(self, agent_id: str, inputs: List[str], user_id: Optional[str] = None) -> BatchJobStatus:
+        """Store a job that runs `agent_id` on each of `inputs`, and queue its items.
+
+        Args:
+            agent_id (str): The agent that answers the inputs.
+            inputs (List[str]): One message per item, answered independently.
+            user_id (Optional[str]): User the job and the items' sessions belong to.
+        """
+        now = datetime.now(timezone.utc)
+        job = BatchJobStatus(
+            job_id=str(uuid4()),
+            agent_id=agent_id,
+            user_id=user_id,
+            status="queued",
+            total_items=len(inputs),
+            completed_items=0,
+            failed_items=0,
+            created_at=now,
+        )
+        with self.session_factory() as session, session.begin():
+            session.execute(
+                insert(BatchJob).values(
+                    id=job.job_id,
+                    agent_id=agent_id,
+                    user_id=user_id,
+                    status=job.status,
+                    total_items=job.total_items,
+                    completed_items=0,
+                    failed_items=0,
+                    created_at=now,
+                )
+            )
+            session.execute(
+                insert(BatchItem),
+                [
+                    {
+                        "id": str(uuid4()),
+                        "job_id": job.job_id,
+                        "position": position,
+                        "input": message,
+                        "status": "queued",
+                        "attempts": 0,
+                        "available_at": now,
+                    }
+                    for position, message in enumerate(inputs)
+                ],
+            )
+        self.start()
+        self._wake.set()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[BatchJobStatus]:
+        with self.session_factory() as session:
+            job = session.get(BatchJob, job_id)
+            if job is None:
+                return None
+            return BatchJobStatus(
+                job_id=job.id,
+                agent_id=job.agent_id,
+                user_id=job.user_id,
+                status=job.status,
+                total_items=job.total_items,
+                completed_items=job.completed_items,
+                failed_items=job.failed_items,
+                created_at=job.created_at,
+                finished_at=job.finished_at,
+            )
+
+    def list_items(
+        self, job_id: str, status: Optional[str] = None, limit: int = 100, offset: int = 0
+    ) -> BatchItemPage:
+        """Return one page of the items of a job, in the order they were submitted.
+
+        Args:
+            job_id (str): The job to list the items of.
+            status (Optional[str]): Only list items with this status.
+            limit (int): Items per page.
+            offset (int): Number of items to skip.
+        """
+        stmt = select(BatchItem).where(BatchItem.job_id == job_id)
+        if status is not None:
+            stmt = stmt.where(BatchItem.status == status)
+        # One extra row tells whether there is a next page
+        stmt = stmt.order_by(BatchItem.position).limit(limit + 1).offset(offset)
+        with self.session_factory() as session:
+            items = session.scalars(stmt).all()
+            return BatchItemPage(
+                items=[
+                    BatchItemResult(
+                        item_id=item.id,
+                        position=item.position,
+                        input=item.input,
+                        status=item.status,
+                        output=item.output,
+                        error=item.error,
+                        session_id=item.session_id,
+                        attempts=item.attempts,
+                        finished_at=item.finished_at,
+                    )
+                    for item in items[:limit]
+                ],
+                offset=offset,
+                has_more=len(items) > limit,
+            )
+
+    def _dispatch(self) -> None:
+        while not self._stopped.is_set():
+            # Even when every worker is busy, workers stuck past item_timeout keep their slots
+            self._requeue_stale()
+            with self._lock:
+                free_workers = self.max_workers - self._running
+            claimed = self._claim(free_workers) if free_workers > 0 else []
+            for item in claimed:
+                with self._lock:
+                    self._running += 1
+                self._executor.submit(self._run_item, item)
+            # Woken early by new submissions and by workers finishing
+            self._wake.wait(timeout=self.poll_interval)
+            self._wake.clear()
+
+    def _requeue_stale(self) -> None:
+        now = datetime.now(timezone.utc)
+        try:
+            with self.session_factory() as session, session.begin():
+                # Items of a process that stopped while running them, or whose run took longer than
+                # item_timeout. Those out of attempts fail, so a run that always takes too long is
+                # not started again forever
+                stale = (
+                    BatchItem.status == "running",
+                    BatchItem.started_at < now - timedelta(seconds=self.item_timeout),
+                )
+                timed_out = session.execute(
+                    update(BatchItem)
+                    .where(*stale, BatchItem.attempts >= self.max_attempts)
+                    .values(
+                        status="failed",
+                        error=f"Did not finish within {self.item_timeout:g}s in {self.max_attempts} attempts",
+                        finished_at=now,
+                    )
+                    .returning(BatchItem.job_id)
+                ).all()
+                for job_id, count in Counter(row.job_id for row in timed_out).items():
+                    self._count_finished_items(session, job_id, succeeded=False, count=count, now=now)
+                session.execute(
+                    update(BatchItem)
+                    .where(*stale, BatchItem.attempts < self.max_attempts)
+                    .values(status="queued", available_at=now)
+                )
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not requeue stale batch items: {e}")
+
+    def _claim(self, limit: int) -> List[_ClaimedItem]:
+        now = datetime.now(timezone.utc)
+        try:
+            with self.session_factory() as session, session.begin():
+                claimable = (
+                    select(BatchItem.id)
+                    .where(BatchItem.status == "queued", BatchItem.available_at <= now)
+                    .order_by(BatchItem.available_at, BatchItem.position)
+                    .limit(limit)
+                    .with_for_update(skip_locked=True)
+                )
+                rows = session.execute(
+                    update(BatchItem)
+                    .where(BatchItem.id.in_(claimable.scalar_subquery()))
+                    .values(status="running", started_at=now, attempts=BatchItem.attempts + 1)
+                    .returning(BatchItem.id, BatchItem.job_id, BatchItem.input, BatchItem.attempts)
+                ).all()
+                if not rows:
+                    return []
+                job_ids = {row.job_id for row in rows}
+                session.execute(
+                    update(BatchJob)
+                    .where(BatchJob.id.in_(job_ids), BatchJob.status == "queued")
+                    .values(status="running")
+                )
+                jobs = {
+                    job.id: job
+                    for job in session.execute(
+                        select(BatchJob.id, BatchJob.agent_id, BatchJob.user_id).where(
+                            BatchJob.id.in_(job_ids)
+                        )
+                    )
+                }
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not claim batch items: {e}")
+            return []
+        return [
+            _ClaimedItem(
+                item_id=row.id,
+                job_id=row.job_id,
+                agent_id=jobs[row.job_id].agent_id,
+                user_id=jobs[row.job_id].user_id,
+                input=row.input,
+                attempts=row.attempts,
+            )
+            for row in rows
+        ]
+
+    def _run_item(self, item: _ClaimedItem) -> None:
+        try:
+            agent = self.get_agent(item.agent_id, item.user_id)
+            if agent is None:
+                self._finish_item(item, error=f"Agent {item.agent_id} not found", retry=False)
+                return
+            self.rate_limiter.acquire(get_provider(agent))
+            response = agent.run(item.input, stream=False)
+            content = response.content if isinstance(response, RunResponse) else None
+            output = content if isinstance(content, str) else str(content)
+            self._finish_item(item, output=output, session_id=agent.session_id)
+        except Exception as e:
+            logger.warning(f"Batch item {item.item_id} failed on attempt {item.attempts}: {e}")
+            self._finish_item(item, error=str(e), retry=item.attempts < self.max_attempts)
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._wake.set()
+
+    def _finish_item(
+        self,
+        item: _ClaimedItem,
+        output: Optional[str] = None,
+        error: Optional[str] = None,
+        session_id: Optional[str] = None,
+        retry: bool = False,
+    ) -> None:
+        now = datetime.now(timezone.utc)
+        # Only the worker of the item's latest attempt may finish it, an older attempt that ran
+        # past item_timeout was handed to another worker and must not count the item again
+        owned_item = update(BatchItem).where(
+            BatchItem.id == item.item_id,
+            BatchItem.status == "running",
+            BatchItem.attempts == item.attempts,
+        )
+        try:
+            with self.session_factory() as session, session.begin():
+                if retry:
+                    # Back off 2, 4, 8... seconds, rate limit errors usually clear up on their own
+                    session.execute(
+                        owned_item.values(
+                            status="queued",
+                            error=error,
+                            available_at=now + timedelta(seconds=2**item.attempts),
+                        )
+                    )
+                    return
+                succeeded = error is None
+                result = session.execute(
+                    owned_item.values(
+                        status="completed" if succeeded else "failed",
+                        output=output,
+                        error=error,
+                        session_id=session_id,
+                        finished_at=now,
+                    )
+                )
+                if cast(CursorResult, result).rowcount != 1:
+                    logger.warning(
+                        f"Batch item {item.item_id} was run again, dropping attempt {item.attempts}"
+                    )
+                    return
+                self._count_finished_items(session, item.job_id, succeeded=succeeded, count=1, now=now)
+        except SQLAlchemyError as e:
+            # The item stays running and is run again after item_timeout
+            logger.error(f"Could not save the result of batch item {item.item_id}: {e}")
+
+    def _count_finished_items(
+        self, session: Session, job_id: str, succeeded: bool, count: int, now: datetime
+    ) -> None:
+        """Add finished items to the job's counters, and complete the job once every item finished."""
+
+        counter = BatchJob.completed_items if succeeded else BatchJob.failed_items
+        session.execute(update(BatchJob).where(BatchJob.id == job_id).values({counter: counter + count}))
+        session.execute(
+            update(BatchJob)
+            .where(
+                BatchJob.id == job_id,
+                BatchJob.status != "completed",
+                BatchJob.completed_items + BatchJob.failed_items >= BatchJob.total_items,
+            )
+            .values(status="completed", finished_at=func.coalesce(BatchJob.finished_at, now))
+        )
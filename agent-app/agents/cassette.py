@@ -0,0 +1,295 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from hashlib import sha256
+from importlib import import_module
+from importlib.util import find_spec
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Iterator, List, Literal, Optional
+
+from phi.utils.log import logger
+from pydantic import BaseModel
+
+CassetteMode = Literal["record", "replay"]
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when a call was never recorded."""
+
+
+@dataclass
+class Interaction:
+    """One recorded request/response pair.
+
+    `latency` is the time the real call took. For streams `chunk_delays` holds the time before
+    each chunk and `response` the list of chunks.
+    """
+
+    kind: str
+    key: str
+    request: str
+    response: Any
+    latency: float
+    chunk_delays: Optional[List[float]] = None
+
+
+def get_request_key(kind: str, request: Any) -> str:
+    return sha256(json.dumps([kind, request], sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def dump_value(value: Any) -> Any:
+    """Serialize a response, keeping the class of pydantic models so they can be rebuilt on replay."""
+
+    if isinstance(value, BaseModel):
+        model_class = type(value).__pydantic_generic_metadata__["origin"] or type(value)
+        return {
+            "__model__": f"{model_class.__module__}:{model_class.__qualname__}",
+            "data": value.model_dump(mode="json"),
+        }
+    return value
+
+
+def load_value(value: Any, response_format: Optional[Any] = None) -> Any:
+    """Rebuild a value saved by `dump_value`.
+
+    Generic models, such as OpenAI's ParsedChatCompletion, are parametrized with `response_format`
+    so structured outputs are parsed back into the agent's response model.
+    """
+    if not (isinstance(value, dict) and "__model__" in value):
+        return value
+
+    module_name, class_name = value["__model__"].split(":")
+    model_class: Any = import_module(module_name)
+    for name in class_name.split("."):
+        model_class = getattr(model_class, name)
+    if (
+        model_class.__pydantic_generic_metadata__["parameters"]
+        and isinstance(response_format, type)
+        and issubclass(response_format, BaseModel)
+    ):
+        model_class = model_class[response_format]
+    return model_class.model_validate(value["data"])
+
+
+class Cassette:
+    """Records model and tool calls to a JSON file, or replays them from it.
+
+    In replay mode calls are matched on a hash of their full request, so concurrent agents
+    are served correctly whatever order they run in. Identical requests are served in the
+    order they were recorded. Nothing is sent over the network.
+
+    Args:
+        path (str): The cassette file.
+        mode (CassetteMode): "record" to call the real services and save the results,
+            "replay" to serve recorded results.
+        latency_scale (float): In replay mode, sleep for the recorded latency times this factor.
+            0 replays instantly, 1 reproduces the recorded timings.
+    """
+
+    def __init__(self, path: str, mode: CassetteMode = "replay", latency_scale: float = 0.0):
+        self.path = Path(path)
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self._lock = Lock()
+        self._interactions: List[Interaction] = []
+        self._by_key: Dict[str, List[Interaction]] = {}
+        self._served: Dict[str, int] = {}
+        if mode == "replay":
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            for interaction_data in data["interactions"]:
+                self._add(Interaction(**interaction_data))
+            logger.info(f"Replaying {len(self._interactions)} calls from {self.path}")
+
+    def _add(self, interaction: Interaction) -> None:
+        self._interactions.append(interaction)
+        self._by_key.setdefault(interaction.key, []).append(interaction)
+
+    def _lookup(self, kind: str, key: str, request: str) -> Interaction:
+        with self._lock:
+            recorded = self._by_key.get(key)
+            if not recorded:
+                raise CassetteMiss(f"No recorded {kind} call in {self.path} for: {request}")
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+        # Requests repeated more often than recorded get the last recorded response
+        return recorded[min(served, len(recorded) - 1)]
+
+    def _sleep(self, seconds: float) -> None:
+        if self.latency_scale > 0 and seconds > 0:
+            time.sleep(seconds * self.latency_scale)
+
+    def call(self, kind: str, request: Any, function: Callable[[], Any], response_format: Any = None) -> Any:
+        """Run `function`, or replay its recorded result.
+
+        Args:
+            kind (str): The kind of call, for example "model" or "tool".
+            request (Any): JSON serializable description of everything that determines the result.
+            function (Callable[[], Any]): Makes the real call.
+            response_format (Any): Passed to `load_value` when replaying.
+        """
+        key = get_request_key(kind, request)
+        summary = json.dumps(request, default=str)[:200]
+        if self.mode == "replay":
+            interaction = self._lookup(kind, key, summary)
+            self._sleep(interaction.latency)
+            return load_value(interaction.response, response_format)
+
+        start = time.perf_counter()
+        result = function()
+        latency = time.perf_counter() - start
+        with self._lock:
+            self._add(Interaction(kind, key, summary, dump_value(result), latency))
+        return result
+
+    def stream(
+        self, kind: str, request: Any, function: Callable[[], Iterator[Any]], response_format: Any = None
+    ) -> Iterator[Any]:
+        """Like `call`, for functions returning an iterator. Chunks are replayed with their recorded spacing."""
+
+        key = get_request_key(kind, request)
+        summary = json.dumps(request, default=str)[:200]
+        if self.mode == "replay":
+            interaction = self._lookup(kind, key, summary)
+            delays = interaction.chunk_delays or [0.0] * len(interaction.response)
+            for delay, chunk in zip(delays, interaction.response):
+                self._sleep(delay)
+                yield load_value(chunk, response_format)
+            return
+
+        chunks: List[Any] = []
+        chunk_delays: List[float] = []
+        start = last = time.perf_counter()
+        for chunk in function():
+            now = time.perf_counter()
+            chunks.append(dump_value(chunk))
+            chunk_delays.append(now - last)
+            last = now
+            yield chunk
+        with self._lock:
+            self._add(Interaction(kind, key, summary, chunks, time.perf_counter() - start, chunk_delays))
+
+    def save(self) -> None:
+        """Write the recorded calls to the cassette file."""
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with self._lock:
+            interactions = [asdict(interaction) for interaction in self._interactions]
+        data = {"version": 1, "interactions": interactions}
+        tmp_path.write_text(json.dumps(data, default=str), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+        logger.info(f"Recorded {len(interactions)} calls to {self.path}")
+
+
+# The cassette used by every patched call, None outside `use_cassette`
+_current_cassette: Optional[Cassette] = None
+_patch_lock = Lock()
+_patched = False
+
+
+def get_model_request(model: Any, messages: List[Any]) -> Dict[str, Any]:
+    return {
+        "model": f"{model.provider}:{model.id}",
+        "messages": [message.to_dict() for message in messages],
+        "request_kwargs": getattr(model, "request_kwargs", None),
+    }
+
+
+def _patch_model(model_class: Any) -> None:
+    invoke = model_class.invoke
+    invoke_stream = model_class.invoke_stream
+
+    def cassette_invoke(self, messages):
+        if _current_cassette is None:
+            return invoke(self, messages)
+        return _current_cassette.call(
+            "model",
+            get_model_request(self, messages),
+            lambda: invoke(self, messages),
+            response_format=getattr(self, "response_format", None),
+        )
+
+    def cassette_invoke_stream(self, messages):
+        if _current_cassette is None:
+            return invoke_stream(self, messages)
+        return _current_cassette.stream(
+            "model_stream", get_model_request(self, messages), lambda: invoke_stream(self, messages)
+        )
+
+    model_class.invoke = cassette_invoke
+    model_class.invoke_stream = cassette_invoke_stream
+
+
+def _patch_function_call() -> None:
+    from phi.tools.function import FunctionCall
+
+    execute = FunctionCall.execute
+
+    def cassette_execute(self) -> bool:
+        if _current_cassette is None:
+            return execute(self)
+
+        def run() -> Dict[str, Any]:
+            success = execute(self)
+            return {"success": success, "result": self.result, "error": self.error}
+
+        outcome = _current_cassette.call(
+            "tool", {"tool": self.function.name, "arguments": self.arguments}, run
+        )
+        self.result = outcome["result"]
+        self.error = outcome["error"]
+        return outcome["success"]
+
+    FunctionCall.execute = cassette_execute  # type: ignore
+
+
+def _install_patches() -> None:
+    global _patched
+
+    with _patch_lock:
+        if _patched:
+            return
+        from phi.model.openai import OpenAIChat
+
+        _patch_model(OpenAIChat)
+        # Ollama is optional, phi logs an error when importing its model without it
+        if find_spec("ollama") is not None:
+            from phi.model.ollama import Ollama
+
+            _patch_model(Ollama)
+        _patch_function_call()
+        _patched = True
+
+
+@contextmanager
+def use_cassette(path: str, mode: CassetteMode = "replay", latency_scale: float = 0.0) -> Iterator[Cassette]:
+    """Record or replay every OpenAI and Ollama model call, tool call and `cassette_call` in this block.
+
+    The cassette applies to all threads, so pipelines running agents concurrently are covered.
+    In record mode the cassette is saved when the block exits, even if it raised.
+    """
+    global _current_cassette
+
+    _install_patches()
+    if _current_cassette is not None:
+        raise RuntimeError("A cassette is already in use")
+    cassette = Cassette(path, mode=mode, latency_scale=latency_scale)
+    _current_cassette = cassette
+    try:
+        yield cassette
+    finally:
+        _current_cassette = None
+        if mode == "record":
+            cassette.save()
+
+
+def cassette_call(kind: str, request: Any, function: Callable[[], Any]) -> Any:
+    """Route a call that does not go through a phi model or tool, such as a raw HTTP request,
+    through the current cassette. Outside `use_cassette` the function is simply called."""
+
+    if _current_cassette is None:
+        return function()
+    return _current_cassette.call(kind, request, function)
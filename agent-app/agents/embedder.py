@@ -0,0 +1,83 @@
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+
+from phi.embedder.openai import OpenAIEmbedder
+from phi.utils.log import logger
+from pydantic import PrivateAttr
+
+from agents.embedding_cache import EmbeddingCache
+
+
+class BatchOpenAIEmbedder(OpenAIEmbedder):
+    """OpenAIEmbedder that can embed many texts in a single request.
+
+    Vector databases such as PgVector embed documents one at a time. Calling `prefetch` with
+    the contents of a batch first embeds all of them in one request; the per-document calls
+    that follow are then served from memory. With a `cache`, document embeddings are also kept
+    in the database and texts that were embedded before are not sent to the API again.
+    """
+
+    # Persistent cache of document embeddings, search queries are always embedded
+    cache: Optional[EmbeddingCache] = None
+
+    _prefetched: Dict[str, Tuple[List[float], Optional[Dict]]] = PrivateAttr(default_factory=dict)
+    _lock: Lock = PrivateAttr(default_factory=Lock)
+
+    @property
+    def cache_model_id(self) -> str:
+        # text-embedding-3 models are requested at a given size, embeddings of other sizes do not match
+        if self.model.startswith("text-embedding-3"):
+            return f"{self.model}:{self.dimensions}"
+        return self.model
+
+    def get_embeddings_and_usage(self, texts: List[str]) -> List[Tuple[List[float], Optional[Dict]]]:
+        """Embed `texts` in one request, returning one (embedding, usage) pair per text."""
+
+        if not texts:
+            return []
+        response = self._response(text=texts)  # type: ignore[arg-type]
+        embeddings = [data.embedding for data in sorted(response.data, key=lambda data: data.index)]
+        usage = response.usage.model_dump() if response.usage else None
+        logger.debug(f"Embedded {len(texts)} texts in one request: {usage}")
+        # Usage is reported for the whole request, so it is only attached to the first text
+        return [(embedding, usage if i == 0 else None) for i, embedding in enumerate(embeddings)]
+
+    def prefetch(self, texts: List[str]) -> None:
+        """Embed the texts that are not prefetched or cached yet, in one request."""
+
+        with self._lock:
+            missing = list(dict.fromkeys(text for text in texts if text not in self._prefetched))
+        if self.cache is not None and missing:
+            cached = self.cache.get_many(self.cache_model_id, missing)
+            with self._lock:
+                for text, embedding in cached.items():
+                    self._prefetched[text] = (embedding, None)
+            missing = [text for text in missing if text not in cached]
+
+        results = self.get_embeddings_and_usage(missing)
+        with self._lock:
+            for text, result in zip(missing, results):
+                self._prefetched[text] = result
+        if self.cache is not None and results:
+            self.cache.put_many(
+                self.cache_model_id, {text: embedding for text, (embedding, _) in zip(missing, results)}
+            )
+
+    def discard(self, texts: List[str]) -> None:
+        """Drop prefetched embeddings that were not used, for example after a failed insert."""
+
+        with self._lock:
+            for text in texts:
+                self._prefetched.pop(text, None)
+
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        with self._lock:
+            prefetched = self._prefetched.pop(text, None)
+        if prefetched is None and self.cache is not None:
+            # Documents loaded without a prefetch still go through the cache
+            self.prefetch([text])
+            with self._lock:
+                prefetched = self._prefetched.pop(text, None)
+        if prefetched is not None:
+            return prefetched
+        return super().get_embedding_and_usage(text)
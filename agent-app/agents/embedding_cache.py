@@ -0,0 +1,86 @@
+import unicodedata
+from hashlib import sha256
+from typing import Callable, Dict, List
+
+from phi.utils.log import logger
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from db.tables import EmbeddingCacheEntry
+
+
+def normalize_text(text: str) -> str:
+    """Return the text with unicode normalized and runs of whitespace collapsed to a single space."""
+
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def get_content_hash(text: str) -> str:
+    return sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Embeddings stored in Postgres, keyed by model id and the hash of the normalized text.
+
+    Re-ingesting a document produces the same chunks for every unchanged part, so only chunks
+    that are new or edited need to be sent to the embedding API. Database errors are logged and
+    treated as cache misses, so a missing table never stops ingestion.
+
+    Args:
+        session_factory (Callable[[], Session]): Creates database sessions, for example `SessionLocal`.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def get_many(self, model_id: str, texts: List[str]) -> Dict[str, List[float]]:
+        """Return the cached embeddings of `texts`, keyed by text. Texts that are not cached are left out."""
+
+        texts_by_hash: Dict[str, List[str]] = {}
+        for text in texts:
+            texts_by_hash.setdefault(get_content_hash(text), []).append(text)
+        if not texts_by_hash:
+            return {}
+
+        try:
+            with self.session_factory() as session:
+                rows = session.execute(
+                    select(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.embedding).where(
+                        EmbeddingCacheEntry.model_id == model_id,
+                        EmbeddingCacheEntry.content_hash.in_(texts_by_hash),
+                    )
+                ).all()
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not read cached embeddings: {e}")
+            return {}
+
+        cached: Dict[str, List[float]] = {}
+        for content_hash, embedding in rows:
+            for text in texts_by_hash[content_hash]:
+                cached[text] = [float(value) for value in embedding]
+        logger.debug(f"Found {len(cached)} of {len(texts)} embeddings in the cache")
+        return cached
+
+    def put_many(self, model_id: str, embeddings: Dict[str, List[float]]) -> None:
+        """Store embeddings keyed by text. Texts that are already cached keep their embedding."""
+
+        values = {get_content_hash(text): embedding for text, embedding in embeddings.items() if embedding}
+        if not values:
+            return
+
+        try:
+            with self.session_factory() as session, session.begin():
+                session.execute(
+                    insert(EmbeddingCacheEntry)
+                    .values(
+                        [
+                            {"model_id": model_id, "content_hash": content_hash, "embedding": embedding}
+                            for content_hash, embedding in values.items()
+                        ]
+                    )
+                    .on_conflict_do_nothing(index_elements=["model_id", "content_hash"])
+                )
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not cache embeddings: {e}")
@@ -1,19 +1,47 @@
 from typing import Optional
 
 from phi.agent import Agent
-from phi.model.openai import OpenAIChat
+from phi.embedder.openai import OpenAIEmbedder
 from phi.knowledge.agent import AgentKnowledge
-from phi.storage.agent.postgres import PgAgentStorage
 from phi.tools.duckduckgo import DuckDuckGo
 from phi.vectordb.pgvector import PgVector, SearchType
 
+from agents.agent_pool import get_async_openai_client, get_openai_client
+from agents.embedder import BatchOpenAIEmbedder
+from agents.embedding_cache import EmbeddingCache
+from agents.image_refs import ImageRefOpenAIChat
+from agents.semantic_cache import SemanticResponseCache
+from agents.session_storage import PaginatedPgAgentStorage
 from agents.settings import agent_settings
-from db.session import db_url
+from db.session import SessionLocal, async_db_engine, db_engine
+from db.tables.semantic_cache import SEMANTIC_CACHE_DIMENSIONS
 
-example_agent_storage = PgAgentStorage(table_name="example_agent_sessions", db_url=db_url)
+# Storage and knowledge share the engines of db.session, and with them the pool settings in DbSettings
+example_agent_storage = PaginatedPgAgentStorage(
+    table_name="example_agent_sessions", db_engine=db_engine, async_db_engine=async_db_engine
+)
 example_agent_knowledge = AgentKnowledge(
-    vector_db=PgVector(table_name="example_agent_knowledge", db_url=db_url, search_type=SearchType.hybrid)
+    vector_db=PgVector(
+        table_name="example_agent_knowledge",
+        db_engine=db_engine,
+        search_type=SearchType.hybrid,
+        # Lets background ingestion embed a batch of chunks per request, skipping chunks embedded before
+        embedder=BatchOpenAIEmbedder(cache=EmbeddingCache(session_factory=SessionLocal)),
+    )
 )
+# Answers to prompts similar to ones answered before, when enabled with SEMANTIC_CACHE_ENABLED
+example_agent_semantic_cache: Optional[SemanticResponseCache] = None
+if agent_settings.semantic_cache_enabled:
+    example_agent_semantic_cache = SemanticResponseCache(
+        session_factory=SessionLocal,
+        embedder=OpenAIEmbedder(
+            model=agent_settings.embedding_model,
+            dimensions=SEMANTIC_CACHE_DIMENSIONS,
+            openai_client=get_openai_client(),
+        ),
+        threshold=agent_settings.semantic_cache_threshold,
+        ttl=agent_settings.semantic_cache_ttl,
+    )
 
 
 def get_example_agent(
@@ -27,11 +55,13 @@ def get_example_agent(
         agent_id="example-agent",
         session_id=session_id,
         user_id=user_id,
-        # The model to use for the agent
-        model=OpenAIChat(
+        # The model to use for the agent, images are passed as references to uploads in the image store
+        model=ImageRefOpenAIChat(
             id=model_id or agent_settings.gpt_4,
             max_tokens=agent_settings.default_max_completion_tokens,
             temperature=agent_settings.default_temperature,
+            client=get_openai_client(),
+            async_client=get_async_openai_client(),
         ),
         # Tools available to the agent
         tools=[DuckDuckGo()],
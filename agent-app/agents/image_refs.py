@@ -0,0 +1,54 @@
+from typing import Any, Iterator, List
+
+from phi.model.message import Message
+from phi.model.openai import OpenAIChat
+from phi.utils.log import logger
+
+from utils.image_store import ImageStore, image_store, is_image_ref
+
+
+def _is_ref_item(item: Any) -> bool:
+    return (
+        isinstance(item, dict)
+        and item.get("type") == "image_url"
+        and is_image_ref(item.get("image_url", {}).get("url", ""))
+    )
+
+
+def resolve_image_refs(messages: List[Message], store: ImageStore = image_store) -> List[Message]:
+    """Return the messages with image references replaced by data URLs.
+
+    The messages themselves are not changed, so agent memory and storage keep the short references.
+    """
+    resolved: List[Message] = []
+    for message in messages:
+        if isinstance(message.content, list) and any(_is_ref_item(item) for item in message.content):
+            content = []
+            for item in message.content:
+                if _is_ref_item(item):
+                    data_url = store.get_data_url(item["image_url"]["url"])
+                    if data_url is None:
+                        logger.warning(f"Image {item['image_url']['url']} is no longer stored, skipping it")
+                        continue
+                    item = {**item, "image_url": {**item["image_url"], "url": data_url}}
+                content.append(item)
+            message = message.model_copy(update={"content": content})
+        resolved.append(message)
+    return resolved
+
+
+class ImageRefOpenAIChat(OpenAIChat):
+    """OpenAIChat that accepts `ImageStore` references as images and sends them as data URLs."""
+
+    def invoke(self, messages: List[Message]) -> Any:
+        return super().invoke(resolve_image_refs(messages))
+
+    def invoke_stream(self, messages: List[Message]) -> Iterator[Any]:
+        yield from super().invoke_stream(resolve_image_refs(messages))
+
+    async def ainvoke(self, messages: List[Message]) -> Any:
+        return await super().ainvoke(resolve_image_refs(messages))
+
+    async def ainvoke_stream(self, messages: List[Message]) -> Any:
+        async for chunk in super().ainvoke_stream(resolve_image_refs(messages)):
+            yield chunk
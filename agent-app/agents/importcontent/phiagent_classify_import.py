@@ -6,6 +6,14 @@ import fitz  # PyMuPDF
 from PIL import Image
 import shutil
 import pandas as pd
+from typing import Any, Callable
+
+try:
+    from agents.cassette import cassette_call
+except ImportError:
+    # Run as a standalone script, outside the app: there is no cassette to record to
+    def cassette_call(kind: str, request: Any, function: Callable[[], Any]) -> Any:
+        return function()
 
 def check_existing_images(output_folder):
     """Check if folder exists and contains PNG images."""
@@ -76,10 +84,14 @@ def classify_image_with_ollama(image_path):
         "images": [base64_image]
     }
 
-    try:
+    def generate():
         response = requests.post(url, headers=headers, data=json.dumps(data))
         response.raise_for_status()
-        result = response.json()
+        return response.json()
+
+    try:
+        # Recorded or replayed when benchmarking with a cassette
+        result = cassette_call("ollama_generate", {"url": url, **data}, generate)
         
         # Extract category from response
         response_text = result["response"]
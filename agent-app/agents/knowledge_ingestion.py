@@ -0,0 +1,172 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from enum import Enum
+from threading import Lock
+from typing import Callable, Dict, Iterable, List, Optional
+from uuid import uuid4
+
+from phi.document import Document
+from phi.knowledge.agent import AgentKnowledge
+from phi.utils.log import logger
+
+from agents.embedder import BatchOpenAIEmbedder
+from agents.settings import agent_settings
+
+
+class IngestionStatus(str, Enum):
+    queued = "queued"
+    reading = "reading"
+    embedding = "embedding"
+    completed = "completed"
+    failed = "failed"
+
+
+@dataclass
+class IngestionJob:
+    """Progress of loading one document or website into a knowledge base."""
+
+    name: str
+    job_id: str = field(default_factory=lambda: str(uuid4()))
+    status: IngestionStatus = IngestionStatus.queued
+    total_chunks: int = 0
+    loaded_chunks: int = 0
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (IngestionStatus.completed, IngestionStatus.failed)
+
+    @property
+    def progress(self) -> float:
+        if self.status == IngestionStatus.completed:
+            return 1.0
+        if self.total_chunks == 0:
+            return 0.0
+        return self.loaded_chunks / self.total_chunks
+
+
+class KnowledgeIngestor:
+    """Loads documents into a knowledge base in the background.
+
+    Each submitted job reads its source on one of `max_jobs` workers, and embeds and upserts
+    the chunks in batches of `batch_size` on a shared pool of `embed_workers`. A batch is
+    submitted as soon as it is full, so sources that yield their chunks as they are read, like a
+    website crawl, are loaded while they are still being read. When the vector
+    db uses a `BatchOpenAIEmbedder`, every batch is embedded in a single request. Jobs update
+    their progress as batches finish, so callers can poll them while doing other work.
+
+    Args:
+        knowledge (AgentKnowledge): The knowledge base to load into.
+        max_jobs (Optional[int]): Sources read at the same time.
+        embed_workers (Optional[int]): Batches embedded and upserted at the same time.
+        batch_size (Optional[int]): Chunks per embedding request and upsert.
+        on_change (Optional[Callable[[], None]]): Called after a job has loaded chunks into the
+            knowledge base, even if it failed part way, for example to clear cached answers.
+    """
+
+    def __init__(
+        self,
+        knowledge: AgentKnowledge,
+        max_jobs: Optional[int] = None,
+        embed_workers: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        on_change: Optional[Callable[[], None]] = None,
+    ):
+        self.knowledge = knowledge
+        self.on_change = on_change
+        self.batch_size = batch_size or agent_settings.knowledge_embed_batch_size
+        self._job_executor = ThreadPoolExecutor(
+            max_workers=max_jobs or agent_settings.knowledge_ingest_workers, thread_name_prefix="ingest"
+        )
+        self._embed_executor = ThreadPoolExecutor(
+            max_workers=embed_workers or agent_settings.knowledge_embed_workers, thread_name_prefix="embed"
+        )
+        self._jobs: Dict[str, IngestionJob] = {}
+        self._lock = Lock()
+        self._collection_created = False
+
+    def submit(self, name: str, read: Callable[[], Iterable[Document]]) -> IngestionJob:
+        """Queue a job that loads the documents returned by `read`.
+
+        Args:
+            name (str): Name shown while the job runs, for example the file name or URL.
+            read (Callable[[], Iterable[Document]]): Reads and chunks the source. Runs on a worker.
+        """
+        job = IngestionJob(name=name)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        self._job_executor.submit(self._run, job, read)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: IngestionJob, read: Callable[[], Iterable[Document]]) -> None:
+        futures: List[Future] = []
+        try:
+            job.status = IngestionStatus.reading
+            batch: List[Document] = []
+            for document in read():
+                if not document.content:
+                    continue
+                batch.append(document)
+                job.total_chunks += 1
+                if len(batch) == self.batch_size:
+                    futures.append(self._submit_batch(job, batch))
+                    batch = []
+            if batch:
+                futures.append(self._submit_batch(job, batch))
+            if not futures:
+                raise ValueError(f"No content found in {job.name}")
+
+            job.status = IngestionStatus.embedding
+            wait(futures)
+            for future in futures:
+                future.result()
+            job.status = IngestionStatus.completed
+            logger.info(f"Loaded {job.total_chunks} chunks from {job.name} into the knowledge base")
+        except Exception as e:
+            logger.error(f"Could not load {job.name} into the knowledge base: {e}")
+            # Batches that were already submitted keep running, only report failure once they are done
+            wait(futures)
+            job.error = str(e)
+            job.status = IngestionStatus.failed
+        finally:
+            job.finished_at = time.time()
+            if job.loaded_chunks > 0 and self.on_change is not None:
+                try:
+                    self.on_change()
+                except Exception as e:
+                    logger.warning(f"Knowledge base change callback failed: {e}")
+
+    def _submit_batch(self, job: IngestionJob, batch: List[Document]) -> Future:
+        self._create_collection()
+        return self._embed_executor.submit(self._load_batch, job, batch)
+
+    def _create_collection(self) -> None:
+        with self._lock:
+            if self._collection_created or self.knowledge.vector_db is None:
+                return
+            self.knowledge.vector_db.create()
+            self._collection_created = True
+
+    def _load_batch(self, job: IngestionJob, batch: List[Document]) -> None:
+        vector_db = self.knowledge.vector_db
+        if vector_db is None:
+            raise ValueError("The knowledge base has no vector db")
+
+        embedder = getattr(vector_db, "embedder", None)
+        texts = [document.content for document in batch]
+        try:
+            if isinstance(embedder, BatchOpenAIEmbedder):
+                embedder.prefetch(texts)
+            vector_db.upsert(documents=batch)
+        finally:
+            if isinstance(embedder, BatchOpenAIEmbedder):
+                embedder.discard(texts)
+        with self._lock:
+            job.loaded_chunks += len(batch)
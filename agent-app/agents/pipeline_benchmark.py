@@ -0,0 +1,139 @@
+"""Benchmark the agent pipelines offline by replaying recorded model and tool calls.
+
+Record a cassette once, with network access and API keys:
+    python -m agents.pipeline_benchmark research "electric vehicles" --cassette tmp/cassettes/ev.json --record
+
+Then replay it as often as needed, on any machine. With --latency-scale 0 calls return instantly and
+the timings measure orchestration overhead; with --latency-scale 1 the recorded latencies are
+reproduced, which shows the gains from running agents concurrently:
+    python -m agents.pipeline_benchmark research "electric vehicles" --cassette tmp/cassettes/ev.json \\
+        --latency-scale 1 --workers 1 3 --repeat 3
+
+Targets:
+    research    `run_analysis` of the PM research Streamlit app, subject is the business type
+    blog        `BlogPostGenerator.run`, subject is the topic
+    classify    `organize_images_by_type`, subject is a folder of page images (it is copied, not modified)
+"""
+
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from uuid import uuid4
+
+from phi.utils.log import logger
+
+from agents.cassette import use_cassette
+from agents.settings import agent_settings
+
+
+def run_research(business_type: str, max_workers: Optional[int]) -> None:
+    import streamlit as st
+
+    from agents.pm_research_streamlit import run_analysis
+
+    # Outside `streamlit run` the Streamlit elements are no-ops, which is what we want here
+    outputs = run_analysis(
+        business_type, st.progress(0), st.empty(), max_workers=max_workers, force_refresh=True
+    )
+    if outputs is None:
+        raise RuntimeError("Research analysis failed, see the log for details")
+
+
+def run_blog(topic: str, max_workers: Optional[int]) -> None:
+    from agents.blog_post_generator import BlogPostGenerator
+
+    generator = BlogPostGenerator(session_id=f"benchmark-{uuid4()}")
+    for _ in generator.run(topic=topic, use_cache=False):
+        pass
+
+
+def run_classify(image_folder: str, max_workers: Optional[int]) -> None:
+    from agents.importcontent.phiagent_classify_import import organize_images_by_type
+
+    source = Path(image_folder).resolve()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for image in source.iterdir():
+            if image.suffix in (".png", ".jpg", ".jpeg"):
+                shutil.copy(image, tmp_dir)
+        # organize_images_by_type moves the images and writes its spreadsheet to the working directory
+        os.chdir(tmp_dir)
+        try:
+            organize_images_by_type(tmp_dir)
+        finally:
+            os.chdir(cwd)
+
+
+TARGETS: Dict[str, Callable[[str, Optional[int]], None]] = {
+    "research": run_research,
+    "blog": run_blog,
+    "classify": run_classify,
+}
+
+# Replayed calls never reach the services, but the shared OpenAI client is built before the
+# cassette answers them and refuses to be built without a key
+REPLAY_API_KEY = "replay-placeholder"
+
+
+def replay(
+    target: str, subject: str, cassette: str, max_workers: Optional[int], repeat: int, latency_scale: float
+) -> List[float]:
+    """Replay `target` from `cassette` `repeat` times and return the timings, without API keys."""
+
+    os.environ.setdefault("OPENAI_API_KEY", REPLAY_API_KEY)
+    timings: List[float] = []
+    for _ in range(max(1, repeat)):
+        with use_cassette(cassette, mode="replay", latency_scale=latency_scale):
+            start = time.perf_counter()
+            TARGETS[target](subject, max_workers)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Benchmark agent pipelines against recorded model and tool calls.")
+    parser.add_argument("target", choices=sorted(TARGETS))
+    parser.add_argument("subject", help="Business type, blog topic or image folder, depending on the target")
+    parser.add_argument("--cassette", required=True, help="Cassette file to record to or replay from")
+    parser.add_argument("--record", action="store_true", help="Call the real services and record a cassette")
+    parser.add_argument(
+        "--latency-scale", type=float, default=0.0, help="Replay recorded latencies scaled by this factor"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[agent_settings.research_max_workers],
+        help="Agents run at once, one benchmark per value (research target only)",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per benchmark, ignored when recording")
+    args = parser.parse_args()
+
+    target = TARGETS[args.target]
+    if args.record:
+        with use_cassette(args.cassette, mode="record"):
+            start = time.perf_counter()
+            target(args.subject, args.workers[0])
+        print(f"Recorded {args.target} in {time.perf_counter() - start:.2f}s to {args.cassette}")
+        return
+
+    worker_counts = args.workers if args.target == "research" else [None]
+    for max_workers in worker_counts:
+        timings = replay(
+            args.target, args.subject, args.cassette, max_workers, args.repeat, args.latency_scale
+        )
+        label = f"{args.target} workers={max_workers}" if max_workers else args.target
+        logger.debug(f"{label} timings: {timings}")
+        print(
+            f"{label}: min {min(timings):.3f}s, median {statistics.median(timings):.3f}s, "
+            f"max {max(timings):.3f}s over {len(timings)} runs (latency scale {args.latency_scale})"
+        )
+
+
+if __name__ == "__main__":
+    main()
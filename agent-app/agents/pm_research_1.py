@@ -1,6 +1,5 @@
 from phi.agent import Agent
 from phi.model.openai import OpenAIChat
-from phi.tools.googlesearch import GoogleSearch
 from phi.tools.yfinance import YFinanceTools
 import inspect
 import types
@@ -11,12 +10,18 @@ from datetime import datetime
 import re
 import os
 
+from agents.agent_pool import copy_agent, get_openai_client
+from agents.research_metrics import ResearchMetrics
+from agents.research_pipeline import ResearchStep, run_research_steps
+from agents.response_cache import agent_response_cache
+from agents.search_broker import BrokeredGoogleSearch, search_broker_scope
+
 # Define individual agents with clearer communication patterns
 web_agent = Agent(
     name="Web Agent",
     role="Search the web for latest information and news",
-    model=OpenAIChat(id="gpt-4o"),
-    tools=[GoogleSearch()],
+    model=OpenAIChat(id="gpt-4o", client=get_openai_client()),
+    tools=[BrokeredGoogleSearch()],
     instructions=[
         "Search for latest news and information about the given topic",
         "Provide 3-5 key findings with dates and sources",
@@ -29,7 +34,7 @@ web_agent = Agent(
 finance_agent = Agent(
     name="Finance Agent",
     role="Analyze financial data and market trends",
-    model=OpenAIChat(id="gpt-4o"),
+    model=OpenAIChat(id="gpt-4o", client=get_openai_client()),
     tools=[YFinanceTools(stock_price=True, analyst_recommendations=True, company_info=True)],
     instructions=[
         "Analyze financial metrics and market data",
@@ -43,8 +48,8 @@ finance_agent = Agent(
 tech_market_agent = Agent(
     name="Technology and Market Opportunity Expert",
     role="Analyze technology trends, market dynamics, and identify value creation opportunities",
-    model=OpenAIChat(id="gpt-4o"),
-    tools=[GoogleSearch()],
+    model=OpenAIChat(id="gpt-4o", client=get_openai_client()),
+    tools=[BrokeredGoogleSearch()],
     instructions=[
         "Provide a structured market analysis with these specific sections:",
         
@@ -82,8 +87,8 @@ tech_market_agent = Agent(
 value_capture_agent = Agent(
     name="Value Capture Strategist",
     role="Develop strategies for IP protection, market positioning, and competitive advantage",
-    model=OpenAIChat(id="gpt-4o"),
-    tools=[GoogleSearch()],
+    model=OpenAIChat(id="gpt-4o", client=get_openai_client()),
+    tools=[BrokeredGoogleSearch()],
     instructions=[
         "Focus on IP protection strategies",
         "Develop market positioning recommendations",
@@ -98,8 +103,8 @@ value_capture_agent = Agent(
 org_design_agent = Agent(
     name="Organizational Design Architect",
     role="Design optimal organizational structures and collaboration networks",
-    model=OpenAIChat(id="gpt-4o"),
-    tools=[GoogleSearch()],
+    model=OpenAIChat(id="gpt-4o", client=get_openai_client()),
+    tools=[BrokeredGoogleSearch()],
     instructions=[
         "Design team structures and collaboration frameworks",
         "Optimize for innovation and value delivery",
@@ -111,33 +116,6 @@ org_design_agent = Agent(
     markdown=True,
 )
 
-# Combine agents with clear workflow
-agent_team = Agent(
-    name="Product Management Research Team",
-    team=[
-        web_agent, 
-        finance_agent, 
-        tech_market_agent, 
-        value_capture_agent, 
-        org_design_agent
-    ],
-    instructions=[
-        "Follow this exact sequence:",
-        "1. Web Agent: Gather latest news and developments",
-        "2. Tech Market Agent: Using news context, provide detailed market analysis",
-        "3. Finance Agent: Add financial metrics of key players",
-        "4. Value Capture Agent: Develop strategies based on market analysis",
-        "5. Org Design Agent: Propose structure based on market size and opportunity",
-        
-        "Ensure each agent builds upon previous agents' findings",
-        "All market size claims must include sources",
-        "Present data in tables where appropriate",
-        "Highlight key opportunities and risks"
-    ],
-    show_tool_calls=True,
-    markdown=True,
-)
-
 # Function signature inspection utility
 def inspect_function(func):
     if callable(func):
@@ -152,6 +130,10 @@ def inspect_function(func):
     else:
         raise ValueError("Provided object is not callable.")
 
+def slugify(value):
+    """Lowercase `value` and join its words with underscores, so it is safe in a file name"""
+    return re.sub(r'[^a-z0-9]+', '_', value.lower()).strip('_')
+
 class ReportFormatter:
     def __init__(self):
         self.document = Document()
@@ -202,59 +184,102 @@ class ReportFormatter:
         for agent_name, output in agent_outputs:
             self.add_section(f"{agent_name} Analysis", output)
 
-    def save(self, business_type):
-        # Create reports directory if it doesn't exist
-        if not os.path.exists('reports'):
-            os.makedirs('reports')
-            
-        # Format filename
-        formatted_business = business_type.lower().replace(' ', '_')
-        filename = f"reports/{formatted_business}_market_analysis_{datetime.now().strftime('%Y%m%d_%H%M')}.docx"
-        
-        self.document.save(filename)
-        return filename
+    def save(self, business_type, reports_dir='reports'):
+        # Create reports directory if it doesn't exist, other workers may be creating it too
+        os.makedirs(reports_dir, exist_ok=True)
+
+        # Format filename, a business type may contain characters like "/" that break the path
+        formatted_business = slugify(business_type) or 'industry'
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        attempt = 1
+        while True:
+            suffix = f"_{attempt}" if attempt > 1 else ''
+            filename = os.path.join(reports_dir, f"{formatted_business}_market_analysis_{timestamp}{suffix}.docx")
+            try:
+                # Only creates a new file, so two reports saved at the same time never overwrite each other
+                with open(filename, 'xb') as f:
+                    self.document.save(f)
+                return filename
+            except FileExistsError:
+                attempt += 1
+
+def build_research_steps(business_type):
+    """Return the research steps for one industry, each running its own copy of the agents.
+
+    Steps that build on earlier findings depend on those steps and receive a compact digest of
+    their sections instead of the full transcripts.
+    """
+    return [
+        ResearchStep(
+            title="Industry News",
+            agent=copy_agent(web_agent),
+            prompt=f"Provide latest news and developments in the {business_type} industry",
+            status="Gathering latest news...",
+            cache_ttl=60 * 60,
+        ),
+        ResearchStep(
+            title="Market Analysis",
+            agent=copy_agent(tech_market_agent),
+            prompt=f"Based on the above news, provide detailed market analysis for {business_type} industry",
+            status="Analyzing market...",
+            depends_on=("Industry News",),
+            cache_ttl=24 * 60 * 60,
+        ),
+        ResearchStep(
+            title="Financial Analysis",
+            agent=copy_agent(finance_agent),
+            prompt=f"Analyze financial metrics of key players in the {business_type} industry",
+            status="Analyzing financials...",
+            cache_ttl=60 * 60,
+        ),
+        ResearchStep(
+            title="Strategic Recommendations",
+            agent=copy_agent(value_capture_agent),
+            prompt=(
+                f"Based on the above market analysis, develop strategic recommendations "
+                f"for entering the {business_type} market"
+            ),
+            status="Developing strategies...",
+            depends_on=("Market Analysis",),
+            cache_ttl=7 * 24 * 60 * 60,
+        ),
+        ResearchStep(
+            title="Organizational Design",
+            agent=copy_agent(org_design_agent),
+            prompt=(
+                f"Based on the above market size and opportunity, propose organizational structure "
+                f"for a {business_type} company"
+            ),
+            status="Designing organization...",
+            depends_on=("Market Analysis", "Financial Analysis"),
+            cache_ttl=7 * 24 * 60 * 60,
+        ),
+    ]
 
 # Function to ask the user for input and run the agent team
-def start_business_analysis():
+def start_business_analysis(force_refresh=False):
     business_type = input("What kind of company do you want to create? ")
     
-    # Create base prompts for each agent
-    web_prompt = f"Provide latest news and developments in the {business_type} industry"
-    market_prompt = f"Based on the above news, provide detailed market analysis for {business_type} industry"
-    finance_prompt = f"Analyze financial metrics of key players in the {business_type} industry"
-    value_prompt = f"Develop strategic recommendations for entering the {business_type} market"
-    org_prompt = f"Propose organizational structure for a {business_type} company"
-    
     try:
         print(f"\n=== {business_type.title()} Industry Analysis ===\n")
         
-        # Collect outputs from each agent
-        agent_outputs = []
-        
-        # Web Agent
-        print("\nGathering latest news...")
-        web_response = web_agent.run(web_prompt)
-        agent_outputs.append(("Industry News", str(web_response)))
-        
-        # Tech Market Agent
-        print("\nAnalyzing market...")
-        market_response = tech_market_agent.run(market_prompt)
-        agent_outputs.append(("Market Analysis", str(market_response)))
-        
-        # Finance Agent
-        print("\nAnalyzing financials...")
-        finance_response = finance_agent.run(finance_prompt)
-        agent_outputs.append(("Financial Analysis", str(finance_response)))
-        
-        # Value Capture Agent
-        print("\nDeveloping strategies...")
-        value_response = value_capture_agent.run(value_prompt)
-        agent_outputs.append(("Strategic Recommendations", str(value_response)))
-        
-        # Org Design Agent
-        print("\nDesigning organization...")
-        org_response = org_design_agent.run(org_prompt)
-        agent_outputs.append(("Organizational Design", str(org_response)))
+        metrics = ResearchMetrics(pipeline="pm_research_1", business_type=business_type)
+
+        def on_step_start(step):
+            metrics.step_started(step)
+            print(f"\n{step.status}")
+
+        # Agents searching for the same thing during this analysis share one request
+        with search_broker_scope():
+            sections = run_research_steps(
+                build_research_steps(business_type),
+                on_step_start=on_step_start,
+                on_step_complete=metrics.step_finished,
+                cache=agent_response_cache,
+                force_refresh=force_refresh,
+            )
+        metrics.save()
+        agent_outputs = [(section.title, section.content) for section in sections]
         
         # Create and save the document
         formatter = ReportFormatter()
@@ -270,25 +295,27 @@ def start_business_analysis():
         print(f"\nError during analysis: {str(e)}")
         print("Try narrowing the industry scope or checking the input format.")
 
-# Start the process
-start_business_analysis()
-
 def test_web_agent():
     test_prompt = "Search for the top 3 latest news items about AI startups."
     print("\n=== Web Agent Search Results ===\n")
     
     try:
-        response = web_agent.print_response(test_prompt, stream=True)
+        response = web_agent.run(test_prompt)
+        content = response.get_content_as_string() if response.content is not None else ""
+        print(content)
         
         # Format and save to Word document
         formatter = ReportFormatter()
-        formatter.format_document(str(response), "AI Startups News Report")
-        filename = f"ai_startups_news_{datetime.now().strftime('%Y%m%d_%H%M')}.docx"
-        formatter.save(filename)
+        formatter.format_document("AI Startups News Report", [("Web Agent", content)])
+        filename = formatter.save("ai_startups_news")
         print(f"\nReport saved as: {filename}")
         
     except Exception as e:
         print(f"\nError in web agent test: {str(e)}")
 
-# Call the test function
-test_web_agent()
\ No newline at end of file
+if __name__ == "__main__":
+    # Start the process
+    start_business_analysis()
+
+    # Call the test function
+    test_web_agent()
\ No newline at end of file
@@ -0,0 +1,197 @@
+"""Run the PM research analysis for many industries without supervision.
+
+Reads business types from a CSV file and analyzes several of them at once. Every finished
+agent section is checkpointed to disk, so re-running the same command after a crash or a
+rate-limit failure only runs the sections that are missing. A .docx report is written as
+soon as each industry completes.
+
+Usage:
+    python -m agents.pm_research_batch industries.csv --workers 2
+"""
+
+import csv
+import json
+import os
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from phi.utils.log import logger
+
+from agents.pm_research_1 import ReportFormatter, build_research_steps, slugify
+from agents.research_metrics import ResearchMetrics
+from agents.research_pipeline import run_research_steps
+from agents.response_cache import agent_response_cache
+from agents.search_broker import search_broker_scope
+
+
+def read_business_types(csv_file: str, column: str = "business_type") -> List[str]:
+    """Read business types from `column`, or from the first column if the file has no such header."""
+
+    with open(csv_file, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return []
+
+    header = [cell.strip().lower() for cell in rows[0]]
+    if column in header:
+        index = header.index(column)
+        rows = rows[1:]
+    else:
+        index = 0
+
+    business_types: List[str] = []
+    for row in rows:
+        if len(row) > index and row[index].strip() and row[index].strip() not in business_types:
+            business_types.append(row[index].strip())
+    return business_types
+
+
+class SectionCheckpoint:
+    """Finished sections of one industry's analysis, stored as one JSON file per section."""
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def _write(self, path: Path, data: Dict) -> None:
+        # Write to a temporary file first so a crash never leaves a truncated checkpoint behind
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+    def load_sections(self) -> Dict[str, str]:
+        sections: Dict[str, str] = {}
+        for path in self.directory.glob("section_*.json"):
+            try:
+                data = json.loads(path.read_text(encoding="utf-8"))
+                sections[data["title"]] = data["content"]
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+        return sections
+
+    def save_section(self, title: str, content: str) -> None:
+        self._write(self.directory / f"section_{slugify(title)}.json", {"title": title, "content": content})
+
+    def get_report(self) -> Optional[str]:
+        report_path = self.directory / "report.json"
+        if report_path.exists():
+            return json.loads(report_path.read_text(encoding="utf-8")).get("filename")
+        return None
+
+    def save_report(self, filename: str) -> None:
+        self._write(self.directory / "report.json", {"filename": filename})
+
+
+def analyze_industry(
+    business_type: str,
+    checkpoint_dir: str,
+    reports_dir: str,
+    max_workers: Optional[int] = None,
+    force_refresh: bool = False,
+) -> str:
+    """Run (or resume) the analysis for one industry and return the report filename."""
+
+    checkpoint = SectionCheckpoint(Path(checkpoint_dir) / slugify(business_type))
+    report = checkpoint.get_report()
+    if report is not None:
+        logger.info(f"Skipping {business_type}, report already written: {report}")
+        return report
+
+    sections = checkpoint.load_sections()
+    if sections:
+        logger.info(f"Resuming {business_type} with {len(sections)} finished sections")
+
+    metrics = ResearchMetrics(pipeline="pm_research_batch", business_type=business_type)
+
+    def on_step_complete(step, response):
+        metrics.step_finished(step, response)
+        checkpoint.save_section(step.title, response.get_content_as_string() if response.content else "")
+
+    # Agents searching for the same thing during this analysis share one request
+    with search_broker_scope():
+        research_sections = run_research_steps(
+            build_research_steps(business_type),
+            max_workers=max_workers,
+            on_step_start=metrics.step_started,
+            on_step_complete=on_step_complete,
+            cache=agent_response_cache,
+            force_refresh=force_refresh,
+            completed=sections,
+        )
+    metrics.save()
+
+    formatter = ReportFormatter()
+    formatter.format_document(
+        f"{business_type.title()} Industry Analysis Report",
+        [(section.title, section.content) for section in research_sections],
+    )
+    filename = formatter.save(business_type, reports_dir=reports_dir)
+    checkpoint.save_report(filename)
+    return filename
+
+
+def analyze_with_retries(business_type: str, retries: int, **kwargs) -> str:
+    """Retry a failed industry with exponential backoff. Each attempt resumes from the checkpoint."""
+
+    attempt = 0
+    while True:
+        try:
+            return analyze_industry(business_type, **kwargs)
+        except Exception as e:
+            if attempt >= retries:
+                raise
+            delay = 30 * 2**attempt
+            attempt += 1
+            logger.warning(f"{business_type} failed ({e}), retrying in {delay}s [{attempt}/{retries}]")
+            time.sleep(delay)
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Run the PM research analysis for every business type in a CSV file.")
+    parser.add_argument("csv_file", help="CSV file with one business type per row")
+    parser.add_argument("--column", default="business_type", help="Column holding the business type")
+    parser.add_argument("--workers", type=int, default=2, help="Industries analyzed at the same time")
+    parser.add_argument(
+        "--agents-per-industry", type=int, default=None, help="Agents run at once per industry"
+    )
+    parser.add_argument("--checkpoint-dir", default="tmp/pm_research_checkpoints")
+    parser.add_argument("--reports-dir", default="reports")
+    parser.add_argument("--retries", type=int, default=2, help="Retries per industry before giving up")
+    parser.add_argument("--force-refresh", action="store_true", help="Ignore cached agent responses")
+    args = parser.parse_args()
+
+    business_types = read_business_types(args.csv_file, column=args.column)
+    logger.info(f"Analyzing {len(business_types)} business types with {args.workers} workers")
+
+    failed: List[str] = []
+    with ThreadPoolExecutor(max_workers=max(1, args.workers), thread_name_prefix="industry") as executor:
+        futures = {
+            executor.submit(
+                analyze_with_retries,
+                business_type,
+                args.retries,
+                checkpoint_dir=args.checkpoint_dir,
+                reports_dir=args.reports_dir,
+                max_workers=args.agents_per_industry,
+                force_refresh=args.force_refresh,
+            ): business_type
+            for business_type in business_types
+        }
+        for future in as_completed(futures):
+            business_type = futures[future]
+            try:
+                logger.info(f"Report for {business_type} saved as: {future.result()}")
+            except Exception as e:
+                logger.error(f"Analysis for {business_type} failed: {e}")
+                failed.append(business_type)
+
+    if failed:
+        logger.error(f"{len(failed)} analyses failed, re-run the same command to resume: {failed}")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,33 @@ import streamlit as st
 import pandas as pd
 from phi.agent import Agent
 from phi.model.ollama import Ollama
-from phi.tools.googlesearch import GoogleSearch
+from ollama import Client as OllamaClient
 from phi.tools.yfinance import YFinanceTools
 from docx import Document
 from docx.shared import Inches, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from datetime import datetime
+from functools import partial
 from io import BytesIO
 
-# Initialize agents
-def initialize_agents():
+from agents.agent_pool import copy_agent
+from agents.response_cache import agent_response_cache
+from agents.research_metrics import ResearchMetrics
+from agents.research_pipeline import ResearchStep, run_research_steps
+from agents.search_broker import BrokeredGoogleSearch, search_broker_scope
+from agents.settings import agent_settings
+from utils.stream_buffer import StreamBuffer
+
+# Build the agent definitions, toolkits and model client once per process
+@st.cache_resource
+def build_agents():
+    ollama_client = OllamaClient()
+
     web_agent = Agent(
         name="Web Agent",
         role="Search the web for latest information and news",
-        model=Ollama(model="llama3.2:3b"),
-        tools=[GoogleSearch()],
+        model=Ollama(model="llama3.2:3b", client=ollama_client),
+        tools=[BrokeredGoogleSearch()],
         instructions=[
             "Search for latest news and information about the given topic",
             "Format each finding as 'Key Development: Details'",
@@ -36,7 +48,7 @@ def initialize_agents():
     finance_agent = Agent(
         name="Finance Agent",
         role="Analyze financial data and market trends",
-        model=Ollama(model="llama3.2:3b"),
+        model=Ollama(model="llama3.2:3b", client=ollama_client),
         tools=[YFinanceTools(stock_price=True, analyst_recommendations=True, company_info=True)],
         instructions=[
             "Analyze financial metrics and market data",
@@ -51,8 +63,8 @@ def initialize_agents():
     tech_market_agent = Agent(
         name="Technology and Market Opportunity Expert",
         role="Analyze technology trends, market dynamics, and identify value creation opportunities",
-        model=Ollama(model="llama3.2:3b"),
-        tools=[GoogleSearch()],
+        model=Ollama(model="llama3.2:3b", client=ollama_client),
+        tools=[BrokeredGoogleSearch()],
         instructions=[
             "Provide a structured market analysis with these specific sections:",
             
@@ -84,8 +96,8 @@ def initialize_agents():
     value_capture_agent = Agent(
         name="Value Capture Strategist",
         role="Develop strategies for IP protection, market positioning, and competitive advantage",
-        model=Ollama(model="llama3.2:3b"),
-        tools=[GoogleSearch()],
+        model=Ollama(model="llama3.2:3b", client=ollama_client),
+        tools=[BrokeredGoogleSearch()],
         instructions=[
             "Focus on IP protection strategies",
             "Develop market positioning recommendations",
@@ -100,8 +112,8 @@ def initialize_agents():
     org_design_agent = Agent(
         name="Organizational Design Architect",
         role="Design optimal organizational structures and collaboration networks",
-        model=Ollama(model="llama3.2:3b"),
-        tools=[GoogleSearch()],
+        model=Ollama(model="llama3.2:3b", client=ollama_client),
+        tools=[BrokeredGoogleSearch()],
         instructions=[
             "Design team structures and collaboration frameworks",
             "Optimize for innovation and value delivery",
@@ -115,6 +127,10 @@ def initialize_agents():
     
     return web_agent, finance_agent, tech_market_agent, value_capture_agent, org_design_agent
 
+def initialize_agents():
+    """Return per-run copies of the cached agents, each with clean memory."""
+    return tuple(copy_agent(agent) for agent in build_agents())
+
 def display_table(df):
     """Display a formatted table using Streamlit."""
     st.dataframe(
@@ -127,30 +143,18 @@ def clean_agent_response(raw_response):
     """Extract clean content from agent response."""
     content = raw_response
     
-    # If content is already clean, return it
-    if not any(prefix in content for prefix in ['content=', '\nRunning:', 'messages=[Message']):
-        return content
+    # If content has no tool call output, return it
+    if '\nRunning:' not in content:
+        return content.strip()
         
     # Extract content between tool execution blocks
-    if "\nRunning:" in content:
-        parts = content.split("\nRunning:")
-        # Get the last part after all tool executions
-        for part in parts:
-            if "\n\n" in part:
-                content = part.split("\n\n", 1)[1]
-    
-    # Remove content= wrapper if present
-    if 'content="' in content:
-        content = content.split('content="')[1].split('"')[0]
+    parts = content.split("\nRunning:")
+    # Get the last part after all tool executions
+    for part in parts:
+        if "\n\n" in part:
+            content = part.split("\n\n", 1)[1]
     
-    # Remove any remaining system messages
-    if "messages=[Message" in content:
-        content = content.split("messages=[Message")[0]
-    
-    # Clean up any remaining special characters and extra whitespace
-    content = content.replace("\\n", "\n").strip()
-    
-    return content
+    return content.strip()
 
 def display_agent_response(agent_name, content):
     """Display the agent response with proper formatting."""
@@ -190,50 +194,111 @@ def display_agent_response(agent_name, content):
     
     st.markdown("---")
 
-def run_analysis(business_type, progress_bar, status_text):
+def render_streaming_section(placeholder, agent_name, content):
+    """Render a partial agent response while it is still streaming."""
+    with placeholder.container():
+        st.subheader(f"🔍 {agent_name}")
+        st.markdown(content)
+
+def display_metrics(metrics):
+    """Show per-agent and per-tool timings in a collapsible panel."""
+    with st.expander("⏱️ Agent performance"):
+        st.caption(f"Total time: {metrics.total_time:.1f}s")
+        st.dataframe(metrics.agent_rows(), use_container_width=True, hide_index=True)
+        tool_rows = metrics.tool_rows()
+        if tool_rows:
+            st.dataframe(tool_rows, use_container_width=True, hide_index=True)
+
+def run_analysis(business_type, progress_bar, status_text, max_workers=None, force_refresh=False):
     web_agent, finance_agent, tech_market_agent, value_capture_agent, org_design_agent = initialize_agents()
-    
-    agent_outputs = []
-    progress_step = 0.2  # Changed from 100/5 to 0.2 (20% per step)
-    
-    try:
-        # Web Agent
-        status_text.text("Gathering latest news...")
-        web_prompt = f"Provide latest news and developments in the {business_type} industry"
-        web_response = web_agent.run(web_prompt)
-        agent_outputs.append(("Industry News", str(web_response)))
-        progress_bar.progress(progress_step)
 
-        # Tech Market Agent
-        status_text.text("Analyzing market...")
-        market_prompt = f"Based on the above news, provide detailed market analysis for {business_type} industry"
-        market_response = tech_market_agent.run(market_prompt)
-        agent_outputs.append(("Market Analysis", str(market_response)))
-        progress_bar.progress(progress_step * 2)
+    steps = [
+        ResearchStep(
+            title="Industry News",
+            agent=web_agent,
+            prompt=f"Provide latest news and developments in the {business_type} industry",
+            status="Gathering latest news...",
+            cache_ttl=60 * 60,
+        ),
+        ResearchStep(
+            title="Market Analysis",
+            agent=tech_market_agent,
+            prompt=f"Based on the above news, provide detailed market analysis for {business_type} industry",
+            status="Analyzing market...",
+            cache_ttl=24 * 60 * 60,
+            depends_on=("Industry News",),
+        ),
+        ResearchStep(
+            title="Financial Analysis",
+            agent=finance_agent,
+            prompt=f"Analyze financial metrics of key players in the {business_type} industry",
+            status="Analyzing financials...",
+            cache_ttl=60 * 60,
+        ),
+        ResearchStep(
+            title="Strategic Recommendations",
+            agent=value_capture_agent,
+            prompt=f"Develop strategic recommendations for entering the {business_type} market",
+            status="Developing strategies...",
+            cache_ttl=7 * 24 * 60 * 60,
+        ),
+        ResearchStep(
+            title="Organizational Design",
+            agent=org_design_agent,
+            prompt=f"Propose organizational structure for a {business_type} company",
+            status="Designing organization...",
+            cache_ttl=7 * 24 * 60 * 60,
+        ),
+    ]
 
-        # Finance Agent
-        status_text.text("Analyzing financials...")
-        finance_prompt = f"Analyze financial metrics of key players in the {business_type} industry"
-        finance_response = finance_agent.run(finance_prompt)
-        agent_outputs.append(("Financial Analysis", str(finance_response)))
-        progress_bar.progress(progress_step * 3)
+    running = []
+    completed = []
+    metrics = ResearchMetrics(pipeline="pm_research_streamlit_ollama", business_type=business_type)
 
-        # Value Capture Agent
-        status_text.text("Developing strategies...")
-        value_prompt = f"Develop strategic recommendations for entering the {business_type} market"
-        value_response = value_capture_agent.run(value_prompt)
-        agent_outputs.append(("Strategic Recommendations", str(value_response)))
-        progress_bar.progress(progress_step * 4)
+    # Reserve a section per agent up front so results stream into a stable order
+    sections = {}
+    for step in steps:
+        with st.chat_message("assistant"):
+            sections[step.title] = st.empty()
+    buffers = {
+        step.title: StreamBuffer(partial(render_streaming_section, sections[step.title], step.title))
+        for step in steps
+    }
+
+    def on_step_start(step):
+        metrics.step_started(step)
+        running.append(step.status)
+        status_text.text("\n".join(running))
+        render_streaming_section(sections[step.title], step.title, f"_{step.status}_")
+
+    def on_step_delta(step, delta):
+        buffers[step.title].append(delta)
+
+    def on_step_complete(step, response):
+        metrics.step_finished(step, response)
+        with sections[step.title].container():
+            display_agent_response(step.title, buffers[step.title].close())
+        running.remove(step.status)
+        completed.append(step.title)
+        progress_bar.progress(len(completed) / len(steps))
+        status_text.text("\n".join(running) if running else f"Finished {step.title}")
+
+    try:
+        # Agents searching for the same thing during this analysis share one request
+        with search_broker_scope():
+            research_sections = run_research_steps(
+                steps,
+                max_workers=max_workers,
+                on_step_start=on_step_start,
+                on_step_delta=on_step_delta,
+                on_step_complete=on_step_complete,
+                cache=agent_response_cache,
+                force_refresh=force_refresh,
+            )
+        metrics.save()
+        display_metrics(metrics)
+        return [(section.title, section.content) for section in research_sections]
 
-        # Org Design Agent
-        status_text.text("Designing organization...")
-        org_prompt = f"Propose organizational structure for a {business_type} company"
-        org_response = org_design_agent.run(org_prompt)
-        agent_outputs.append(("Organizational Design", str(org_response)))
-        progress_bar.progress(1.0)  # Changed from 100 to 1.0
-        
-        return agent_outputs
-        
     except Exception as e:
         st.error(f"Error during analysis: {str(e)}")
         return None
@@ -247,6 +312,10 @@ def main():
         st.markdown("---")
         
         business_type = st.text_input("What kind of company do you want to analyze?")
+        max_workers = st.number_input(
+            "Agents to run in parallel", min_value=1, max_value=5, value=agent_settings.research_max_workers
+        )
+        force_refresh = st.checkbox("Force refresh", help="Ignore cached analyses and run every agent again")
         generate_button = st.button("Generate Analysis")
         
         with st.expander("ℹ️ How to use"):
@@ -281,13 +350,13 @@ def main():
         progress_bar = st.sidebar.progress(0)
         status_text = st.sidebar.empty()
         
-        agent_outputs = run_analysis(business_type, progress_bar, status_text)
+        agent_outputs = run_analysis(
+            business_type, progress_bar, status_text, max_workers=max_workers, force_refresh=force_refresh
+        )
         
         if agent_outputs:
+            # Sections were rendered while streaming, only record them in the chat history
             for agent_name, output in agent_outputs:
-                with st.chat_message("assistant"):
-                    display_agent_response(agent_name, output)
-                    
                 # Add to chat history
                 st.session_state.chat_history.append({
                     "role": "assistant",
@@ -2,24 +2,33 @@ import streamlit as st
 import pandas as pd
 from phi.agent import Agent
 from phi.model.openai import OpenAIChat
-from phi.tools.googlesearch import GoogleSearch
 from phi.tools.yfinance import YFinanceTools
 from docx import Document
 from docx.shared import Inches, Pt
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from datetime import datetime
 import re
+from functools import partial
 import os
 import base64
 from io import BytesIO
 
-# Initialize agents
-def initialize_agents():
+from agents.agent_pool import copy_agent, get_openai_client
+from agents.response_cache import agent_response_cache
+from agents.research_metrics import ResearchMetrics
+from agents.research_pipeline import ResearchStep, run_research_steps
+from agents.search_broker import BrokeredGoogleSearch, search_broker_scope
+from agents.settings import agent_settings
+from utils.stream_buffer import StreamBuffer
+
+# Build the agent definitions, toolkits and model client once per process
+@st.cache_resource
+def build_agents():
     user_review_agent = Agent(
         name="User Review Analyzer",
         role="Analyze user reviews and feedback from similar products",
-        model=OpenAIChat(id="gpt-4o"),
-        tools=[GoogleSearch()],
+        model=OpenAIChat(id="gpt-4o", client=get_openai_client()),
+        tools=[BrokeredGoogleSearch()],
         instructions=[
             "Search for user reviews of similar products/apps",
             "Identify common pain points and desired features",
@@ -38,8 +47,8 @@ def initialize_agents():
     competitor_analysis_agent = Agent(
         name="Competitor Analysis Expert",
         role="Analyze competing products and their features",
-        model=OpenAIChat(id="gpt-4o"),
-        tools=[GoogleSearch()],
+        model=OpenAIChat(id="gpt-4o", client=get_openai_client()),
+        tools=[BrokeredGoogleSearch()],
         instructions=[
             "Identify top 5 competing products",
             "Compare pricing models and tiers",
@@ -56,8 +65,8 @@ def initialize_agents():
     user_persona_agent = Agent(
         name="User Persona Developer",
         role="Create detailed user personas based on market research",
-        model=OpenAIChat(id="gpt-4o"),
-        tools=[GoogleSearch()],
+        model=OpenAIChat(id="gpt-4o", client=get_openai_client()),
+        tools=[BrokeredGoogleSearch()],
         instructions=[
             "Identify 3-4 key user personas",
             "For each persona include:",
@@ -76,8 +85,8 @@ def initialize_agents():
     feature_pricing_agent = Agent(
         name="Feature & Pricing Strategist",
         role="Analyze desired features and optimal pricing strategies",
-        model=OpenAIChat(id="gpt-4o"),
-        tools=[GoogleSearch()],
+        model=OpenAIChat(id="gpt-4o", client=get_openai_client()),
+        tools=[BrokeredGoogleSearch()],
         instructions=[
             "Analyze most requested features",
             "Recommend feature prioritization",
@@ -94,8 +103,8 @@ def initialize_agents():
     market_fit_agent = Agent(
         name="Product-Market Fit Analyzer",
         role="Evaluate product-market fit and growth opportunities",
-        model=OpenAIChat(id="gpt-4o"),
-        tools=[GoogleSearch()],
+        model=OpenAIChat(id="gpt-4o", client=get_openai_client()),
+        tools=[BrokeredGoogleSearch()],
         instructions=[
             "Analyze market demand signals",
             "Identify underserved user needs",
@@ -111,6 +120,10 @@ def initialize_agents():
     
     return user_review_agent, competitor_analysis_agent, user_persona_agent, feature_pricing_agent, market_fit_agent
 
+def initialize_agents():
+    """Return per-run copies of the cached agents, each with clean memory."""
+    return tuple(copy_agent(agent) for agent in build_agents())
+
 def display_table(df):
     """Display a formatted table using Streamlit."""
     st.dataframe(
@@ -123,30 +136,18 @@ def clean_agent_response(raw_response):
     """Extract clean content from agent response."""
     content = raw_response
     
-    # If content is already clean, return it
-    if not any(prefix in content for prefix in ['content=', '\nRunning:', 'messages=[Message']):
-        return content
+    # If content has no tool call output, return it
+    if '\nRunning:' not in content:
+        return content.strip()
         
     # Extract content between tool execution blocks
-    if "\nRunning:" in content:
-        parts = content.split("\nRunning:")
-        # Get the last part after all tool executions
-        for part in parts:
-            if "\n\n" in part:
-                content = part.split("\n\n", 1)[1]
-    
-    # Remove content= wrapper if present
-    if 'content="' in content:
-        content = content.split('content="')[1].split('"')[0]
+    parts = content.split("\nRunning:")
+    # Get the last part after all tool executions
+    for part in parts:
+        if "\n\n" in part:
+            content = part.split("\n\n", 1)[1]
     
-    # Remove any remaining system messages
-    if "messages=[Message" in content:
-        content = content.split("messages=[Message")[0]
-    
-    # Clean up any remaining special characters and extra whitespace
-    content = content.replace("\\n", "\n").strip()
-    
-    return content
+    return content.strip()
 
 def display_agent_response(agent_name, content):
     """Display the agent response with proper formatting."""
@@ -186,50 +187,110 @@ def display_agent_response(agent_name, content):
     
     st.markdown("---")
 
-def run_analysis(business_type, progress_bar, status_text):
+def render_streaming_section(placeholder, agent_name, content):
+    """Render a partial agent response while it is still streaming."""
+    with placeholder.container():
+        st.subheader(f"🔍 {agent_name}")
+        st.markdown(content)
+
+def display_metrics(metrics):
+    """Show per-agent and per-tool timings in a collapsible panel."""
+    with st.expander("⏱️ Agent performance"):
+        st.caption(f"Total time: {metrics.total_time:.1f}s")
+        st.dataframe(metrics.agent_rows(), use_container_width=True, hide_index=True)
+        tool_rows = metrics.tool_rows()
+        if tool_rows:
+            st.dataframe(tool_rows, use_container_width=True, hide_index=True)
+
+def run_analysis(business_type, progress_bar, status_text, max_workers=None, force_refresh=False):
     user_review_agent, competitor_analysis_agent, user_persona_agent, feature_pricing_agent, market_fit_agent = initialize_agents()
-    
-    agent_outputs = []
-    progress_step = 0.2
-    
-    try:
-        # User Review Analysis
-        status_text.text("Analyzing user reviews...")
-        review_prompt = f"Find and analyze user reviews for apps/products similar to {business_type}"
-        review_response = user_review_agent.run(review_prompt)
-        agent_outputs.append(("User Review Analysis", str(review_response)))
-        progress_bar.progress(progress_step)
 
-        # Competitor Analysis
-        status_text.text("Analyzing competitors...")
-        competitor_prompt = f"Analyze top competing products in the {business_type} space"
-        competitor_response = competitor_analysis_agent.run(competitor_prompt)
-        agent_outputs.append(("Competitor Analysis", str(competitor_response)))
-        progress_bar.progress(progress_step * 2)
+    steps = [
+        ResearchStep(
+            title="User Review Analysis",
+            agent=user_review_agent,
+            prompt=f"Find and analyze user reviews for apps/products similar to {business_type}",
+            status="Analyzing user reviews...",
+            cache_ttl=24 * 60 * 60,
+        ),
+        ResearchStep(
+            title="Competitor Analysis",
+            agent=competitor_analysis_agent,
+            prompt=f"Analyze top competing products in the {business_type} space",
+            status="Analyzing competitors...",
+            cache_ttl=24 * 60 * 60,
+        ),
+        ResearchStep(
+            title="User Personas",
+            agent=user_persona_agent,
+            prompt=f"Create user personas for {business_type} based on market research",
+            status="Developing user personas...",
+            cache_ttl=7 * 24 * 60 * 60,
+        ),
+        ResearchStep(
+            title="Feature & Pricing Analysis",
+            agent=feature_pricing_agent,
+            prompt=f"Analyze desired features and optimal pricing for {business_type}",
+            status="Analyzing features and pricing...",
+            cache_ttl=24 * 60 * 60,
+        ),
+        ResearchStep(
+            title="Product-Market Fit",
+            agent=market_fit_agent,
+            prompt=f"Evaluate product-market fit for {business_type}",
+            status="Evaluating product-market fit...",
+            cache_ttl=7 * 24 * 60 * 60,
+        ),
+    ]
 
-        # User Personas
-        status_text.text("Developing user personas...")
-        persona_prompt = f"Create user personas for {business_type} based on market research"
-        persona_response = user_persona_agent.run(persona_prompt)
-        agent_outputs.append(("User Personas", str(persona_response)))
-        progress_bar.progress(progress_step * 3)
+    running = []
+    completed = []
+    metrics = ResearchMetrics(pipeline="pm_research_streamlit_userresearch", business_type=business_type)
 
-        # Feature & Pricing Analysis
-        status_text.text("Analyzing features and pricing...")
-        pricing_prompt = f"Analyze desired features and optimal pricing for {business_type}"
-        pricing_response = feature_pricing_agent.run(pricing_prompt)
-        agent_outputs.append(("Feature & Pricing Analysis", str(pricing_response)))
-        progress_bar.progress(progress_step * 4)
+    # Reserve a section per agent up front so results stream into a stable order
+    sections = {}
+    for step in steps:
+        with st.chat_message("assistant"):
+            sections[step.title] = st.empty()
+    buffers = {
+        step.title: StreamBuffer(partial(render_streaming_section, sections[step.title], step.title))
+        for step in steps
+    }
+
+    def on_step_start(step):
+        metrics.step_started(step)
+        running.append(step.status)
+        status_text.text("\n".join(running))
+        render_streaming_section(sections[step.title], step.title, f"_{step.status}_")
+
+    def on_step_delta(step, delta):
+        buffers[step.title].append(delta)
+
+    def on_step_complete(step, response):
+        metrics.step_finished(step, response)
+        with sections[step.title].container():
+            display_agent_response(step.title, buffers[step.title].close())
+        running.remove(step.status)
+        completed.append(step.title)
+        progress_bar.progress(len(completed) / len(steps))
+        status_text.text("\n".join(running) if running else f"Finished {step.title}")
+
+    try:
+        # Agents searching for the same thing during this analysis share one request
+        with search_broker_scope():
+            research_sections = run_research_steps(
+                steps,
+                max_workers=max_workers,
+                on_step_start=on_step_start,
+                on_step_delta=on_step_delta,
+                on_step_complete=on_step_complete,
+                cache=agent_response_cache,
+                force_refresh=force_refresh,
+            )
+        metrics.save()
+        display_metrics(metrics)
+        return [(section.title, section.content) for section in research_sections]
 
-        # Product-Market Fit
-        status_text.text("Evaluating product-market fit...")
-        fit_prompt = f"Evaluate product-market fit for {business_type}"
-        fit_response = market_fit_agent.run(fit_prompt)
-        agent_outputs.append(("Product-Market Fit", str(fit_response)))
-        progress_bar.progress(1.0)
-        
-        return agent_outputs
-        
     except Exception as e:
         st.error(f"Error during analysis: {str(e)}")
         return None
@@ -243,6 +304,10 @@ def main():
         st.markdown("---")
         
         business_type = st.text_input("What kind of company do you want to analyze?")
+        max_workers = st.number_input(
+            "Agents to run in parallel", min_value=1, max_value=5, value=agent_settings.research_max_workers
+        )
+        force_refresh = st.checkbox("Force refresh", help="Ignore cached analyses and run every agent again")
         generate_button = st.button("Generate Analysis")
         
         with st.expander("ℹ️ How to use"):
@@ -277,13 +342,13 @@ def main():
         progress_bar = st.sidebar.progress(0)
         status_text = st.sidebar.empty()
         
-        agent_outputs = run_analysis(business_type, progress_bar, status_text)
+        agent_outputs = run_analysis(
+            business_type, progress_bar, status_text, max_workers=max_workers, force_refresh=force_refresh
+        )
         
         if agent_outputs:
+            # Sections were rendered while streaming, only record them in the chat history
             for agent_name, output in agent_outputs:
-                with st.chat_message("assistant"):
-                    display_agent_response(agent_name, output)
-                    
                 # Add to chat history
                 st.session_state.chat_history.append({
                     "role": "assistant",
@@ -0,0 +1,100 @@
+from importlib import import_module
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    from phi.agent import Agent
+
+
+class AgentRegistry:
+    """Agent factories registered by import path, imported and called on first use.
+
+    Importing an agent module pulls in its model client, toolkits, storage and vector db, so
+    servers that import every agent up front pay for all of them before the first request.
+    Registering `"agents.example:get_example_agent"` instead costs nothing until `create_agent`
+    is called for that agent id.
+    """
+
+    def __init__(self) -> None:
+        self._paths: Dict[str, str] = {}
+        self._factories: Dict[str, Callable[..., "Agent"]] = {}
+        self._lock = Lock()
+
+    @property
+    def agent_ids(self) -> List[str]:
+        return list(self._paths)
+
+    def register(self, agent_id: str, factory_path: str) -> None:
+        """Register the factory of an agent.
+
+        Args:
+            agent_id (str): The id of the agents the factory builds.
+            factory_path (str): Where the factory is, as `module:function`.
+        """
+        if ":" not in factory_path:
+            raise ValueError(f"Factory path {factory_path} must look like module:function")
+        self._paths[agent_id] = factory_path
+
+    def get_factory(self, agent_id: str) -> Optional[Callable[..., "Agent"]]:
+        """Return the factory of `agent_id`, importing its module the first time, or None if it is not registered."""
+
+        factory_path = self._paths.get(agent_id)
+        if factory_path is None:
+            return None
+        with self._lock:
+            if agent_id not in self._factories:
+                module_name, function_name = factory_path.split(":", 1)
+                self._factories[agent_id] = getattr(import_module(module_name), function_name)
+            return self._factories[agent_id]
+
+    def create_agent(self, agent_id: str, **kwargs: Any) -> Optional["Agent"]:
+        """Build a new agent with the factory of `agent_id`, or return None if it is not registered."""
+
+        factory = self.get_factory(agent_id)
+        if factory is None:
+            return None
+        return factory(**kwargs)
+
+
+class LazyAgentList(list):
+    """A list of agents that is only built the first time it is read.
+
+    For libraries that take a list of agents up front, like phi's `Playground`, but only read it
+    while handling a request.
+
+    Args:
+        build (Callable[[], List[Agent]]): Returns the agents.
+    """
+
+    def __init__(self, build: Callable[[], List["Agent"]]):
+        super().__init__()
+        self._build: Optional[Callable[[], List["Agent"]]] = build
+        self._lock = Lock()
+
+    def _ensure_built(self) -> None:
+        if self._build is None:
+            return
+        with self._lock:
+            if self._build is not None:
+                super().extend(self._build())
+                self._build = None
+
+    def __iter__(self) -> Iterator["Agent"]:
+        self._ensure_built()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        self._ensure_built()
+        return super().__len__()
+
+    def __getitem__(self, index: Any) -> Any:
+        self._ensure_built()
+        return super().__getitem__(index)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+
+# Every agent the Api serves, by agent id
+agent_registry = AgentRegistry()
+agent_registry.register("example-agent", "agents.example:get_example_agent")
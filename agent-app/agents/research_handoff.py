@@ -0,0 +1,134 @@
+import re
+from typing import List, Sequence, Tuple
+
+# Roughly 4 characters per token for English text with OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+# Longest single finding kept in a digest, longer ones are truncated
+MAX_FACT_CHARS = 240
+# Most sources listed per section
+MAX_SOURCES = 5
+
+URL_PATTERN = re.compile(r"https?://[^\s<>\"'\]\)]+")
+TOOL_CALL_PATTERN = re.compile(r"^\s*Running:\s*\n(?:\s*-\s.*\n?)*", flags=re.MULTILINE)
+LIST_ITEM_PATTERN = re.compile(r"^\s*(?:[-*•+]|\d+[.)])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate used for budgeting, close enough without loading a tokenizer."""
+
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def extract_sources(content: str) -> List[str]:
+    """Return the unique URLs cited in the content, in order of appearance."""
+
+    sources: List[str] = []
+    for url in URL_PATTERN.findall(content):
+        url = url.rstrip(".,;:")
+        if url not in sources:
+            sources.append(url)
+    return sources
+
+
+def _clean_fact(line: str) -> str:
+    fact = LIST_ITEM_PATTERN.sub("", line)
+    fact = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", fact)
+    fact = URL_PATTERN.sub("", fact)
+    fact = fact.replace("**", "").replace("__", "").strip(" |:-")
+    fact = re.sub(r"\s*\|\s*", " | ", fact)
+    fact = re.sub(r"\s+", " ", fact).strip()
+    if len(fact) > MAX_FACT_CHARS:
+        fact = fact[: MAX_FACT_CHARS - 1].rsplit(" ", 1)[0] + "…"
+    return fact
+
+
+def _score_fact(line: str, fact: str) -> int:
+    score = 0
+    if re.search(r"\d", fact):
+        score += 2
+    if re.search(r"[$€£%]", fact):
+        score += 1
+    if LIST_ITEM_PATTERN.match(line) or line.lstrip().startswith("|"):
+        score += 1
+    return score
+
+
+def extract_key_facts(content: str) -> List[Tuple[int, str]]:
+    """Split a section into candidate facts, returned as (score, fact) in document order.
+
+    Bullet points, numbered items and table rows are treated as facts on their own, paragraphs
+    are split into sentences. Facts with figures, amounts and dates score higher.
+    """
+    content = TOOL_CALL_PATTERN.sub("", content)
+    facts: List[Tuple[int, str]] = []
+    seen = set()
+    for line in content.splitlines():
+        stripped = line.strip()
+        # Skip headings, table separators and empty lines
+        if not stripped or stripped.startswith("#") or re.fullmatch(r"[|:\-\s]+", stripped):
+            continue
+        if LIST_ITEM_PATTERN.match(line) or stripped.startswith("|"):
+            candidates = [line]
+        else:
+            candidates = re.split(r"(?<=[.!?])\s+(?=[A-Z])", stripped)
+        for candidate in candidates:
+            fact = _clean_fact(candidate)
+            if len(fact) < 20 or fact.lower() in seen:
+                continue
+            seen.add(fact.lower())
+            facts.append((_score_fact(candidate, fact), fact))
+    return facts
+
+
+def summarize_section(title: str, content: str, max_tokens: int) -> str:
+    """Condense one section into its highest scoring facts and sources within `max_tokens`.
+
+    Returns an empty string if nothing in the section is worth handing on.
+    """
+
+    header = f"## {title}"
+    sources = extract_sources(content)[:MAX_SOURCES]
+    sources_line = f"Sources: {', '.join(sources)}" if sources else ""
+    # Sources are cheap to keep and let downstream agents cite them, but never take more than a quarter
+    if estimate_tokens(sources_line) > max_tokens // 4:
+        sources_line = ""
+
+    budget = max_tokens - estimate_tokens(header) - estimate_tokens(sources_line)
+    facts = extract_key_facts(content)
+    # Pick the best facts first, then put them back in document order
+    ranked = sorted(range(len(facts)), key=lambda i: (-facts[i][0], i))
+    selected: List[int] = []
+    for i in ranked:
+        cost = estimate_tokens(f"- {facts[i][1]}\n")
+        if cost <= budget:
+            selected.append(i)
+            budget -= cost
+
+    if not selected and not sources_line:
+        return ""
+    lines = [header] + [f"- {facts[i][1]}" for i in sorted(selected)]
+    if sources_line:
+        lines.append(sources_line)
+    return "\n".join(lines)
+
+
+def build_handoff_digest(sections: Sequence[Tuple[str, str]], max_tokens: int) -> str:
+    """Build a compact digest of upstream sections to hand to a downstream agent.
+
+    The token budget is shared evenly between the sections, so the digest stays the same size
+    however long the upstream answers are.
+
+    Args:
+        sections (Sequence[Tuple[str, str]]): (title, content) of the upstream sections.
+        max_tokens (int): Approximate token budget for the whole digest.
+    """
+    sections = [(title, content) for title, content in sections if content.strip()]
+    if not sections or max_tokens <= 0:
+        return ""
+
+    section_tokens = max_tokens // len(sections)
+    summaries = [summarize_section(title, content, section_tokens) for title, content in sections]
+    summaries = [summary for summary in summaries if summary]
+    if not summaries:
+        return ""
+    return "Key findings from earlier research:\n\n" + "\n\n".join(summaries)
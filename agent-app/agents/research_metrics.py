@@ -0,0 +1,140 @@
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+from typing import Any, Dict, List, Optional
+
+from phi.agent import RunResponse
+
+from agents.research_pipeline import ResearchStep
+from agents.settings import agent_settings
+from utils.dttm import current_utc_str
+
+
+@dataclass
+class ToolCallMetrics:
+    """Timing for a single tool call made by an agent."""
+
+    step: str
+    tool_name: Optional[str]
+    latency: Optional[float]
+    error: bool = False
+
+
+@dataclass
+class StepMetrics:
+    """Timing and token usage for one agent in a research pipeline."""
+
+    step: str
+    agent_name: Optional[str]
+    model: Optional[str]
+    cached: bool = False
+    queue_time: Optional[float] = None
+    wall_time: Optional[float] = None
+    model_time: float = 0
+    time_to_first_token: Optional[float] = None
+    model_calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tool_time: float = 0
+    tool_calls: List[ToolCallMetrics] = field(default_factory=list)
+
+
+def get_step_metrics(step: ResearchStep, response: RunResponse) -> StepMetrics:
+    """Build the metrics for a finished step from its RunResponse."""
+
+    run_metrics: Dict[str, Any] = response.metrics or {}
+    step_metrics = StepMetrics(
+        step=step.title,
+        agent_name=step.agent.name,
+        model=response.model or (step.agent.model.id if step.agent.model else None),
+        cached=bool(run_metrics.get("cached")),
+    )
+    if step.started_at is not None and step.finished_at is not None:
+        step_metrics.wall_time = step.finished_at - step.started_at
+
+    # Run metrics hold one value per model call
+    model_times = run_metrics.get("time") or []
+    step_metrics.model_calls = len(model_times)
+    step_metrics.model_time = sum(model_times)
+    if run_metrics.get("time_to_first_token"):
+        step_metrics.time_to_first_token = run_metrics["time_to_first_token"][0]
+    step_metrics.prompt_tokens = sum(
+        run_metrics.get("prompt_tokens") or run_metrics.get("input_tokens") or []
+    )
+    step_metrics.completion_tokens = sum(
+        run_metrics.get("completion_tokens") or run_metrics.get("output_tokens") or []
+    )
+
+    for message in response.messages or []:
+        if message.role != "tool":
+            continue
+        latency = (message.metrics or {}).get("time")
+        step_metrics.tool_calls.append(
+            ToolCallMetrics(
+                step=step.title,
+                tool_name=message.tool_name,
+                latency=latency,
+                error=bool(message.tool_call_error),
+            )
+        )
+        step_metrics.tool_time += latency or 0
+    return step_metrics
+
+
+class ResearchMetrics:
+    """Collects per-agent and per-tool timings for one research pipeline run.
+
+    Hook `step_started` and `step_finished` into the `run_research_steps` callbacks, then
+    call `save` to append the results to a JSONL file for offline analysis.
+    """
+
+    _file_lock = Lock()
+
+    def __init__(self, pipeline: str, business_type: str):
+        self.pipeline = pipeline
+        self.business_type = business_type
+        self.steps: List[StepMetrics] = []
+        self._started_at = perf_counter()
+        self._submitted_at: Dict[str, float] = {}
+        self.total_time: float = 0
+
+    def step_started(self, step: ResearchStep) -> None:
+        self._submitted_at[step.title] = perf_counter()
+
+    def step_finished(self, step: ResearchStep, response: RunResponse) -> None:
+        step_metrics = get_step_metrics(step, response)
+        if step.title in self._submitted_at and step.started_at is not None:
+            step_metrics.queue_time = max(0.0, step.started_at - self._submitted_at[step.title])
+        self.steps.append(step_metrics)
+        self.total_time = perf_counter() - self._started_at
+
+    def agent_rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for step_metrics in self.steps:
+            row = asdict(step_metrics)
+            row["tool_calls"] = len(step_metrics.tool_calls)
+            rows.append(row)
+        return rows
+
+    def tool_rows(self) -> List[Dict[str, Any]]:
+        return [asdict(tool_call) for step_metrics in self.steps for tool_call in step_metrics.tool_calls]
+
+    def save(self, metrics_file: Optional[str] = None) -> None:
+        """Append one JSON record per step to the metrics file."""
+
+        path = Path(metrics_file or agent_settings.research_metrics_file)
+        timestamp = current_utc_str()
+        with self._file_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with path.open("a", encoding="utf-8") as f:
+                for step_metrics in self.steps:
+                    record = {
+                        "timestamp": timestamp,
+                        "pipeline": self.pipeline,
+                        "business_type": self.business_type,
+                        "total_time": self.total_time,
+                        **asdict(step_metrics),
+                    }
+                    f.write(json.dumps(record) + "\n")
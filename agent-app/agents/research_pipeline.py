@@ -0,0 +1,251 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from dataclasses import dataclass, field
+from time import perf_counter
+from queue import Empty, Queue
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from phi.agent import Agent, RunResponse
+from phi.utils.log import logger
+
+from agents.research_handoff import build_handoff_digest
+from agents.response_cache import ResponseCache, cached_run
+from agents.settings import agent_settings
+
+
+@dataclass
+class ResearchStep:
+    """A single agent run in a research pipeline.
+
+    Args:
+        title (str): Section title, also used to reference the step from `depends_on`.
+        agent (Agent): The agent that produces this section.
+        prompt (str): The prompt sent to the agent.
+        status (str): Status message shown while the step is running.
+        depends_on (Tuple[str, ...]): Titles of the steps that must finish before this one starts.
+        cache_ttl (Optional[int]): Seconds to keep this step's response in the response cache.
+        handoff_tokens (Optional[int]): Token budget for the digest of the `depends_on` sections
+            added to the prompt. Defaults to `agent_settings.research_handoff_tokens`, 0 disables it.
+
+    `context` holds that digest once the dependencies have finished. `started_at` and
+    `finished_at` are set by the worker running the step (perf_counter seconds).
+    """
+
+    title: str
+    agent: Agent
+    prompt: str
+    status: str
+    depends_on: Tuple[str, ...] = ()
+    cache_ttl: Optional[int] = None
+    handoff_tokens: Optional[int] = None
+    context: Optional[str] = field(default=None, init=False)
+    started_at: Optional[float] = field(default=None, init=False)
+    finished_at: Optional[float] = field(default=None, init=False)
+
+    def get_prompt(self) -> str:
+        """Return the prompt sent to the agent, prefixed with the upstream digest if there is one."""
+
+        if self.context:
+            return f"{self.context}\n\n{self.prompt}"
+        return self.prompt
+
+
+@dataclass
+class ResearchSection:
+    """The finished output of a step: its content and the metadata the research apps use.
+
+    The full RunResponse, with its messages and tool payloads, is only handed to
+    `on_step_complete` and is not kept once the step has finished.
+    """
+
+    title: str
+    content: str
+    model: Optional[str] = None
+    cached: bool = False
+
+    @classmethod
+    def from_response(cls, title: str, response: RunResponse) -> "ResearchSection":
+        return cls(
+            title=title,
+            content=response.get_content_as_string() if response.content is not None else "",
+            model=response.model,
+            cached=bool((response.metrics or {}).get("cached")),
+        )
+
+
+def validate_steps(steps: List[ResearchStep]) -> None:
+    """Raise a ValueError if the steps do not form a valid dependency graph."""
+
+    titles = [step.title for step in steps]
+    if len(set(titles)) != len(titles):
+        raise ValueError(f"Duplicate research step titles: {titles}")
+
+    for step in steps:
+        for dependency in step.depends_on:
+            if dependency not in titles:
+                raise ValueError(f"Step '{step.title}' depends on unknown step '{dependency}'")
+
+    # Kahn's algorithm: if we cannot resolve every step, there is a cycle
+    resolved: Set[str] = set()
+    remaining = list(steps)
+    while remaining:
+        ready = [step for step in remaining if all(d in resolved for d in step.depends_on)]
+        if not ready:
+            raise ValueError(f"Circular dependency between steps: {[step.title for step in remaining]}")
+        resolved.update(step.title for step in ready)
+        remaining = [step for step in remaining if step.title not in resolved]
+
+
+def get_handoff_context(step: ResearchStep, sections: Dict[str, ResearchSection]) -> Optional[str]:
+    """Return the digest of the sections `step` depends on, or None if it has no dependencies."""
+
+    max_tokens = step.handoff_tokens
+    if max_tokens is None:
+        max_tokens = agent_settings.research_handoff_tokens
+    if not step.depends_on or max_tokens <= 0:
+        return None
+    digest = build_handoff_digest(
+        [(title, sections[title].content) for title in step.depends_on], max_tokens=max_tokens
+    )
+    return digest or None
+
+
+def run_step(
+    step: ResearchStep,
+    deltas: Optional[Queue] = None,
+    cache: Optional[ResponseCache] = None,
+    force_refresh: bool = False,
+) -> RunResponse:
+    """Run a single step. When a queue is given the agent is streamed and every
+    content delta is put on the queue as a (step, delta) tuple."""
+
+    step.started_at = perf_counter()
+    try:
+        return _run_step(step, deltas, cache, force_refresh)
+    finally:
+        step.finished_at = perf_counter()
+
+
+def _run_step(
+    step: ResearchStep,
+    deltas: Optional[Queue],
+    cache: Optional[ResponseCache],
+    force_refresh: bool,
+) -> RunResponse:
+    prompt = step.get_prompt()
+    if deltas is None:
+        return cached_run(step.agent, prompt, cache, ttl=step.cache_ttl, force_refresh=force_refresh)
+
+    if cache is not None and not force_refresh:
+        cached_content = cache.get(step.agent, prompt)
+        if cached_content is not None:
+            deltas.put((step, cached_content))
+            return RunResponse(
+                content=cached_content,
+                model=step.agent.model.id if step.agent.model else None,
+                agent_id=step.agent.agent_id,
+                metrics={"cached": True},
+            )
+
+    for chunk in step.agent.run(prompt, stream=True):
+        if chunk.content:
+            deltas.put((step, chunk.content))
+    response: RunResponse = step.agent.run_response
+    if cache is not None and isinstance(response.content, str) and response.content:
+        cache.set(step.agent, prompt, response.content, ttl=step.cache_ttl)
+    return response
+
+
+def run_research_steps(
+    steps: List[ResearchStep],
+    max_workers: Optional[int] = None,
+    on_step_start: Optional[Callable[[ResearchStep], None]] = None,
+    on_step_delta: Optional[Callable[[ResearchStep, str], None]] = None,
+    on_step_complete: Optional[Callable[[ResearchStep, RunResponse], None]] = None,
+    cache: Optional[ResponseCache] = None,
+    force_refresh: bool = False,
+    completed: Optional[Dict[str, str]] = None,
+    poll_interval: float = 0.05,
+) -> List[ResearchSection]:
+    """Run the research steps on a bounded thread pool, respecting dependencies.
+
+    Independent steps run concurrently, so total latency is close to the longest dependency
+    chain instead of the sum of all steps. Callbacks are invoked on the calling thread, which
+    keeps them safe for Streamlit elements. A step with dependencies receives a token-budgeted
+    digest of their sections ahead of its prompt, rather than their full output. Steps run in a copy of the caller's context, so
+    context variables such as the current search broker are visible to their tools.
+
+    Args:
+        steps (List[ResearchStep]): The steps to run.
+        max_workers (Optional[int]): Maximum number of agents running at once.
+            Defaults to `agent_settings.research_max_workers`.
+        on_step_start (Optional[Callable]): Called when a step is submitted.
+        on_step_delta (Optional[Callable]): Called with each content delta as it arrives.
+            Setting this runs the agents in streaming mode.
+        on_step_complete (Optional[Callable]): Called with the response when a step finishes.
+            All deltas of a step are delivered before its completion callback.
+        cache (Optional[ResponseCache]): Serve and store responses using this cache.
+        force_refresh (bool): Ignore cached responses and replace them with fresh ones.
+        completed (Optional[Dict[str, str]]): Content of steps that already finished, by title,
+            for example restored from a checkpoint. These steps are not run again.
+        poll_interval (float): Seconds to wait for new deltas before checking for finished steps.
+
+    Returns:
+        List[ResearchSection]: One section per step, in the order the steps were given.
+    """
+    validate_steps(steps)
+    max_workers = max(1, max_workers or agent_settings.research_max_workers)
+
+    sections: Dict[str, ResearchSection] = {
+        title: ResearchSection(title=title, content=content) for title, content in (completed or {}).items()
+    }
+    pending: List[ResearchStep] = [step for step in steps if step.title not in sections]
+    running: Dict[Future, ResearchStep] = {}
+    deltas: Optional[Queue] = Queue() if on_step_delta is not None else None
+
+    def drain_deltas(timeout: Optional[float] = None) -> None:
+        if deltas is None or on_step_delta is None:
+            return
+        try:
+            step, delta = deltas.get(timeout=timeout) if timeout else deltas.get_nowait()
+            on_step_delta(step, delta)
+            while True:
+                step, delta = deltas.get_nowait()
+                on_step_delta(step, delta)
+        except Empty:
+            pass
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="research")
+    try:
+        while pending or running:
+            # Submit every step whose dependencies have completed
+            ready = [step for step in pending if all(d in sections for d in step.depends_on)]
+            for step in ready:
+                pending.remove(step)
+                step.context = get_handoff_context(step, sections)
+                logger.debug(f"Starting research step: {step.title}")
+                if on_step_start is not None:
+                    on_step_start(step)
+                future = executor.submit(copy_context().run, run_step, step, deltas, cache, force_refresh)
+                running[future] = step
+
+            if deltas is None:
+                wait(running, return_when=FIRST_COMPLETED)
+            else:
+                drain_deltas(timeout=poll_interval)
+
+            # A finished step has already queued all of its deltas, so drain them before completing it
+            done = [future for future in running if future.done()]
+            drain_deltas()
+            for future in done:
+                step = running.pop(future)
+                response: RunResponse = future.result()
+                sections[step.title] = ResearchSection.from_response(step.title, response)
+                logger.debug(f"Finished research step: {step.title}")
+                if on_step_complete is not None:
+                    on_step_complete(step, response)
+    finally:
+        # Do not wait for, or start, the remaining steps if one of them failed
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    return [sections[step.title] for step in steps]
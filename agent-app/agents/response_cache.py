@@ -0,0 +1,191 @@
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from hashlib import sha256
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional
+
+from phi.agent import Agent, Function, RunResponse, Toolkit
+from phi.utils.log import logger
+
+from agents.settings import agent_settings
+
+
+def describe_tools(agent: Agent) -> List[Any]:
+    """Return a JSON serializable description of the agent's tools."""
+
+    tools: List[Any] = []
+    for tool in agent.tools or []:
+        if isinstance(tool, Toolkit):
+            tools.append({"toolkit": tool.name, "functions": sorted(tool.functions.keys())})
+        elif isinstance(tool, Function):
+            tools.append({"function": tool.name})
+        elif isinstance(tool, dict):
+            tools.append(tool)
+        elif callable(tool):
+            tools.append({"function": getattr(tool, "__name__", str(tool))})
+        else:
+            tools.append(str(tool))
+    return tools
+
+
+def get_agent_config(agent: Agent) -> Dict[str, Any]:
+    """Everything about an agent that changes its answers: model, instructions and tools."""
+
+    return {
+        "model": {
+            "provider": agent.model.provider if agent.model else None,
+            "id": agent.model.id if agent.model else None,
+        },
+        "instructions": agent.instructions,
+        "tools": describe_tools(agent),
+    }
+
+
+def get_cache_key(agent: Agent, prompt: str) -> str:
+    """Hash everything that changes an agent's answer: model, instructions, tools and the prompt."""
+
+    key_data: Dict[str, Any] = {**get_agent_config(agent), "prompt": prompt}
+    return sha256(json.dumps(key_data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def get_agent_config_key(agent: Agent) -> str:
+    """Hash of `get_agent_config`, identifies answers that were given by an identically configured agent."""
+
+    return sha256(json.dumps(get_agent_config(agent), sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Persistent cache of agent responses stored in SQLite.
+
+    Entries expire after a per-entry TTL and the cache is bounded to `max_entries`,
+    evicting the least recently used entries first.
+
+    Args:
+        db_file (str): Path to the SQLite database file.
+        max_entries (int): Maximum number of responses to keep.
+        default_ttl (int): TTL in seconds used when `set` is called without one.
+    """
+
+    def __init__(self, db_file: str, max_entries: int = 500, default_ttl: int = 86400):
+        self.db_file = db_file
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._lock = Lock()
+        self._table_created = False
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        if not self._table_created:
+            Path(self.db_file).parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.db_file)
+        if not self._table_created:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS agent_responses (
+                    cache_key TEXT PRIMARY KEY,
+                    agent_name TEXT,
+                    content TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_accessed_at REAL NOT NULL
+                )
+                """
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS idx_agent_responses_last_accessed ON agent_responses (last_accessed_at)"
+            )
+            self._table_created = True
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, agent: Agent, prompt: str) -> Optional[str]:
+        """Return the cached response content, or None if missing or expired."""
+
+        cache_key = get_cache_key(agent, prompt)
+        now = time.time()
+        with self._lock, self._connect() as connection:
+            row = connection.execute(
+                "SELECT content, expires_at FROM agent_responses WHERE cache_key = ?", (cache_key,)
+            ).fetchone()
+            if row is None:
+                return None
+            content, expires_at = row
+            if expires_at <= now:
+                connection.execute("DELETE FROM agent_responses WHERE cache_key = ?", (cache_key,))
+                return None
+            connection.execute(
+                "UPDATE agent_responses SET last_accessed_at = ? WHERE cache_key = ?", (now, cache_key)
+            )
+        logger.debug(f"Response cache hit for {agent.name}")
+        return content
+
+    def set(self, agent: Agent, prompt: str, content: str, ttl: Optional[int] = None) -> None:
+        """Store a response and evict the least recently used entries above `max_entries`."""
+
+        cache_key = get_cache_key(agent, prompt)
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.default_ttl)
+        with self._lock, self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO agent_responses VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key, agent.name, content, now, expires_at, now),
+            )
+            connection.execute("DELETE FROM agent_responses WHERE expires_at <= ?", (now,))
+            connection.execute(
+                """
+                DELETE FROM agent_responses WHERE cache_key IN (
+                    SELECT cache_key FROM agent_responses ORDER BY last_accessed_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connect() as connection:
+            connection.execute("DELETE FROM agent_responses")
+
+
+def cached_run(
+    agent: Agent,
+    prompt: str,
+    cache: Optional[ResponseCache],
+    ttl: Optional[int] = None,
+    force_refresh: bool = False,
+) -> RunResponse:
+    """Run the agent, serving the response from the cache when possible.
+
+    Args:
+        agent (Agent): The agent to run.
+        prompt (str): The prompt for the agent.
+        cache (Optional[ResponseCache]): The cache to use, None disables caching.
+        ttl (Optional[int]): TTL in seconds for the stored response.
+        force_refresh (bool): Ignore any cached response and store the fresh one.
+    """
+    if cache is not None and not force_refresh:
+        cached_content = cache.get(agent, prompt)
+        if cached_content is not None:
+            return RunResponse(
+                content=cached_content,
+                model=agent.model.id if agent.model else None,
+                agent_id=agent.agent_id,
+                metrics={"cached": True},
+            )
+
+    response: RunResponse = agent.run(prompt)
+    if cache is not None and isinstance(response.content, str) and response.content:
+        cache.set(agent, prompt, response.content, ttl=ttl)
+    return response
+
+
+# Cache shared by the research pipelines
+agent_response_cache = ResponseCache(
+    db_file=agent_settings.response_cache_file,
+    max_entries=agent_settings.response_cache_max_entries,
+    default_ttl=agent_settings.response_cache_ttl,
+)
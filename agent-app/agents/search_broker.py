@@ -0,0 +1,123 @@
+import re
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from phi.tools.googlesearch import GoogleSearch
+from phi.utils.log import logger
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings share one result."""
+
+    query = query.lower().strip().strip("\"'")
+    query = re.sub(r"[?!.,;:]+$", "", query)
+    return re.sub(r"\s+", " ", query).strip()
+
+
+class SearchFailed(Exception):
+    """A search that returned an error message instead of results."""
+
+
+def is_error_result(result: str) -> bool:
+    """Whether a search toolkit returned an error message, which is worth retrying later."""
+
+    return result.lstrip().lower().startswith("error")
+
+
+class SearchBroker:
+    """Run-scoped single-flight de-duplication of search calls.
+
+    Identical (normalized) queries issued while one is in flight wait for that request instead of
+    sending their own, and completed results are served from memory for the rest of the run.
+    Failed searches, including ones that return an error message, are not remembered, so a later
+    call can retry them.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._results: Dict[Tuple, Future] = {}
+        self.requests = 0
+        self.hits = 0
+
+    def search(self, key: Tuple, search_function: Callable[[], str]) -> str:
+        with self._lock:
+            self.requests += 1
+            existing = self._results.get(key)
+            if existing is None:
+                future: Future = Future()
+                self._results[key] = future
+            else:
+                self.hits += 1
+
+        if existing is not None:
+            logger.debug(f"Search broker hit: {key}")
+            try:
+                return existing.result()
+            except SearchFailed as e:
+                return str(e)
+
+        try:
+            result = search_function()
+        except Exception as e:
+            self._fail(key, future, e)
+            raise
+        if is_error_result(result):
+            # Waiting callers get the message too, later callers search again
+            self._fail(key, future, SearchFailed(result))
+        else:
+            future.set_result(result)
+        return result
+
+    def _fail(self, key: Tuple, future: Future, error: Exception) -> None:
+        with self._lock:
+            self._results.pop(key, None)
+        future.set_exception(error)
+
+
+current_search_broker: ContextVar[Optional[SearchBroker]] = ContextVar("current_search_broker", default=None)
+
+
+@contextmanager
+def search_broker_scope() -> Iterator[SearchBroker]:
+    """Share one SearchBroker between every brokered search toolkit used inside this block."""
+
+    broker = SearchBroker()
+    token = current_search_broker.set(broker)
+    try:
+        yield broker
+    finally:
+        current_search_broker.reset(token)
+        logger.debug(f"Search broker served {broker.hits} of {broker.requests} searches from memory")
+
+
+class BrokeredGoogleSearch(GoogleSearch):
+    """GoogleSearch that routes queries through the current SearchBroker, if there is one."""
+
+    def google_search(self, query: str, max_results: int = 5, language: str = "en") -> str:
+        """
+        Use this function to search Google for a specified query.
+
+        Args:
+            query (str): The query to search for.
+            max_results (int, optional): The maximum number of results to return. Default is 5.
+            language (str, optional): The language of the search results. Default is "en".
+
+        Returns:
+            str: A JSON formatted string containing the search results.
+        """
+        broker = current_search_broker.get()
+        if broker is None:
+            return super().google_search(query, max_results=max_results, language=language)
+
+        key = (
+            "google",
+            normalize_query(query),
+            self.fixed_max_results or max_results,
+            (self.fixed_language or language).lower(),
+        )
+        return broker.search(
+            key, lambda: super(BrokeredGoogleSearch, self).google_search(query, max_results, language)
+        )
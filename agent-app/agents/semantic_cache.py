@@ -0,0 +1,188 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Callable, List, Optional
+from uuid import uuid4
+
+from phi.agent import Agent, Message, RunResponse
+from phi.memory.agent import AgentChat
+from phi.embedder.base import Embedder
+from phi.utils.log import logger
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from agents.embedding_cache import normalize_text
+from agents.response_cache import get_agent_config_key
+from db.tables import SemanticCacheEntry
+
+
+@dataclass
+class SemanticCacheMatch:
+    """A cached answer to a prompt similar to the one asked."""
+
+    content: str
+    # The prompt the answer was given to
+    prompt: str
+    # Cosine similarity of the two prompts, 1 for the same meaning
+    similarity: float
+
+
+class SemanticResponseCache:
+    """Agent answers stored in Postgres and found again by the meaning of the prompt.
+
+    Prompts are embedded and looked up by cosine distance in the `semantic_response_cache`
+    table, so a rephrased question is answered without running the agent. Lookups only see
+    answers given by the same agent, for the same user, with the same model, instructions and
+    tools. Answers expire after `ttl` seconds and should be dropped with `invalidate` whenever
+    the knowledge base changes. Database and embedding errors are logged and treated as misses.
+
+    Args:
+        session_factory (Callable[[], Session]): Creates database sessions, for example `SessionLocal`.
+        embedder (Embedder): Embeds prompts, must return vectors of `SEMANTIC_CACHE_DIMENSIONS`.
+        threshold (float): Minimum cosine similarity for a cached answer to be served.
+        ttl (int): Seconds an answer is served for.
+        max_recent_embeddings (int): Prompt embeddings kept in memory, so a miss followed by `set`
+            embeds the prompt once.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        embedder: Embedder,
+        threshold: float = 0.95,
+        ttl: int = 3600,
+        max_recent_embeddings: int = 128,
+    ):
+        self.session_factory = session_factory
+        self.embedder = embedder
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_recent_embeddings = max_recent_embeddings
+        self._recent_embeddings: OrderedDict[str, List[float]] = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def embedding_model(self) -> str:
+        # Prompts embedded by another model, or at another size, are not comparable
+        model = getattr(self.embedder, "model", self.embedder.__class__.__name__)
+        return f"{model}:{self.embedder.dimensions}"
+
+    def get(self, agent: Agent, prompt: str) -> Optional[SemanticCacheMatch]:
+        """Return the cached answer to the most similar prompt, or None if none is similar enough."""
+
+        if agent.agent_id is None:
+            return None
+        embedding = self._embed(prompt)
+        if embedding is None:
+            return None
+
+        distance = SemanticCacheEntry.embedding.cosine_distance(embedding)
+        try:
+            with self.session_factory() as session:
+                row = session.execute(
+                    select(SemanticCacheEntry.content, SemanticCacheEntry.prompt, distance.label("distance"))
+                    .where(
+                        SemanticCacheEntry.agent_id == agent.agent_id,
+                        SemanticCacheEntry.user_id.is_not_distinct_from(agent.user_id),
+                        SemanticCacheEntry.agent_config_key == get_agent_config_key(agent),
+                        SemanticCacheEntry.embedding_model == self.embedding_model,
+                        SemanticCacheEntry.expires_at > datetime.now(timezone.utc),
+                    )
+                    .order_by(distance)
+                    .limit(1)
+                ).first()
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not read the semantic response cache: {e}")
+            return None
+
+        if row is None:
+            return None
+        similarity = 1 - float(row.distance)
+        if similarity < self.threshold:
+            logger.debug(f"Closest cached prompt for {agent.name} has similarity {similarity:.3f}")
+            return None
+        logger.debug(f"Semantic cache hit for {agent.name} with similarity {similarity:.3f}")
+        return SemanticCacheMatch(content=row.content, prompt=row.prompt, similarity=similarity)
+
+    def set(self, agent: Agent, prompt: str, content: str) -> None:
+        """Store the agent's answer to `prompt`, and drop answers that have expired."""
+
+        if agent.agent_id is None or not content:
+            return
+        embedding = self._embed(prompt)
+        if embedding is None:
+            return
+
+        now = datetime.now(timezone.utc)
+        try:
+            with self.session_factory() as session, session.begin():
+                session.add(
+                    SemanticCacheEntry(
+                        id=str(uuid4()),
+                        agent_id=agent.agent_id,
+                        user_id=agent.user_id,
+                        agent_config_key=get_agent_config_key(agent),
+                        embedding_model=self.embedding_model,
+                        embedding=embedding,
+                        prompt=prompt,
+                        content=content,
+                        expires_at=now + timedelta(seconds=self.ttl),
+                    )
+                )
+                session.execute(delete(SemanticCacheEntry).where(SemanticCacheEntry.expires_at <= now))
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not store the answer in the semantic response cache: {e}")
+
+    def invalidate(self, agent_id: Optional[str] = None) -> None:
+        """Drop every cached answer of `agent_id`, or of every agent if it is None."""
+
+        stmt = delete(SemanticCacheEntry)
+        if agent_id is not None:
+            stmt = stmt.where(SemanticCacheEntry.agent_id == agent_id)
+        try:
+            with self.session_factory() as session, session.begin():
+                session.execute(stmt)
+        except SQLAlchemyError as e:
+            logger.warning(f"Could not clear the semantic response cache: {e}")
+
+    def _embed(self, prompt: str) -> Optional[List[float]]:
+        key = normalize_text(prompt)
+        with self._lock:
+            if key in self._recent_embeddings:
+                self._recent_embeddings.move_to_end(key)
+                return self._recent_embeddings[key]
+        try:
+            embedding = self.embedder.get_embedding(key)
+        except Exception as e:
+            logger.warning(f"Could not embed the prompt for the semantic response cache: {e}")
+            return None
+        if not embedding:
+            return None
+        with self._lock:
+            self._recent_embeddings[key] = embedding
+            while len(self._recent_embeddings) > self.max_recent_embeddings:
+                self._recent_embeddings.popitem(last=False)
+        return embedding
+
+
+def record_cached_answer(agent: Agent, prompt: str, match: SemanticCacheMatch) -> RunResponse:
+    """Add a cached exchange to the agent's memory and storage, as if the agent had answered it.
+
+    Follow-up questions in the session then see the cached answer in the chat history.
+    """
+    user_message = Message(role=agent.user_message_role, content=prompt)
+    assistant_message = Message(role="assistant", content=match.content)
+    response = RunResponse(
+        content=match.content,
+        model=agent.model.id if agent.model else None,
+        agent_id=agent.agent_id,
+        session_id=agent.session_id,
+        messages=[user_message, assistant_message],
+        metrics={"cached": True, "similarity": match.similarity},
+    )
+    agent.memory.add_messages([user_message, assistant_message])
+    agent.memory.add_chat(AgentChat(message=user_message, response=response))
+    agent.write_to_storage()
+    return response
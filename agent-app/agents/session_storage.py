@@ -0,0 +1,235 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Any, List, Optional, Sequence, Tuple
+
+from phi.agent.session import AgentSession
+from phi.storage.agent.postgres import PgAgentStorage
+from phi.utils.log import logger
+from sqlalchemy import Row, Select, func, or_, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from agents.settings import agent_settings
+
+
+@dataclass
+class SessionSummary:
+    """What a session picker needs to know about a session, without its memory."""
+
+    session_id: str
+    name: Optional[str] = None
+    created_at: Optional[int] = None
+    updated_at: Optional[int] = None
+
+    @property
+    def last_active_at(self) -> Optional[int]:
+        return self.updated_at or self.created_at
+
+
+@dataclass
+class SessionPage:
+    sessions: List[SessionSummary] = field(default_factory=list)
+    offset: int = 0
+    has_more: bool = False
+
+
+class PaginatedPgAgentStorage(PgAgentStorage):
+    """PgAgentStorage that lists sessions a page at a time, most recently active first.
+
+    `get_all_session_ids` reads every row of the table, memory included. `list_sessions` only
+    reads the columns a picker shows, filtered by user and agent, and is served by an index on
+    (user_id, agent_id, last activity), which is created the first time sessions are listed.
+    Pages are cached for `cache_ttl` seconds, at most `cache_max_entries` of them; saving a
+    session clears the cache of its user.
+
+    Args:
+        async_db_engine (Optional[AsyncEngine]): Engine used by `alist_sessions`.
+        cache_ttl (Optional[float]): Seconds a listed page is reused.
+        cache_max_entries (Optional[int]): Pages kept in the cache, the oldest are dropped first.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        async_db_engine: Optional[AsyncEngine] = None,
+        cache_ttl: Optional[float] = None,
+        cache_max_entries: Optional[int] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self.async_db_engine = async_db_engine
+        self.cache_ttl: float = agent_settings.session_list_cache_ttl if cache_ttl is None else cache_ttl
+        self.cache_max_entries: int = (
+            agent_settings.session_list_cache_max_entries if cache_max_entries is None else cache_max_entries
+        )
+        # Ordered by when each page was cached, which is also the order they expire in
+        self._cache: OrderedDict[Tuple[Any, ...], Tuple[float, SessionPage]] = OrderedDict()
+        self._cache_lock = Lock()
+        self._index_created = False
+
+    def create_list_index(self) -> None:
+        """Create the index used by `list_sessions`, if the table does not have it yet."""
+
+        self.create()
+        with self.Session() as sess, sess.begin():
+            sess.execute(
+                text(
+                    f"CREATE INDEX IF NOT EXISTS idx_{self.table_name}_user_agent_last_active "
+                    f"ON {self.table.fullname} (user_id, agent_id, (COALESCE(updated_at, created_at)) DESC)"
+                )
+            )
+        self._index_created = True
+
+    def list_sessions(
+        self,
+        user_id: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> SessionPage:
+        """Return one page of sessions, most recently active first.
+
+        Args:
+            user_id (Optional[str]): Only list the sessions of this user.
+            agent_id (Optional[str]): Only list the sessions of this agent.
+            search (Optional[str]): Only list sessions whose id or name contains this text.
+            limit (Optional[int]): Sessions per page.
+            offset (int): Number of sessions to skip.
+        """
+        limit = limit or agent_settings.session_list_page_size
+        search = search.strip() if search else None
+        key = (user_id, agent_id, search, limit, offset)
+        cached = self._get_cached_page(key)
+        if cached is not None:
+            return cached
+
+        try:
+            if not self._index_created:
+                self.create_list_index()
+            with self.Session() as sess:
+                rows = sess.execute(
+                    self._get_list_statement(user_id, agent_id, search, limit, offset)
+                ).fetchall()
+        except SQLAlchemyError as e:
+            logger.debug(f"Could not list sessions from {self.table.fullname}: {e}")
+            return SessionPage(offset=offset)
+        return self._cache_page(key, self._get_page(rows, limit, offset))
+
+    async def alist_sessions(
+        self,
+        user_id: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        search: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> SessionPage:
+        """Async version of `list_sessions`, queries through `async_db_engine` without blocking a thread."""
+
+        if self.async_db_engine is None:
+            return await asyncio.to_thread(self.list_sessions, user_id, agent_id, search, limit, offset)
+
+        limit = limit or agent_settings.session_list_page_size
+        search = search.strip() if search else None
+        key = (user_id, agent_id, search, limit, offset)
+        cached = self._get_cached_page(key)
+        if cached is not None:
+            return cached
+
+        try:
+            if not self._index_created:
+                # Runs once per process
+                await asyncio.to_thread(self.create_list_index)
+            async with self.async_db_engine.connect() as connection:
+                result = await connection.execute(
+                    self._get_list_statement(user_id, agent_id, search, limit, offset)
+                )
+                rows = result.fetchall()
+        except SQLAlchemyError as e:
+            logger.debug(f"Could not list sessions from {self.table.fullname}: {e}")
+            return SessionPage(offset=offset)
+        return self._cache_page(key, self._get_page(rows, limit, offset))
+
+    def _get_list_statement(
+        self, user_id: Optional[str], agent_id: Optional[str], search: Optional[str], limit: int, offset: int
+    ) -> Select:
+        name = self.table.c.session_data["session_name"].astext
+        stmt = select(
+            self.table.c.session_id, name.label("name"), self.table.c.created_at, self.table.c.updated_at
+        )
+        if user_id is not None:
+            stmt = stmt.where(self.table.c.user_id == user_id)
+        if agent_id is not None:
+            stmt = stmt.where(self.table.c.agent_id == agent_id)
+        if search:
+            pattern = f"%{search}%"
+            stmt = stmt.where(or_(self.table.c.session_id.ilike(pattern), name.ilike(pattern)))
+        # One extra row tells whether there is a next page, without counting every session
+        return (
+            stmt.order_by(
+                func.coalesce(self.table.c.updated_at, self.table.c.created_at).desc(),
+                self.table.c.session_id,
+            )
+            .limit(limit + 1)
+            .offset(offset)
+        )
+
+    @staticmethod
+    def _get_page(rows: Sequence[Row], limit: int, offset: int) -> SessionPage:
+        return SessionPage(
+            sessions=[
+                SessionSummary(
+                    session_id=row.session_id,
+                    name=row.name,
+                    created_at=row.created_at,
+                    updated_at=row.updated_at,
+                )
+                for row in rows[:limit]
+            ],
+            offset=offset,
+            has_more=len(rows) > limit,
+        )
+
+    def _get_cached_page(self, key: Tuple[Any, ...]) -> Optional[SessionPage]:
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is None:
+                return None
+            if time.monotonic() - cached[0] >= self.cache_ttl:
+                del self._cache[key]
+                return None
+        return cached[1]
+
+    def _cache_page(self, key: Tuple[Any, ...], page: SessionPage) -> SessionPage:
+        now = time.monotonic()
+        with self._cache_lock:
+            self._cache[key] = (now, page)
+            self._cache.move_to_end(key)
+            # Searches make a new key each, drop expired pages and keep the cache bounded
+            while self._cache:
+                cached_at, _ = next(iter(self._cache.values()))
+                if now - cached_at < self.cache_ttl and len(self._cache) <= self.cache_max_entries:
+                    break
+                self._cache.popitem(last=False)
+        return page
+
+    def clear_list_cache(self, user_id: Optional[str] = None) -> None:
+        """Forget the cached pages that can include sessions of `user_id`, or every page if it is None."""
+
+        with self._cache_lock:
+            if user_id is None:
+                self._cache.clear()
+            else:
+                # Pages listed without a user filter include every user's sessions
+                self._cache = OrderedDict(
+                    (key, value) for key, value in self._cache.items() if key[0] not in (user_id, None)
+                )
+
+    def upsert(self, session: AgentSession, create_and_retry: bool = True) -> Optional[AgentSession]:
+        saved = super().upsert(session, create_and_retry=create_and_retry)
+        # Saving changes the order of the user's sessions, and may add one
+        self.clear_list_cache(session.user_id)
+        return saved
@@ -1,3 +1,5 @@
+from typing import Dict
+
 from pydantic_settings import BaseSettings
 
 
@@ -11,6 +13,46 @@ class AgentSettings(BaseSettings):
     embedding_model: str = "text-embedding-3-small"
     default_max_completion_tokens: int = 16000
     default_temperature: float = 0
+    # Maximum number of research agents that run at the same time
+    research_max_workers: int = 3
+    # Approximate token budget for the digest of upstream sections passed to a dependent research agent
+    research_handoff_tokens: int = 800
+    # Persistent cache for agent responses
+    response_cache_file: str = "tmp/agent_response_cache.db"
+    response_cache_max_entries: int = 500
+    response_cache_ttl: int = 24 * 60 * 60
+    # JSONL file the research pipelines append per-agent timings to
+    research_metrics_file: str = "tmp/research_metrics.jsonl"
+    # Background knowledge base loading: sources read at once, batches embedded at once, chunks per batch
+    knowledge_ingest_workers: int = 2
+    knowledge_embed_workers: int = 4
+    knowledge_embed_batch_size: int = 64
+    # Website crawls for the knowledge base: pages per crawl, link depth, requests in flight overall and
+    # per host, and the minimum seconds between two requests to the same host
+    knowledge_crawl_max_pages: int = 2000
+    knowledge_crawl_max_depth: int = 5
+    knowledge_crawl_max_connections: int = 32
+    knowledge_crawl_host_concurrency: int = 8
+    knowledge_crawl_delay: float = 0.1
+    # Sessions per page in the session picker, seconds a listed page is reused, and pages kept per storage
+    session_list_page_size: int = 20
+    session_list_cache_ttl: float = 10
+    session_list_cache_max_entries: int = 1000
+    # Serve answers to prompts similar to one already answered, from the semantic_response_cache table:
+    # opt-in, minimum cosine similarity of the prompts, and seconds an answer is served for
+    semantic_cache_enabled: bool = False
+    semantic_cache_threshold: float = 0.95
+    semantic_cache_ttl: int = 60 * 60
+    # Batch runs: inputs per batch, items run at the same time, seconds between checks for new items,
+    # attempts per item, and seconds after which a running item is assumed lost and run again
+    batch_max_items: int = 1000
+    batch_workers: int = 8
+    batch_poll_interval: float = 2
+    batch_max_attempts: int = 3
+    batch_item_timeout: float = 600
+    # Agent runs started per minute by batch jobs, by model provider. A run with tool calls makes
+    # several model calls, so keep this below the provider's request limit. Providers not listed are not limited
+    batch_runs_per_minute: Dict[str, float] = {"OpenAI": 200}
 
 
 # Create an AgentSettings object
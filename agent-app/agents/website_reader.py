@@ -0,0 +1,284 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import AsyncGenerator, Dict, Generator, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+from bs4 import BeautifulSoup
+from phi.document import Document
+from phi.document.reader.base import Reader
+from phi.utils.log import logger
+from pydantic import ConfigDict, Field
+
+from agents.settings import agent_settings
+
+# Links to files that are never worth fetching as pages
+SKIPPED_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".zip", ".gz", ".mp4", ".css", ".js")
+# Query parameters that only track where a visitor came from
+TRACKING_PARAMS = {"ref", "fbclid", "gclid"}
+
+
+def canonicalize_url(url: str) -> str:
+    """Return a canonical form of `url`, so the same page is only crawled once.
+
+    The scheme and host are lowercased, default ports, fragments and tracking parameters are
+    dropped, the remaining query parameters are sorted and a trailing slash is removed.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not (key.lower().startswith("utm_") or key.lower() in TRACKING_PARAMS)
+        )
+    )
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def get_crawl_domain(url: str) -> str:
+    """Return the domain a crawl from `url` stays on: its host, without a leading `www.`."""
+
+    host = urlsplit(url).hostname or ""
+    return host[len("www.") :] if host.startswith("www.") else host
+
+
+def is_in_domain(url: str, domain: str) -> bool:
+    """Whether the host of `url` is `domain` or one of its subdomains."""
+
+    host = urlsplit(url).hostname or ""
+    return host == domain or host.endswith("." + domain)
+
+
+def extract_main_content(soup: BeautifulSoup) -> str:
+    """Return the text of the main content of a page, falling back to the whole body."""
+
+    for tag in soup(["script", "style", "nav", "header", "footer", "aside", "noscript"]):
+        tag.decompose()
+    for selector in ["article", "main", "[role=main]", ".content", ".main-content", ".post-content", "body"]:
+        element = soup.select_one(selector)
+        if element:
+            return element.get_text(strip=True, separator=" ")
+    return ""
+
+
+@dataclass
+class _Page:
+    url: str
+    content: str
+    links: List[str]
+
+
+@dataclass
+class _Host:
+    """Crawl state of one host: its robots.txt rules and when the next request may start."""
+
+    semaphore: asyncio.Semaphore
+    delay: float
+    robots: Optional[RobotFileParser] = None
+    robots_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    next_request_at: float = 0.0
+
+    async def wait_turn(self) -> None:
+        loop = asyncio.get_running_loop()
+        start_at = max(loop.time(), self.next_request_at)
+        self.next_request_at = start_at + self.delay
+        await asyncio.sleep(start_at - loop.time())
+
+
+class ConcurrentWebsiteReader(Reader):
+    """Reader that crawls a website concurrently, yielding chunks as pages arrive.
+
+    Pages on the primary domain of the starting URL are fetched by `max_connections` workers
+    sharing one pooled HTTP client. Each host gets at most `host_concurrency` requests at a time,
+    started at least `delay` seconds apart (or the robots.txt Crawl-delay, if longer), and paths
+    disallowed by robots.txt are skipped. URLs are canonicalized before they are queued, and
+    pages that declare an already crawled canonical URL are dropped, so each page is read once.
+
+    Args:
+        max_pages (int): Maximum number of pages fetched.
+        max_depth (int): Maximum number of links followed from the starting URL.
+        max_connections (int): Requests in flight across all hosts.
+        host_concurrency (int): Requests in flight to a single host.
+        delay (float): Minimum seconds between the start of two requests to the same host.
+        timeout (float): Seconds before a request is abandoned.
+        user_agent (str): User agent sent with requests and matched against robots.txt.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    max_pages: int = Field(default_factory=lambda: agent_settings.knowledge_crawl_max_pages)
+    max_depth: int = Field(default_factory=lambda: agent_settings.knowledge_crawl_max_depth)
+    max_connections: int = Field(default_factory=lambda: agent_settings.knowledge_crawl_max_connections)
+    host_concurrency: int = Field(default_factory=lambda: agent_settings.knowledge_crawl_host_concurrency)
+    delay: float = Field(default_factory=lambda: agent_settings.knowledge_crawl_delay)
+    timeout: float = 10
+    user_agent: str = "phiagent-crawler"
+    # Replaces the network, for tests
+    transport: Optional[httpx.AsyncBaseTransport] = None
+
+    def read(self, url: str) -> List[Document]:
+        return list(self.iter_documents(url))
+
+    def iter_documents(self, url: str) -> Generator[Document, None, None]:
+        """Crawl `url` on a new event loop, yielding chunks as pages are crawled.
+
+        Closing the generator stops the crawl and closes its event loop.
+        """
+
+        loop = asyncio.new_event_loop()
+        documents = self.crawl(url)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(documents.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            loop.run_until_complete(documents.aclose())
+            loop.close()
+
+    async def crawl(self, url: str) -> AsyncGenerator[Document, None]:
+        """Crawl the website at `url`, yielding the chunks of each page as soon as it is fetched."""
+
+        start_url = canonicalize_url(url)
+        crawl_domain = get_crawl_domain(start_url)
+        frontier: asyncio.Queue[Tuple[str, int]] = asyncio.Queue()
+        # Bounded, so fetching pauses while the consumer is behind
+        documents: asyncio.Queue[Optional[Document]] = asyncio.Queue(maxsize=self.max_connections * 4)
+        seen: Set[str] = set()
+        hosts: Dict[str, _Host] = {}
+
+        def enqueue(link: str, depth: int) -> None:
+            canonical = canonicalize_url(link)
+            parts = urlsplit(canonical)
+            if (
+                canonical in seen
+                or len(seen) >= self.max_pages
+                or depth > self.max_depth
+                or parts.scheme not in ("http", "https")
+                or not is_in_domain(canonical, crawl_domain)
+                or parts.path.lower().endswith(SKIPPED_EXTENSIONS)
+            ):
+                return
+            seen.add(canonical)
+            frontier.put_nowait((canonical, depth))
+
+        async def worker(client: httpx.AsyncClient) -> None:
+            while True:
+                page_url, depth = await frontier.get()
+                try:
+                    page = await self._fetch_page(client, hosts, page_url)
+                    if page is None:
+                        continue
+                    if not is_in_domain(page.url, crawl_domain):
+                        # Redirected to another site
+                        continue
+                    for link in page.links:
+                        enqueue(link, depth + 1)
+                    if page.url != page_url:
+                        # Redirected or declared another canonical URL
+                        if page.url in seen:
+                            continue
+                        seen.add(page.url)
+                    for document in self._get_documents(url, page):
+                        await documents.put(document)
+                except Exception as e:
+                    logger.debug(f"Failed to crawl {page_url}: {e}")
+                finally:
+                    frontier.task_done()
+
+        async def finish() -> None:
+            await frontier.join()
+            await documents.put(None)
+
+        limits = httpx.Limits(
+            max_connections=self.max_connections, max_keepalive_connections=self.max_connections
+        )
+        async with httpx.AsyncClient(
+            transport=self.transport,
+            limits=limits,
+            timeout=self.timeout,
+            follow_redirects=True,
+            headers={"User-Agent": self.user_agent},
+        ) as client:
+            enqueue(start_url, 0)
+            tasks = [asyncio.create_task(worker(client)) for _ in range(self.max_connections)]
+            tasks.append(asyncio.create_task(finish()))
+            try:
+                crawled = 0
+                while (document := await documents.get()) is not None:
+                    crawled += 1
+                    yield document
+                logger.info(f"Crawled {len(seen)} pages from {url} into {crawled} chunks")
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _get_documents(self, url: str, page: _Page) -> List[Document]:
+        document = Document(name=url, id=page.url, meta_data={"url": page.url}, content=page.content)
+        if self.chunk:
+            return self.chunk_document(document)
+        return [document]
+
+    def _get_host(self, hosts: Dict[str, _Host], url: str) -> _Host:
+        host_name = urlsplit(url).netloc
+        if host_name not in hosts:
+            hosts[host_name] = _Host(semaphore=asyncio.Semaphore(self.host_concurrency), delay=self.delay)
+        return hosts[host_name]
+
+    async def _get_robots(self, client: httpx.AsyncClient, host: _Host, url: str) -> RobotFileParser:
+        async with host.robots_lock:
+            if host.robots is None:
+                scheme, netloc = urlsplit(url)[:2]
+                robots_url = f"{scheme}://{netloc}/robots.txt"
+                robots = RobotFileParser(robots_url)
+                try:
+                    response = await client.get(robots_url)
+                    if response.status_code in (401, 403):
+                        robots.parse(["User-agent: *", "Disallow: /"])
+                    elif response.status_code >= 400:
+                        # No robots.txt, everything may be crawled
+                        robots.parse([])
+                    else:
+                        robots.parse(response.text.splitlines())
+                except httpx.HTTPError as e:
+                    logger.debug(f"Could not read {robots_url}: {e}")
+                    robots.parse([])
+                crawl_delay = robots.crawl_delay(self.user_agent)
+                if crawl_delay is not None:
+                    host.delay = max(host.delay, float(crawl_delay))
+                host.robots = robots
+            return host.robots
+
+    async def _fetch_page(
+        self, client: httpx.AsyncClient, hosts: Dict[str, _Host], url: str
+    ) -> Optional[_Page]:
+        host = self._get_host(hosts, url)
+        robots = await self._get_robots(client, host, url)
+        if not robots.can_fetch(self.user_agent, url):
+            logger.debug(f"Skipping {url}, disallowed by robots.txt")
+            return None
+
+        async with host.semaphore:
+            await host.wait_turn()
+            response = await client.get(url)
+        if response.status_code != 200 or "html" not in response.headers.get("content-type", ""):
+            return None
+        # Parsing is CPU bound, keep it off the event loop so other pages keep downloading
+        return await asyncio.to_thread(self._parse_page, str(response.url), response.text)
+
+    def _parse_page(self, url: str, html: str) -> _Page:
+        soup = BeautifulSoup(html, "html.parser")
+        links = [urljoin(url, str(link["href"])) for link in soup.find_all("a", href=True)]
+        canonical = soup.find("link", rel="canonical", href=True)
+        page_url = canonicalize_url(urljoin(url, str(canonical["href"])) if canonical else url)
+        return _Page(url=page_url, content=extract_main_content(soup), links=links)
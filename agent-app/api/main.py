@@ -1,10 +1,26 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
+from api.metrics import MetricsMiddleware
 from api.settings import api_settings
 from api.routes.v1_router import v1_router
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Run batch items from server start, so items queued before a restart do not wait for a request
+    from api.routes.batches import get_batch_runner
+
+    batch_runner = get_batch_runner()
+    yield
+    # Running items finish first, an item cut off by a hard kill is run again after batch_item_timeout
+    await asyncio.to_thread(batch_runner.stop)
+
+
 def create_app() -> FastAPI:
     """Create a FastAPI App
 
@@ -19,6 +35,7 @@ def create_app() -> FastAPI:
         docs_url="/docs" if api_settings.docs_enabled else None,
         redoc_url="/redoc" if api_settings.docs_enabled else None,
         openapi_url="/openapi.json" if api_settings.docs_enabled else None,
+        lifespan=lifespan,
     )
 
     # Add v1 router
@@ -32,6 +49,9 @@ def create_app() -> FastAPI:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    # Added last so it runs first, and its timings include the other middlewares
+    if api_settings.metrics_enabled:
+        app.add_middleware(MetricsMiddleware)
 
     return app
 
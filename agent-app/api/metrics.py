@@ -0,0 +1,166 @@
+import asyncio
+import sys
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, AsyncGenerator, AsyncIterator, Dict, Iterator
+
+from phi.agent import Agent
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from utils.metrics import MetricsRegistry
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Engine
+
+######################################################
+## Metrics of the Api, served at /v1/metrics
+######################################################
+
+metrics_registry = MetricsRegistry()
+
+http_requests_in_flight = metrics_registry.gauge(
+    "http_requests_in_flight", "Requests being handled, streamed responses count until they end"
+)
+http_request_duration_seconds = metrics_registry.histogram(
+    "http_request_duration_seconds",
+    "Seconds from receiving a request to sending the end of its response",
+    ["method", "route", "status"],
+)
+agent_runs_in_flight = metrics_registry.gauge("agent_runs_in_flight", "Agent runs in progress", ["agent_id"])
+agent_run_duration_seconds = metrics_registry.histogram(
+    "agent_run_duration_seconds",
+    "Seconds an agent run took, including every model and tool call",
+    ["agent_id", "status"],
+    buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+agent_model_call_duration_seconds = metrics_registry.histogram(
+    "agent_model_call_duration_seconds", "Seconds a model call took", ["agent_id", "model"]
+)
+agent_model_time_to_first_token_seconds = metrics_registry.histogram(
+    "agent_model_time_to_first_token_seconds",
+    "Seconds until a streamed model call sent its first token",
+    ["agent_id", "model"],
+)
+agent_tokens_total = metrics_registry.counter(
+    "agent_tokens_total", "Tokens used by model calls", ["agent_id", "model", "type"]
+)
+agent_tool_call_duration_seconds = metrics_registry.histogram(
+    "agent_tool_call_duration_seconds", "Seconds a tool call took", ["agent_id", "tool"]
+)
+db_pool_connections = metrics_registry.gauge(
+    "db_pool_connections", "Connections of a database engine's pool, by state", ["engine", "state"]
+)
+
+
+def record_db_pool(name: str, engine: "Engine") -> None:
+    pool: Any = engine.pool
+    # Pools without a fixed size, like NullPool, do not report usage
+    for state, method in (("size", "size"), ("checked_in", "checkedin"), ("checked_out", "checkedout")):
+        if hasattr(pool, method):
+            db_pool_connections.set(getattr(pool, method)(), engine=name, state=state)
+    if hasattr(pool, "overflow"):
+        # Negative while the pool has not opened all of its connections yet
+        db_pool_connections.set(max(pool.overflow(), 0), engine=name, state="overflow")
+
+
+def collect_db_pools() -> None:
+    # The engines are created when an agent first needs the database, until then there is no pool
+    db_session = sys.modules.get("db.session")
+    if db_session is not None:
+        record_db_pool("sync", db_session.db_engine)
+        record_db_pool("async", db_session.async_db_engine.sync_engine)
+
+
+metrics_registry.add_collector(collect_db_pools)
+
+
+def record_model_metrics(agent: Agent) -> None:
+    """Record the model and tool calls of the agent's last run, from the metrics phi keeps on the model.
+
+    Pooled agents start every run with empty model metrics, so they only hold calls of that run.
+    """
+    if agent.model is None:
+        return
+    agent_id = agent.agent_id or ""
+    model = agent.model.id
+    metrics: Dict[str, Any] = agent.model.metrics
+    for seconds in metrics.get("response_times", []):
+        agent_model_call_duration_seconds.observe(seconds, agent_id=agent_id, model=model)
+    for seconds in metrics.get("time_to_first_token", []):
+        agent_model_time_to_first_token_seconds.observe(seconds, agent_id=agent_id, model=model)
+    for token_type in ("input_tokens", "output_tokens"):
+        if metrics.get(token_type):
+            agent_tokens_total.inc(
+                metrics[token_type], agent_id=agent_id, model=model, type=token_type[: -len("_tokens")]
+            )
+    for tool, times in metrics.get("tool_call_times", {}).items():
+        for seconds in times:
+            agent_tool_call_duration_seconds.observe(seconds, agent_id=agent_id, tool=tool)
+
+
+@contextmanager
+def track_agent_run(agent: Agent) -> Iterator[None]:
+    """Count the agent's run as in flight while the block runs, and record its calls once it ends."""
+
+    agent_id = agent.agent_id or ""
+    agent_runs_in_flight.inc(agent_id=agent_id)
+    start = time.perf_counter()
+    status = "error"
+    try:
+        yield
+        status = "success"
+    except (GeneratorExit, asyncio.CancelledError):
+        # The client disconnected
+        status = "cancelled"
+        raise
+    finally:
+        agent_runs_in_flight.dec(agent_id=agent_id)
+        agent_run_duration_seconds.observe(time.perf_counter() - start, agent_id=agent_id, status=status)
+        record_model_metrics(agent)
+
+
+async def track_agent_run_stream(agent: Agent, run_stream: AsyncIterator[Any]) -> AsyncGenerator[Any, None]:
+    """Yield from `run_stream`, tracking the run until the stream is exhausted or closed."""
+
+    with track_agent_run(agent):
+        async for chunk in run_stream:
+            yield chunk
+
+
+class MetricsMiddleware:
+    """Records the latency of every request, by method, route and status.
+
+    Implemented as plain ASGI middleware, it only wraps `send`, and times streamed responses up
+    to their last chunk. Requests are labelled with their route template, like
+    `/v1/agents/{agent_id}/runs`, so the number of label values stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            http_request_duration_seconds.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
@@ -0,0 +1,119 @@
+from typing import Any, AsyncIterator, Callable, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from phi.agent import RunResponse
+from pydantic import BaseModel
+
+from agents.agent_pool import copy_agent
+from agents.session_storage import PaginatedPgAgentStorage, SessionPage
+from api.metrics import track_agent_run_stream
+from api.routes.playground import agent_pool
+from api.settings import api_settings
+from utils.coalesce import StreamCoalescer
+from utils.sse import stream_events
+from utils.thread_stream import iterate_in_thread
+
+######################################################
+## Router for agent runs
+######################################################
+
+agents_router = APIRouter(prefix="/agents", tags=["Agents"])
+run_coalescer = StreamCoalescer()
+
+
+class AgentRunRequest(BaseModel):
+    message: str
+    session_id: Optional[str] = None
+    user_id: Optional[str] = None
+
+
+def serialize_run_response(run_response: RunResponse) -> str:
+    # Messages and metrics grow with the conversation, a delta only needs what changed
+    return run_response.model_dump_json(exclude={"messages", "metrics", "extra_data"}, exclude_none=True)
+
+
+def serialize_shared_run_response(run_response: RunResponse) -> str:
+    # A shared run's session belongs to no one, so its id is not handed out
+    return run_response.model_dump_json(
+        exclude={"messages", "metrics", "extra_data", "session_id"}, exclude_none=True
+    )
+
+
+@agents_router.post("/{agent_id}/runs")
+async def create_agent_run(agent_id: str, body: AgentRunRequest):
+    """Run an agent and stream its response as server-sent events.
+
+    Each `delta` event holds a RunResponse with the next part of the answer, followed by a
+    `done` event, or an `error` event if the run failed. The run, with its storage reads and
+    writes and sync tools, happens in a thread of its own so it never blocks the event loop, and
+    it is stopped after its next chunk once the client disconnects, which closes the model call.
+    With `run_coalescing_enabled`, requests without a `session_id` and `user_id` for the same
+    prompt share one run while it is in flight; its events carry no `session_id`, so a shared
+    run cannot be continued. A request that joins a run started before a knowledge base load
+    gets an answer from the knowledge base as it was before the load.
+    """
+    template = agent_pool.get_template(agent_id)
+    if template is None:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
+    if api_settings.run_coalescing_enabled and body.session_id is None and body.user_id is None:
+        # Anonymous requests that start no conversation, like a shared link opened by many
+        # people at once, attach to one in-flight run of the same prompt instead of each calling
+        # the model. The shared run gets its own session, not tied to any of the users.
+        # Imported here, it pulls in the embedder and the vector db, which the Api does not need to start
+        from agents.embedding_cache import normalize_text
+
+        # Knowledge loads are not part of the key, ingestors run in other processes and a shared
+        # run only lasts as long as its answer, so the run may straddle an ingest
+        key = (agent_id, normalize_text(body.message))
+
+        async def start_run():
+            agent = copy_agent(template)
+            return track_agent_run_stream(
+                agent, iterate_in_thread(lambda: agent.run(body.message, stream=True))
+            )
+
+        run_stream: AsyncIterator[Any] = run_coalescer.subscribe(
+            key, start_run, serialize=serialize_shared_run_response
+        )
+        # Events are serialized once by the shared run
+        serialize: Callable[[Any], str] = str
+    else:
+        agent = copy_agent(template, session_id=body.session_id, user_id=body.user_id)
+        run_stream = track_agent_run_stream(
+            agent, iterate_in_thread(lambda: agent.run(body.message, stream=True))
+        )
+        serialize = serialize_run_response
+
+    return StreamingResponse(
+        stream_events(
+            run_stream,
+            serialize=serialize,
+            buffer_size=api_settings.run_stream_buffer_size,
+            heartbeat_interval=api_settings.run_stream_heartbeat_interval,
+        ),
+        media_type="text/event-stream",
+        # Stop proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@agents_router.get("/{agent_id}/sessions")
+async def list_agent_sessions(
+    agent_id: str,
+    user_id: Optional[str] = None,
+    search: Optional[str] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+) -> SessionPage:
+    """List an agent's sessions a page at a time, most recently active first."""
+
+    template = agent_pool.get_template(agent_id)
+    if template is None:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    if not isinstance(template.storage, PaginatedPgAgentStorage):
+        raise HTTPException(status_code=404, detail="Agent does not have session storage")
+    return await template.storage.alist_sessions(
+        user_id=user_id, agent_id=agent_id, search=search, limit=limit, offset=offset
+    )
@@ -0,0 +1,74 @@
+from functools import lru_cache
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from agents.batch_runner import BatchItemPage, BatchJobStatus, BatchRunner
+from agents.settings import agent_settings
+from api.routes.playground import agent_pool
+
+######################################################
+## Router for batch runs
+######################################################
+
+batches_router = APIRouter(prefix="/batches", tags=["Batches"])
+
+
+class BatchRunRequest(BaseModel):
+    agent_id: str
+    inputs: List[str] = Field(min_length=1)
+    user_id: Optional[str] = None
+
+
+@lru_cache
+def get_batch_runner() -> BatchRunner:
+    """The process's batch runner, started by the app's lifespan."""
+
+    from db.session import SessionLocal
+
+    runner = BatchRunner(
+        session_factory=SessionLocal,
+        get_agent=lambda agent_id, user_id: agent_pool.get_agent(agent_id, user_id=user_id),
+    )
+    runner.start()
+    return runner
+
+
+@batches_router.post("", status_code=202)
+def create_batch(body: BatchRunRequest) -> BatchJobStatus:
+    """Queue a job that runs an agent on each of `inputs`, each in a session of its own.
+
+    Returns right away, the items are run in the background. Poll the job for its progress
+    and list its items for the answers.
+    """
+    if len(body.inputs) > agent_settings.batch_max_items:
+        raise HTTPException(
+            status_code=422, detail=f"A batch can have at most {agent_settings.batch_max_items} inputs"
+        )
+    if agent_pool.get_template(body.agent_id) is None:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    return get_batch_runner().submit(body.agent_id, body.inputs, user_id=body.user_id)
+
+
+@batches_router.get("/{job_id}")
+def get_batch(job_id: str) -> BatchJobStatus:
+    job = get_batch_runner().get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return job
+
+
+@batches_router.get("/{job_id}/items")
+def list_batch_items(
+    job_id: str,
+    status: Optional[str] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+) -> BatchItemPage:
+    """List a job's items a page at a time, in the order they were submitted."""
+
+    runner = get_batch_runner()
+    if runner.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return runner.list_items(job_id, status=status, limit=limit, offset=offset)
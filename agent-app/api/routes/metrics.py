@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from api.metrics import metrics_registry
+
+######################################################
+## Router for metrics
+######################################################
+
+metrics_router = APIRouter(tags=["Metrics"])
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Metrics of the Api in the Prometheus text format: request latency, agent runs and database pools"""
+
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
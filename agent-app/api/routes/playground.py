@@ -1,19 +1,130 @@
+import base64
 from os import getenv
+from typing import Dict, Iterator, List, Optional, Union, cast
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from phi.agent import Agent, AgentSession, RunResponse
 from phi.playground import Playground
+from phi.playground.operator import get_session_title
+from phi.playground.schemas import (
+    AgentRenameRequest,
+    AgentRunRequest,
+    AgentSessionDeleteRequest,
+    AgentSessionsRequest,
+    AgentSessionsResponse,
+)
 
-from agents.example import get_example_agent
+from agents.agent_pool import AgentPool
+from agents.registry import LazyAgentList, agent_registry
+from api.metrics import track_agent_run
 
 ######################################################
 ## Router for the agent playground
 ######################################################
 
-example_agent = get_example_agent(debug_mode=True)
+# One template per agent, built on its first request, every request runs on its own copy
+agent_pool = AgentPool(registry=agent_registry, template_kwargs={"debug_mode": True})
 
-# Create a playground instance
-playground = Playground(agents=[example_agent])
+# Create a playground instance, its routes build the agents the first time they list them
+playground = Playground(agents=LazyAgentList(agent_pool.get_templates))
 
 # Log the playground endpoint with phidata.app
 if getenv("RUNTIME_ENV") == "dev":
     playground.create_endpoint("http://localhost:8000")
 
-playground_router = playground.get_router()
+
+def get_pooled_playground_router(pool: AgentPool) -> APIRouter:
+    """Playground routes that read or change session state, served by a per-request agent from `pool`."""
+
+    router = APIRouter(prefix="/playground", tags=["Playground"])
+
+    def get_agent(agent_id: str, session_id: Optional[str] = None, user_id: Optional[str] = None) -> Agent:
+        agent = pool.get_agent(agent_id, session_id=session_id, user_id=user_id)
+        if agent is None:
+            raise HTTPException(status_code=404, detail="Agent not found")
+        return agent
+
+    def get_storage(agent: Agent):
+        if agent.storage is None:
+            raise HTTPException(status_code=404, detail="Agent does not have storage enabled")
+        return agent.storage
+
+    @router.post("/agent/run")
+    def agent_run(body: AgentRunRequest):
+        agent = get_agent(body.agent_id, session_id=body.session_id, user_id=body.user_id)
+        if body.monitor:
+            agent.monitoring = True
+
+        images: Optional[List[Union[str, Dict]]] = None
+        if body.image:
+            content = body.image.file.read()
+            images = [
+                base64.b64encode(content).decode("utf-8"),
+                {
+                    "filename": body.image.filename,
+                    "content_type": body.image.content_type,
+                    "size": len(content),
+                },
+            ]
+
+        if body.stream:
+
+            def stream_run() -> Iterator[str]:
+                with track_agent_run(agent):
+                    for chunk in agent.run(
+                        body.message, images=images, stream=True, stream_intermediate_steps=True
+                    ):
+                        yield cast(RunResponse, chunk).model_dump_json()
+
+            return StreamingResponse(stream_run(), media_type="text/event-stream")
+        with track_agent_run(agent):
+            run_response = cast(RunResponse, agent.run(body.message, images=images, stream=False))
+        return run_response.model_dump_json()
+
+    @router.post("/agent/session/rename")
+    def agent_rename(body: AgentRenameRequest):
+        agent = get_agent(body.agent_id, session_id=body.session_id)
+        agent.rename_session(body.name)
+        return JSONResponse(content={"message": f"successfully renamed agent {agent.name}"})
+
+    @router.post("/agent/sessions/all")
+    def get_agent_sessions(body: AgentSessionsRequest) -> List[AgentSessionsResponse]:
+        storage = get_storage(get_agent(body.agent_id, user_id=body.user_id))
+        return [
+            AgentSessionsResponse(
+                title=get_session_title(session),
+                session_id=session.session_id,
+                session_name=session.session_data.get("session_name") if session.session_data else None,
+                created_at=session.created_at,
+            )
+            for session in storage.get_all_sessions(user_id=body.user_id)
+        ]
+
+    @router.post("/agent/sessions/{session_id}")
+    def get_agent_session(session_id: str, body: AgentSessionsRequest) -> AgentSession:
+        storage = get_storage(get_agent(body.agent_id, session_id=session_id, user_id=body.user_id))
+        session = storage.read(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        return session
+
+    @router.post("/agent/session/delete")
+    def agent_session_delete(body: AgentSessionDeleteRequest):
+        agent = get_agent(body.agent_id, user_id=body.user_id)
+        storage = get_storage(agent)
+        if storage.read(body.session_id, user_id=body.user_id) is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        # Agent.delete_session writes the agent's own session back to storage, only the row is deleted
+        storage.delete_session(session_id=body.session_id)
+        return JSONResponse(content={"message": f"successfully deleted agent {agent.name}"})
+
+    return router
+
+
+playground_router = get_pooled_playground_router(agent_pool)
+# The Playground's own versions of the pooled routes would run on the shared template agents
+pooled_paths = {getattr(route, "path", None) for route in playground_router.routes}
+playground_router.routes.extend(
+    route for route in playground.get_router().routes if getattr(route, "path", None) not in pooled_paths
+)
@@ -1,8 +1,14 @@
 from fastapi import APIRouter
 
+from api.routes.agents import agents_router
+from api.routes.batches import batches_router
 from api.routes.playground import playground_router
 from api.routes.health import health_check_router
+from api.routes.metrics import metrics_router
 
 v1_router = APIRouter(prefix="/v1")
 v1_router.include_router(playground_router)
+v1_router.include_router(agents_router)
+v1_router.include_router(batches_router)
 v1_router.include_router(health_check_router)
+v1_router.include_router(metrics_router)
@@ -28,6 +28,19 @@ class ApiSettings(BaseSettings):
     # default cors origin list.
     cors_origin_list: Optional[List[str]] = Field(None, validate_default=True)
 
+    # Streamed agent runs: events buffered per connection before the model stream is paused,
+    # and seconds without events before a heartbeat is sent
+    run_stream_buffer_size: int = 64
+    run_stream_heartbeat_interval: float = 15
+    # Share one run between concurrent anonymous requests (no session_id and no user_id) for the same
+    # prompt to the same agent. Shared runs are stored under no user and their session id is not
+    # returned, so they cannot be continued; only enable it for one-off prompts like shared links.
+    # Requests joining a run started before a knowledge base load get the answer from before the load
+    run_coalescing_enabled: bool = False
+
+    # Set to False to stop recording request latencies, /v1/metrics still serves agent and database metrics
+    metrics_enabled: bool = True
+
     @field_validator("runtime_env")
     def validate_runtime_env(cls, runtime_env):
         """Validate runtime_env."""
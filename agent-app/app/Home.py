@@ -1,15 +1,13 @@
-import base64
-from os import getenv
+from datetime import datetime
 from io import BytesIO
-from typing import List
+from os import getenv
+from typing import Callable, Iterable, List, Optional
 
 import nest_asyncio
 import streamlit as st
-from PIL import Image
 from phi.agent import Agent
 from phi.document import Document
 from phi.document.reader import Reader
-from phi.document.reader.website import WebsiteReader
 from phi.document.reader.pdf import PDFReader
 from phi.document.reader.text import TextReader
 from phi.document.reader.docx import DocxReader
@@ -21,7 +19,14 @@ from phi.tools.streamlit.components import (
 )
 from phi.utils.log import logger
 
-from agents.example import get_example_agent
+from agents.example import example_agent_knowledge, example_agent_semantic_cache, get_example_agent
+from agents.knowledge_ingestion import IngestionJob, IngestionStatus, KnowledgeIngestor
+from agents.semantic_cache import record_cached_answer
+from agents.session_storage import PaginatedPgAgentStorage, SessionSummary
+from agents.website_reader import ConcurrentWebsiteReader
+from utils.chat_history import ChatHistory
+from utils.image_store import image_store
+from utils.stream_buffer import StreamBuffer
 
 nest_asyncio.apply()
 st.set_page_config(
@@ -46,12 +51,104 @@ def restart_agent():
     st.rerun()
 
 
-def encode_image(image_file):
-    image = Image.open(image_file)
-    buffer = BytesIO()
-    image.save(buffer, format="JPEG")
-    encoding = base64.b64encode(buffer.getvalue()).decode("utf-8")
-    return f"data:image/jpeg;base64,{encoding}"
+def encode_image(image_file) -> str:
+    """Downscale and store the uploaded image, returning the reference kept in chat history."""
+    return image_store.ingest(image_file.getvalue())
+
+
+def show_image(url: str) -> None:
+    display_source = image_store.get_display_source(url)
+    if display_source is None:
+        st.caption("Image no longer available")
+    else:
+        st.image(display_source, use_column_width=True)
+
+
+@st.cache_resource
+def get_knowledge_ingestor() -> KnowledgeIngestor:
+    """One background ingestor per server process, shared by all sessions."""
+    on_change = example_agent_semantic_cache.invalidate if example_agent_semantic_cache else None
+    # Cached answers may be contradicted by what was just loaded
+    return KnowledgeIngestor(example_agent_knowledge, on_change=on_change)
+
+
+def submit_ingestion_job(name: str, read: Callable[[], Iterable[Document]]) -> None:
+    job = get_knowledge_ingestor().submit(name, read)
+    st.session_state.setdefault("ingestion_job_ids", []).append(job.job_id)
+
+
+def get_session_ingestion_jobs() -> List[IngestionJob]:
+    """Return the ingestion jobs started in this session, most recent last."""
+    ingestor = get_knowledge_ingestor()
+    jobs = [ingestor.get_job(job_id) for job_id in st.session_state.get("ingestion_job_ids", [])]
+    return [job for job in jobs if job is not None][-5:]
+
+
+def show_ingestion_job(job: IngestionJob) -> None:
+    if job.status == IngestionStatus.failed:
+        st.error(f"Could not load {job.name}: {job.error}")
+    elif job.status == IngestionStatus.completed:
+        st.success(f"Loaded {job.name} ({job.total_chunks} chunks)", icon="🧠")
+    else:
+        text = f"{job.status.value.title()} {job.name}"
+        if job.total_chunks:
+            text += f": {job.loaded_chunks}/{job.total_chunks} chunks"
+        st.progress(job.progress, text=text)
+
+
+@st.fragment(run_every=1)
+def show_ingestion_progress() -> None:
+    """Refresh the progress of running ingestion jobs every second without rerunning the app."""
+    jobs = get_session_ingestion_jobs()
+    for job in jobs:
+        show_ingestion_job(job)
+    if all(job.done for job in jobs):
+        # Stop polling
+        st.rerun()
+
+
+def format_session(session: SessionSummary) -> str:
+    label = session.name or session.session_id[:8]
+    if session.last_active_at:
+        label += f" · {datetime.fromtimestamp(session.last_active_at):%b %d, %H:%M}"
+    return label
+
+
+def select_session(
+    storage: PaginatedPgAgentStorage, user_id: str, agent_id: Optional[str], session_id: Optional[str]
+) -> Optional[str]:
+    """Show a searchable session picker, one page of recent sessions at a time, and return the selected id."""
+    search = st.sidebar.text_input("Search sessions", key="session_search")
+    # Start from the most recent sessions whenever the search changes
+    if st.session_state.get("session_list_search") != search:
+        st.session_state["session_list_search"] = search
+        st.session_state["session_list_offset"] = 0
+    offset: int = st.session_state.get("session_list_offset", 0)
+    page = storage.list_sessions(user_id=user_id, agent_id=agent_id, search=search, offset=offset)
+
+    labels = {session.session_id: format_session(session) for session in page.sessions}
+    # Keep the current session selected when it is not on this page
+    if session_id is not None and session_id not in labels:
+        labels = {session_id: "Current session", **labels}
+    if not labels:
+        st.sidebar.caption("No sessions found")
+        return session_id
+    options = list(labels)
+    selected = st.sidebar.selectbox(
+        "Session",
+        options=options,
+        index=options.index(session_id) if session_id in labels else 0,
+        format_func=lambda option: labels[option],
+    )
+
+    newer, older = st.sidebar.columns(2)
+    if offset > 0 and newer.button("Newer", key="newer_sessions"):
+        st.session_state["session_list_offset"] = max(0, offset - len(page.sessions))
+        st.rerun()
+    if page.has_more and older.button("Older", key="older_sessions"):
+        st.session_state["session_list_offset"] = offset + len(page.sessions)
+        st.rerun()
+    return selected
 
 
 def main() -> None:
@@ -81,42 +178,31 @@ def main() -> None:
     example_agent: Agent
     if "example_agent" not in st.session_state or st.session_state["example_agent"] is None:
         logger.info(f"---*--- Creating {model_id} Agent ---*---")
-        example_agent = get_example_agent(model_id=model_id, debug_mode=True)
+        example_agent = get_example_agent(model_id=model_id, user_id=username, debug_mode=True)
         st.session_state["example_agent"] = example_agent
     else:
         example_agent = st.session_state["example_agent"]
 
-    # Create Agent session (i.e. log to database) and save session_id in session state
-    try:
-        st.session_state["example_agent_session_id"] = example_agent.create_session()
-    except Exception:
-        st.warning("Could not create Agent session, is the database running?")
-        return
+    # Create or load the Agent session (i.e. log to database) and its chat history once per session.
+    # Every widget interaction reruns this script, so neither should touch the database on a rerun.
+    chat_history: Optional[ChatHistory] = st.session_state.get("chat_history")
+    if chat_history is None or chat_history.session_id != example_agent.session_id:
+        try:
+            st.session_state["example_agent_session_id"] = example_agent.create_session()
+        except Exception:
+            st.warning("Could not create Agent session, is the database running?")
+            return
+        logger.debug("Loading chat history")
+        chat_history = ChatHistory.from_agent_messages(
+            example_agent.session_id, example_agent.memory.get_messages()
+        )
+        st.session_state["chat_history"] = chat_history
+        # Restore the image uploaded earlier in this session
+        if st.session_state.get("uploaded_image") is None:
+            st.session_state["uploaded_image"] = chat_history.image_url
 
     # Store uploaded image in session state
-    uploaded_image = None
-    if "uploaded_image" in st.session_state:
-        uploaded_image = st.session_state["uploaded_image"]
-
-    # Load existing messages
-    agent_chat_history = example_agent.memory.get_messages()
-    if len(agent_chat_history) > 0:
-        logger.debug("Loading chat history")
-        st.session_state["messages"] = agent_chat_history
-        # Search for uploaded image
-        if uploaded_image is None:
-            for message in agent_chat_history:
-                if message.get("role") == "user":
-                    content = message.get("content")
-                    if isinstance(content, list):
-                        for item in content:
-                            if item["type"] == "image_url":
-                                uploaded_image = item["image_url"]["url"]
-                                st.session_state["uploaded_image"] = uploaded_image
-                                break
-    else:
-        logger.debug("No chat history found")
-        st.session_state["messages"] = [{"role": "assistant", "content": "Ask me anything..."}]
+    uploaded_image = st.session_state.get("uploaded_image")
 
     # Upload Image
     if uploaded_image is None:
@@ -139,12 +225,15 @@ def main() -> None:
     # Prompt for user input
     if uploaded_image:
         with st.expander("Uploaded Image", expanded=False):
-            st.image(uploaded_image, use_column_width=True)
+            show_image(uploaded_image)
     if prompt := st.chat_input():
-        st.session_state["messages"].append({"role": "user", "content": prompt})
+        chat_history.append({"role": "user", "content": prompt})
 
-    # Display existing chat messages
-    for message in st.session_state["messages"]:
+    # Display the latest chat messages, older ones are loaded a page at a time
+    if chat_history.hidden_count > 0:
+        if st.button(f"Show older messages ({chat_history.hidden_count} hidden)", key="show_older_messages"):
+            chat_history.show_older()
+    for message in chat_history.visible_messages():
         # Skip system and tool messages
         if message.get("role") in ["system", "tool"]:
             continue
@@ -158,24 +247,45 @@ def main() -> None:
                         if item["type"] == "text":
                             st.write(item["text"])
                         elif item["type"] == "image_url":
-                            st.image(item["image_url"]["url"], use_column_width=True)
+                            show_image(item["image_url"]["url"])
                 else:
                     st.write(content)
 
     # If last message is from a user, generate a new response
-    last_message = st.session_state["messages"][-1]
+    last_message = chat_history.messages[-1]
     if last_message.get("role") == "user":
         question = last_message["content"]
+        # Only a conversation's first prompt without an image means the same thing in every session
+        semantic_cache = None
+        if (
+            example_agent_semantic_cache is not None
+            and not uploaded_image
+            and isinstance(question, str)
+            and not chat_history.has_answers
+        ):
+            semantic_cache = example_agent_semantic_cache
         with st.chat_message("assistant"):
             with st.spinner("Thinking..."):
-                resp_container = st.empty()
-                response = ""
-                for delta in example_agent.run(
-                    message=question, images=[uploaded_image] if uploaded_image else [], stream=True
-                ):
-                    response += delta.content  # type: ignore
-                    resp_container.markdown(response)
-            st.session_state["messages"].append({"role": "assistant", "content": response})
+                cached = semantic_cache.get(example_agent, question) if semantic_cache else None
+                if cached is not None:
+                    response = record_cached_answer(example_agent, question, cached).content
+                    st.markdown(response)
+                else:
+                    resp_container = st.empty()
+
+                    def render_answer(text: str) -> None:
+                        resp_container.markdown(text)
+
+                    # Re-render the growing answer on a time or size cadence instead of on every delta
+                    render_buffer = StreamBuffer(render_answer)
+                    for delta in example_agent.run(
+                        message=question, images=[uploaded_image] if uploaded_image else [], stream=True
+                    ):
+                        render_buffer.append(delta.content)  # type: ignore
+                    response = render_buffer.close()
+                    if semantic_cache is not None:
+                        semantic_cache.set(example_agent, question, response)
+            chat_history.append({"role": "assistant", "content": response})
 
     # Load knowledge base
     if example_agent.knowledge:
@@ -186,18 +296,11 @@ def main() -> None:
             "Add URL to Knowledge Base", type="default", key=st.session_state["url_scrape_key"]
         )
         add_url_button = st.sidebar.button("Add URL")
-        if add_url_button:
-            if input_url is not None:
-                alert = st.sidebar.info("Processing URLs...", icon="ℹ️")
-                if f"{input_url}_scraped" not in st.session_state:
-                    scraper = WebsiteReader(max_links=2, max_depth=1)
-                    web_documents: List[Document] = scraper.read(input_url)
-                    if web_documents:
-                        example_agent.knowledge.load_documents(web_documents, upsert=True)
-                    else:
-                        st.sidebar.error("Could not read website")
-                    st.session_state[f"{input_url}_uploaded"] = True
-                alert.empty()
+        if add_url_button and input_url:
+            if f"{input_url}_scraped" not in st.session_state:
+                scraper = ConcurrentWebsiteReader()
+                submit_ingestion_job(input_url, lambda: scraper.iter_documents(input_url))
+                st.session_state[f"{input_url}_scraped"] = True
 
         # -*- Add documents to knowledge base
         if "file_uploader_key" not in st.session_state:
@@ -207,7 +310,6 @@ def main() -> None:
             key=st.session_state["file_uploader_key"],
         )
         if uploaded_file is not None:
-            alert = st.sidebar.info("Processing document...", icon="🧠")
             document_name = uploaded_file.name.split(".")[0]
             if f"{document_name}_uploaded" not in st.session_state:
                 file_type = uploaded_file.name.split(".")[-1].lower()
@@ -221,26 +323,39 @@ def main() -> None:
                     reader = TextReader()
                 elif file_type == "docx":
                     reader = DocxReader()
-                auto_rag_documents: List[Document] = reader.read(uploaded_file)
-                if auto_rag_documents:
-                    example_agent.knowledge.load_documents(auto_rag_documents, upsert=True)
-                else:
-                    st.sidebar.error("Could not read document")
+                # Copy the upload, the worker reads it after this script run has finished
+                document_file = BytesIO(uploaded_file.getvalue())
+                document_file.name = uploaded_file.name
+                submit_ingestion_job(uploaded_file.name, lambda: reader.read(document_file))
                 st.session_state[f"{document_name}_uploaded"] = True
-            alert.empty()
+
+        # -*- Show the progress of documents being loaded, while the chat stays usable
+        ingestion_jobs = get_session_ingestion_jobs()
+        with st.sidebar:
+            if any(not job.done for job in ingestion_jobs):
+                show_ingestion_progress()
+            else:
+                for job in ingestion_jobs:
+                    show_ingestion_job(job)
 
         if example_agent.knowledge.vector_db:
             if st.sidebar.button("Delete Knowledge Base"):
                 example_agent.knowledge.vector_db.delete()
+                if example_agent_semantic_cache is not None:
+                    example_agent_semantic_cache.invalidate()
                 st.sidebar.success("Knowledge base deleted")
 
-    if example_agent.storage:
-        example_agent_session_ids: List[str] = example_agent.storage.get_all_session_ids()
-        new_example_agent_session_id = st.sidebar.selectbox("Session ID", options=example_agent_session_ids)
+    if isinstance(example_agent.storage, PaginatedPgAgentStorage):
+        new_example_agent_session_id = select_session(
+            example_agent.storage,
+            user_id=username,
+            agent_id=example_agent.agent_id,
+            session_id=st.session_state["example_agent_session_id"],
+        )
         if st.session_state["example_agent_session_id"] != new_example_agent_session_id:
             logger.info(f"---*--- Loading {model_id} session: {new_example_agent_session_id} ---*---")
             st.session_state["example_agent"] = get_example_agent(
-                model_id=model_id, session_id=new_example_agent_session_id, debug_mode=True
+                model_id=model_id, user_id=username, session_id=new_example_agent_session_id, debug_mode=True
             )
             st.session_state["example_agent_session_id"] = new_example_agent_session_id
             st.session_state["uploaded_image"] = None
@@ -0,0 +1,35 @@
+"""Create embedding cache table
+
+Revision ID: 5c0e8f3a1b2d
+Revises:
+Create Date: 2026-10-18 10:12:31.402816
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector.sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision = "5c0e8f3a1b2d"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    op.create_table(
+        "embedding_cache",
+        sa.Column("model_id", sa.String(), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("embedding", pgvector.sqlalchemy.Vector(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("model_id", "content_hash"),
+        schema="public",
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("embedding_cache", schema="public")
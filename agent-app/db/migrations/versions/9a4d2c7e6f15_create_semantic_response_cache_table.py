@@ -0,0 +1,61 @@
+"""Create semantic response cache table
+
+Revision ID: 9a4d2c7e6f15
+Revises: 5c0e8f3a1b2d
+Create Date: 2026-10-18 14:03:52.118204
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+import pgvector.sqlalchemy
+
+
+# revision identifiers, used by Alembic.
+revision = "9a4d2c7e6f15"
+down_revision = "5c0e8f3a1b2d"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+    op.create_table(
+        "semantic_response_cache",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("agent_id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=True),
+        sa.Column("agent_config_key", sa.String(length=64), nullable=False),
+        sa.Column("embedding_model", sa.String(), nullable=False),
+        sa.Column("embedding", pgvector.sqlalchemy.Vector(dim=1536), nullable=False),
+        sa.Column("prompt", sa.Text(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        schema="public",
+    )
+    op.create_index(
+        "idx_semantic_response_cache_scope",
+        "semantic_response_cache",
+        ["agent_id", "user_id", "agent_config_key"],
+        unique=False,
+        schema="public",
+    )
+    op.create_index(
+        "idx_semantic_response_cache_embedding",
+        "semantic_response_cache",
+        ["embedding"],
+        unique=False,
+        schema="public",
+        postgresql_using="hnsw",
+        postgresql_ops={"embedding": "vector_cosine_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "idx_semantic_response_cache_embedding", table_name="semantic_response_cache", schema="public"
+    )
+    op.drop_index("idx_semantic_response_cache_scope", table_name="semantic_response_cache", schema="public")
+    op.drop_table("semantic_response_cache", schema="public")
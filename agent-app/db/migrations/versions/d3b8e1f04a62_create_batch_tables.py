@@ -0,0 +1,73 @@
+"""Create batch job tables
+
+Revision ID: d3b8e1f04a62
+Revises: 9a4d2c7e6f15
+Create Date: 2026-10-18 16:42:10.305871
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d3b8e1f04a62"
+down_revision = "9a4d2c7e6f15"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "batch_jobs",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("agent_id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("total_items", sa.Integer(), nullable=False),
+        sa.Column("completed_items", sa.Integer(), nullable=False),
+        sa.Column("failed_items", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        schema="public",
+    )
+    op.create_index(
+        "idx_batch_jobs_user_created", "batch_jobs", ["user_id", "created_at"], unique=False, schema="public"
+    )
+    op.create_table(
+        "batch_items",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("job_id", sa.String(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False),
+        sa.Column("input", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("output", sa.Text(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("session_id", sa.String(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["job_id"], ["public.batch_jobs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        schema="public",
+    )
+    op.create_index(
+        "idx_batch_items_job_position", "batch_items", ["job_id", "position"], unique=True, schema="public"
+    )
+    op.create_index(
+        "idx_batch_items_status_available",
+        "batch_items",
+        ["status", "available_at"],
+        unique=False,
+        schema="public",
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_batch_items_status_available", table_name="batch_items", schema="public")
+    op.drop_index("idx_batch_items_job_position", table_name="batch_items", schema="public")
+    op.drop_table("batch_items", schema="public")
+    op.drop_index("idx_batch_jobs_user_created", table_name="batch_jobs", schema="public")
+    op.drop_table("batch_jobs", schema="public")
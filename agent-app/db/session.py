@@ -1,18 +1,29 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from sqlalchemy.engine import Engine, create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from db.settings import db_settings
 
 # Create SQLAlchemy Engine using a database URL
 db_url: str = db_settings.get_db_url()
-db_engine: Engine = create_engine(db_url, pool_pre_ping=True)
+db_engine: Engine = create_engine(db_url, **db_settings.get_engine_kwargs())
 
 # Create a SessionLocal class
 # https://fastapi.tiangolo.com/tutorial/sql-databases/#create-a-sessionlocal-class
 SessionLocal: sessionmaker[Session] = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
 
+# Create an async Engine for API routes, which wait on the database without holding a worker thread.
+# The postgresql+psycopg driver uses psycopg's async connections when used by an async engine.
+async_db_engine: AsyncEngine = create_async_engine(db_url, **db_settings.get_engine_kwargs())
+
+# Create an AsyncSessionLocal class
+# https://docs.sqlalchemy.org/en/20/orm/extensions/asyncio.html#using-asyncsession-with-concurrent-tasks
+AsyncSessionLocal: async_sessionmaker[AsyncSession] = async_sessionmaker(
+    bind=async_db_engine, autoflush=False, expire_on_commit=False
+)
+
 
 def get_db() -> Generator[Session, None, None]:
     """
@@ -26,3 +37,14 @@ def get_db() -> Generator[Session, None, None]:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency to get an async database session.
+
+    Yields:
+        AsyncSession: An SQLAlchemy async database session.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,5 +1,5 @@
 from os import getenv
-from typing import Optional
+from typing import Any, Dict, Optional
 
 from pydantic_settings import BaseSettings
 
@@ -21,6 +21,15 @@ class DbSettings(BaseSettings):
     db_driver: str = "postgresql+psycopg"
     # Create/Upgrade database on startup using alembic
     migrate_db: bool = False
+    # Connection pool of each engine: connections kept open, extra connections opened under load,
+    # seconds before a connection is replaced and seconds to wait for a free connection
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_recycle: int = 1800
+    db_pool_timeout: float = 30
+    # Executions of a statement before psycopg prepares it on the server. Set to None to disable
+    # prepared statements, which is required behind PgBouncer in transaction pooling mode
+    db_prepare_threshold: Optional[int] = 5
 
     def get_db_url(self) -> str:
         db_url = "{}://{}{}@{}:{}/{}".format(
@@ -45,6 +54,18 @@ class DbSettings(BaseSettings):
             raise ValueError("Could not build database connection")
         return db_url
 
+    def get_engine_kwargs(self) -> Dict[str, Any]:
+        """Keyword arguments for `create_engine` and `create_async_engine`."""
+
+        return {
+            "pool_pre_ping": True,
+            "pool_size": self.db_pool_size,
+            "max_overflow": self.db_max_overflow,
+            "pool_recycle": self.db_pool_recycle,
+            "pool_timeout": self.db_pool_timeout,
+            "connect_args": {"prepare_threshold": self.db_prepare_threshold},
+        }
+
 
 # Create DbSettings object
 db_settings = DbSettings()
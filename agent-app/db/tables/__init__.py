@@ -1 +1,4 @@
 from db.tables.base import Base
+from db.tables.embedding_cache import EmbeddingCacheEntry
+from db.tables.semantic_cache import SemanticCacheEntry
+from db.tables.batch import BatchItem, BatchJob
@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.tables.base import Base
+
+
+class BatchJob(Base):
+    """A batch of inputs submitted together to one agent, and how far it has come."""
+
+    __tablename__ = "batch_jobs"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    agent_id: Mapped[str] = mapped_column(String)
+    user_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # queued until a worker picks up its first item, then running until every item is done
+    status: Mapped[str] = mapped_column(String, default="queued")
+    total_items: Mapped[int] = mapped_column(Integer)
+    completed_items: Mapped[int] = mapped_column(Integer, default=0)
+    failed_items: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (Index("idx_batch_jobs_user_created", "user_id", "created_at"),)
+
+
+class BatchItem(Base):
+    """One input of a batch job, with the agent's answer once it has run."""
+
+    __tablename__ = "batch_items"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    job_id: Mapped[str] = mapped_column(String, ForeignKey("batch_jobs.id", ondelete="CASCADE"))
+    # Order of the input in the submitted batch
+    position: Mapped[int] = mapped_column(Integer)
+    input: Mapped[str] = mapped_column(Text)
+    # queued, running, completed or failed
+    status: Mapped[str] = mapped_column(String, default="queued")
+    output: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Session the item ran in, so its conversation can be continued
+    session_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    # Queued items are not picked up before this time, failed attempts are retried later
+    available_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("idx_batch_items_job_position", "job_id", "position", unique=True),
+        Index("idx_batch_items_status_available", "status", "available_at"),
+    )
@@ -0,0 +1,20 @@
+from datetime import datetime
+from typing import List
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import DateTime, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.tables.base import Base
+
+
+class EmbeddingCacheEntry(Base):
+    """Embedding of a knowledge base chunk, keyed by the embedding model and the hash of the chunk text."""
+
+    __tablename__ = "embedding_cache"
+
+    model_id: Mapped[str] = mapped_column(String, primary_key=True)
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    # No fixed dimensions, so one table serves every embedding model
+    embedding: Mapped[List[float]] = mapped_column(Vector())
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import List, Optional
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import DateTime, Index, String, Text, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.tables.base import Base
+
+# Dimensions of the prompt embeddings, text-embedding-3 models are requested at this size
+SEMANTIC_CACHE_DIMENSIONS = 1536
+
+
+class SemanticCacheEntry(Base):
+    """An agent answer, found again by the embedding of the prompt it answered."""
+
+    __tablename__ = "semantic_response_cache"
+
+    id: Mapped[str] = mapped_column(String, primary_key=True)
+    agent_id: Mapped[str] = mapped_column(String)
+    # Answers are only shared between sessions of the same user, None for anonymous sessions
+    user_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # Hash of the agent's model, instructions and tools, so a changed agent never serves old answers
+    agent_config_key: Mapped[str] = mapped_column(String(64))
+    embedding_model: Mapped[str] = mapped_column(String)
+    embedding: Mapped[List[float]] = mapped_column(Vector(SEMANTIC_CACHE_DIMENSIONS))
+    prompt: Mapped[str] = mapped_column(Text)
+    content: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+
+    __table_args__ = (
+        Index("idx_semantic_response_cache_scope", "agent_id", "user_id", "agent_config_key"),
+        Index(
+            "idx_semantic_response_cache_embedding",
+            "embedding",
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+    )
@@ -0,0 +1,119 @@
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from openai import OpenAI
+from phi.agent import Agent
+from phi.model.message import Message
+from phi.model.openai import OpenAIChat
+from phi.storage.agent.sqlite import SqlAgentStorage
+
+from agents.agent_pool import AgentPool
+from agents.registry import AgentRegistry, LazyAgentList
+from api.routes.playground import get_pooled_playground_router
+
+
+def make_pool():
+    template = Agent(
+        agent_id="example-agent",
+        model=OpenAIChat(id="gpt-4o", client=OpenAI(api_key="test")),
+        instructions=["Be brief"],
+    )
+    return AgentPool(templates=[template]), template
+
+
+def test_each_request_gets_an_isolated_agent_bound_to_its_session():
+    pool, template = make_pool()
+
+    first = pool.get_agent("example-agent", session_id="session-1", user_id="ada")
+    second = pool.get_agent("example-agent", session_id="session-2", user_id="grace")
+    first.memory.add_message(Message(role="user", content="hi"))
+
+    assert (first.session_id, first.user_id) == ("session-1", "ada")
+    assert (second.session_id, second.user_id) == ("session-2", "grace")
+    assert first is not second and first.memory is not second.memory
+    assert first.model is not second.model
+    assert second.memory.messages == [] and template.memory.messages == []
+
+
+def test_agents_share_the_template_model_client():
+    pool, template = make_pool()
+
+    agents = [pool.get_agent("example-agent") for _ in range(3)]
+
+    assert all(agent.model.client is template.model.client for agent in agents)
+    assert agents[0].instructions == ["Be brief"]
+    # Without a session id every agent starts a new session
+    assert len({agent.session_id for agent in agents}) == 3
+
+
+def test_unknown_agents_are_not_found():
+    pool, _ = make_pool()
+
+    assert pool.get_agent("missing-agent") is None
+
+
+built_lazy_agents = []
+
+
+def get_lazy_agent(debug_mode=False):
+    built_lazy_agents.append(debug_mode)
+    return Agent(agent_id="lazy-agent", model=OpenAIChat(id="gpt-4o", client=OpenAI(api_key="test")))
+
+
+def test_registered_agents_are_built_on_first_request():
+    registry = AgentRegistry()
+    registry.register("lazy-agent", f"{__name__}:get_lazy_agent")
+    pool = AgentPool(registry=registry, template_kwargs={"debug_mode": True})
+
+    assert pool.agent_ids == ["lazy-agent"] and built_lazy_agents == []
+    agents = [pool.get_agent("lazy-agent") for _ in range(2)]
+
+    assert built_lazy_agents == [True]
+    assert agents[0] is not agents[1]
+    assert pool.get_agent("missing-agent") is None
+
+
+def test_lazy_agent_lists_are_built_when_read():
+    built: List[int] = []
+
+    def build() -> List[Agent]:
+        built.append(1)
+        return [Agent(agent_id="a"), Agent(agent_id="b")]
+
+    agents = LazyAgentList(build)
+
+    assert built == []
+    assert [agent.agent_id for agent in agents] == ["a", "b"]
+    assert len(agents) == 2 and agents[1].agent_id == "b"
+    assert built == [1]
+
+
+def test_playground_session_routes_leave_the_template_alone(tmp_path):
+    storage = SqlAgentStorage(table_name="sessions", db_file=str(tmp_path / "sessions.db"))
+    template = Agent(agent_id="example-agent", storage=storage)
+    template_session_id = template.session_id
+    pool = AgentPool(templates=[template])
+    for session_id, user_id in [("session-1", "ada"), ("session-2", "grace")]:
+        agent = pool.get_agent("example-agent", session_id=session_id, user_id=user_id)
+        assert agent is not None
+        agent.write_to_storage()
+
+    app = FastAPI()
+    app.include_router(get_pooled_playground_router(pool))
+    client = TestClient(app)
+
+    listed = client.post(
+        "/playground/agent/sessions/all", json={"agent_id": "example-agent", "user_id": "ada"}
+    )
+    assert [session["session_id"] for session in listed.json()] == ["session-1"]
+
+    # Another user's session is not found
+    body = {"agent_id": "example-agent", "session_id": "session-2", "user_id": "ada"}
+    assert client.post("/playground/agent/session/delete", json=body).status_code == 404
+
+    body = {"agent_id": "example-agent", "session_id": "session-1", "user_id": "ada"}
+    assert client.post("/playground/agent/session/delete", json=body).status_code == 200
+    # Neither the deleted session nor the template's session is written back
+    assert storage.get_all_session_ids() == ["session-2"]
+    assert template.session_id == template_session_id
@@ -0,0 +1,198 @@
+import time
+from threading import Event, Lock
+from types import SimpleNamespace
+from typing import Any, Dict
+
+from phi.agent import RunResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from agents.batch_runner import BatchRunner, ProviderRateLimiter
+from db.tables import BatchItem, BatchJob
+
+
+class FakeAgent:
+    def __init__(self, calls, fail_times=0):
+        self.model = SimpleNamespace(provider="OpenAI gpt-4o")
+        self.session_id = None
+        self.calls = calls
+        self.fail_times = fail_times
+
+    def run(self, message, stream=False):
+        with self.calls["lock"]:
+            self.calls["messages"].append(message)
+            attempt = self.calls["messages"].count(message)
+        if attempt <= self.fail_times:
+            raise RuntimeError("rate limited")
+        self.session_id = f"session-{message}"
+        return RunResponse(content=message.upper())
+
+
+def make_runner(tmp_path, fail_times=0, name="batches", agent_class=None, **kwargs):
+    # A database file, so the workers each get their own connection
+    engine = create_engine(
+        f"sqlite:///{tmp_path / name}.db",
+        connect_args={"check_same_thread": False, "timeout": 10},
+        execution_options={"schema_translate_map": {"public": None}},
+    )
+    for table in [BatchJob, BatchItem]:
+        table.metadata.tables[f"public.{table.__tablename__}"].create(engine)
+    calls: Dict[str, Any] = {"lock": Lock(), "messages": []}
+
+    def get_agent(agent_id, user_id):
+        if agent_id != "example-agent":
+            return None
+        return (agent_class or FakeAgent)(calls, fail_times=fail_times)
+
+    runner = BatchRunner(
+        session_factory=sessionmaker(bind=engine),
+        get_agent=get_agent,
+        max_workers=2,
+        runs_per_minute={},
+        poll_interval=0.05,
+        **kwargs,
+    )
+    return runner, calls
+
+
+def wait_for_job(runner, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = runner.get_job(job_id)
+        if job.status == "completed":
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"Job did not finish: {runner.get_job(job_id)}")
+
+
+def test_batch_items_run_and_page_in_order(tmp_path):
+    runner, calls = make_runner(tmp_path)
+    try:
+        job = runner.submit("example-agent", [f"input {i}" for i in range(5)], user_id="user")
+        assert job.total_items == 5
+
+        job = wait_for_job(runner, job.job_id)
+        assert (job.completed_items, job.failed_items) == (5, 0)
+        assert job.finished_at is not None
+
+        first_page = runner.list_items(job.job_id, limit=3)
+        assert [item.output for item in first_page.items] == ["INPUT 0", "INPUT 1", "INPUT 2"]
+        assert first_page.has_more
+        assert first_page.items[0].session_id == "session-input 0"
+
+        second_page = runner.list_items(job.job_id, limit=3, offset=3)
+        assert [item.position for item in second_page.items] == [3, 4]
+        assert not second_page.has_more
+        assert sorted(calls["messages"]) == [f"input {i}" for i in range(5)]
+    finally:
+        runner.stop()
+
+
+def test_failed_items_are_retried_until_max_attempts(tmp_path):
+    runner, calls = make_runner(tmp_path, name="retried", fail_times=1, max_attempts=2)
+    try:
+        job = wait_for_job(runner, runner.submit("example-agent", ["retried"]).job_id)
+        assert (job.completed_items, job.failed_items) == (1, 0)
+        assert runner.list_items(job.job_id).items[0].attempts == 2
+    finally:
+        runner.stop()
+
+    runner, calls = make_runner(tmp_path, name="failed", fail_times=5, max_attempts=1)
+    try:
+        job = wait_for_job(runner, runner.submit("example-agent", ["failed"]).job_id)
+        assert (job.completed_items, job.failed_items) == (0, 1)
+        [item] = runner.list_items(job.job_id, status="failed").items
+        assert item.error == "rate limited"
+    finally:
+        runner.stop()
+
+
+def test_unknown_agent_fails_its_items(tmp_path):
+    runner, calls = make_runner(tmp_path)
+    try:
+        job = wait_for_job(runner, runner.submit("missing-agent", ["a", "b"]).job_id)
+        assert job.failed_items == 2
+        assert calls["messages"] == []
+    finally:
+        runner.stop()
+
+
+class StalledFirstAttemptAgent(FakeAgent):
+    """Hangs on the first attempt until released, so the item is run again after item_timeout."""
+
+    release = Event()
+
+    def run(self, message, stream=False):
+        with self.calls["lock"]:
+            self.calls["messages"].append(message)
+            attempt = len(self.calls["messages"])
+        if attempt == 1:
+            self.release.wait(timeout=10)
+            return RunResponse(content="stale answer")
+        self.session_id = "session-rerun"
+        return RunResponse(content="fresh answer")
+
+
+def test_an_attempt_that_was_run_again_is_not_counted(tmp_path):
+    runner, calls = make_runner(tmp_path, agent_class=StalledFirstAttemptAgent, item_timeout=0.2)
+    try:
+        job = wait_for_job(runner, runner.submit("example-agent", ["slow"]).job_id)
+        assert (job.completed_items, job.failed_items) == (1, 0)
+
+        StalledFirstAttemptAgent.release.set()
+        # The stalled first attempt finishes after the item was run again
+        deadline = time.monotonic() + 5
+        while runner._running and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+        job = runner.get_job(job.job_id)
+        assert (job.completed_items, job.failed_items) == (1, 0)
+        [item] = runner.list_items(job.job_id).items
+        assert (item.output, item.session_id, item.attempts) == ("fresh answer", "session-rerun", 2)
+    finally:
+        runner.stop()
+
+
+class StalledAgent(FakeAgent):
+    """Never finishes an attempt within item_timeout."""
+
+    release = Event()
+
+    def run(self, message, stream=False):
+        with self.calls["lock"]:
+            self.calls["messages"].append(message)
+        self.release.wait(timeout=10)
+        return RunResponse(content="too late")
+
+
+def test_items_that_always_time_out_fail_after_max_attempts(tmp_path):
+    runner, calls = make_runner(tmp_path, agent_class=StalledAgent, item_timeout=0.2, max_attempts=2)
+    try:
+        job = wait_for_job(runner, runner.submit("example-agent", ["slow"]).job_id)
+        assert (job.completed_items, job.failed_items) == (0, 1)
+        [item] = runner.list_items(job.job_id).items
+        assert (item.status, item.attempts) == ("failed", 2)
+        assert item.error is not None and "Did not finish" in item.error
+        assert len(calls["messages"]) == 2
+    finally:
+        StalledAgent.release.set()
+        runner.stop()
+
+    # The late attempts do not change the failed item
+    job = runner.get_job(job.job_id)
+    assert (job.completed_items, job.failed_items) == (0, 1)
+
+
+def test_rate_limiter_spaces_runs_per_provider():
+    limiter = ProviderRateLimiter({"OpenAI": 600})
+
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire("OpenAI")
+    # 600 runs per minute start 0.1s apart
+    assert time.monotonic() - start >= 0.19
+
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire("Groq")
+    assert time.monotonic() - start < 0.05
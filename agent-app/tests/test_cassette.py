@@ -0,0 +1,168 @@
+import time
+from typing import Any, Dict, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from agents.cassette import Cassette, CassetteMiss
+
+
+class Article(BaseModel):
+    title: str
+    words: int
+
+
+def test_recorded_calls_are_replayed_without_calling_through(tmp_path):
+    path = str(tmp_path / "cassette.json")
+    recorder = Cassette(path, mode="record")
+    assert recorder.call("tool", {"query": "solar"}, lambda: "results") == "results"
+    assert list(recorder.stream("model_stream", {"prompt": "hi"}, lambda: iter(["a", "b"]))) == ["a", "b"]
+    assert recorder.call("model", {"prompt": "article"}, lambda: Article(title="t", words=3)) == Article(
+        title="t", words=3
+    )
+    recorder.save()
+
+    def fail():
+        raise AssertionError("replay must not call through")
+
+    player = Cassette(path, mode="replay")
+    assert player.call("tool", {"query": "solar"}, fail) == "results"
+    assert list(player.stream("model_stream", {"prompt": "hi"}, fail)) == ["a", "b"]
+    assert player.call("model", {"prompt": "article"}, fail) == Article(title="t", words=3)
+    with pytest.raises(CassetteMiss):
+        player.call("tool", {"query": "wind"}, fail)
+
+
+def test_identical_requests_replay_in_recorded_order(tmp_path):
+    path = str(tmp_path / "cassette.json")
+    recorder = Cassette(path, mode="record")
+    recorder.call("model", {"prompt": "same"}, lambda: "first")
+    recorder.call("model", {"prompt": "same"}, lambda: "second")
+    recorder.save()
+
+    player = Cassette(path, mode="replay")
+    answers = [player.call("model", {"prompt": "same"}, lambda: None) for _ in range(3)]
+    assert answers == ["first", "second", "second"]
+
+
+def test_replay_reproduces_scaled_latency(tmp_path):
+    path = str(tmp_path / "cassette.json")
+    recorder = Cassette(path, mode="record")
+
+    def slow_call() -> str:
+        time.sleep(0.1)
+        return "done"
+
+    recorder.call("model", {"prompt": "slow"}, slow_call)
+    recorder.save()
+
+    start = time.perf_counter()
+    Cassette(path, mode="replay").call("model", {"prompt": "slow"}, lambda: None)
+    assert time.perf_counter() - start < 0.05
+
+    start = time.perf_counter()
+    Cassette(path, mode="replay", latency_scale=1).call("model", {"prompt": "slow"}, lambda: None)
+    assert time.perf_counter() - start >= 0.1
+
+
+def test_agent_model_and_tool_calls_are_replayed(tmp_path):
+    from openai import OpenAI
+    from openai.types.chat import ChatCompletion
+    from phi.agent import Agent
+    from phi.model.openai import OpenAIChat
+
+    from agents.cassette import use_cassette
+
+    calls = []
+
+    def create(model, messages, **kwargs):
+        calls.append("model")
+        message: Dict[str, Any]
+        if messages[-1]["role"] == "tool":
+            message = {"role": "assistant", "content": f"Forecast: {messages[-1]['content']}"}
+        else:
+            function = {"name": "get_weather", "arguments": '{"city": "Paris"}'}
+            message = {
+                "role": "assistant",
+                "tool_calls": [{"id": "call_1", "type": "function", "function": function}],
+            }
+        return ChatCompletion.model_validate(
+            {
+                "id": "chatcmpl",
+                "object": "chat.completion",
+                "created": 0,
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+            }
+        )
+
+    def get_weather(city: str) -> str:
+        """Get the weather for a city."""
+        calls.append("tool")
+        return f"sunny in {city}"
+
+    client = OpenAI(api_key="test")
+    client.chat.completions.create = create  # type: ignore
+    path = str(tmp_path / "agent.json")
+
+    with use_cassette(path, mode="record"):
+        agent = Agent(model=OpenAIChat(id="gpt-4o", client=client), tools=[get_weather])
+        assert agent.run("Weather in Paris?").content == "Forecast: sunny in Paris"
+    assert calls == ["model", "tool", "model"]
+
+    with use_cassette(path, mode="replay"):
+        agent = Agent(model=OpenAIChat(id="gpt-4o", client=client), tools=[get_weather])
+        assert agent.run("Weather in Paris?").content == "Forecast: sunny in Paris"
+    assert calls == ["model", "tool", "model"]
+
+
+def answer_with_shared_client(prompt: str, max_workers: Optional[int]) -> None:
+    from phi.agent import Agent
+    from phi.model.openai import OpenAIChat
+
+    from agents.agent_pool import get_openai_client
+
+    agent = Agent(model=OpenAIChat(id="gpt-4o", client=get_openai_client()))
+    assert agent.run(prompt).content == "Recorded answer"
+
+
+def test_benchmarks_replay_without_an_api_key(tmp_path, monkeypatch):
+    from openai import OpenAI
+    from openai.types.chat import ChatCompletion
+    from phi.agent import Agent
+    from phi.model.openai import OpenAIChat
+
+    from agents import pipeline_benchmark
+    from agents.agent_pool import get_openai_client
+    from agents.cassette import use_cassette
+
+    def create(model, messages, **kwargs):
+        message = {"role": "assistant", "content": "Recorded answer"}
+        return ChatCompletion.model_validate(
+            {
+                "id": "chatcmpl",
+                "object": "chat.completion",
+                "created": 0,
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+            }
+        )
+
+    client = OpenAI(api_key="test")
+    client.chat.completions.create = create  # type: ignore
+    path = str(tmp_path / "benchmark.json")
+    with use_cassette(path, mode="record"):
+        Agent(model=OpenAIChat(id="gpt-4o", client=client)).run("Hello")
+
+    # Set first, so the placeholder key is removed again after the test
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.delenv("OPENAI_API_KEY")
+    monkeypatch.setitem(pipeline_benchmark.TARGETS, "answer", answer_with_shared_client)
+    get_openai_client.cache_clear()
+    try:
+        timings = pipeline_benchmark.replay(
+            "answer", "Hello", path, max_workers=None, repeat=2, latency_scale=0
+        )
+    finally:
+        get_openai_client.cache_clear()
+    assert len(timings) == 2
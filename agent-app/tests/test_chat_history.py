@@ -0,0 +1,51 @@
+from utils.chat_history import ChatHistory
+
+
+def test_history_drops_hidden_roles_and_finds_image():
+    image = {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,abc"}}
+    history = ChatHistory.from_agent_messages(
+        "session",
+        [
+            {"role": "system", "content": "You are helpful"},
+            {"role": "user", "content": [{"type": "text", "text": "What is this?"}, image]},
+            {"role": "tool", "content": "{}"},
+            {"role": "assistant", "content": "A cat"},
+        ],
+    )
+
+    assert [message["role"] for message in history.messages] == ["user", "assistant"]
+    assert history.image_url == "data:image/jpeg;base64,abc"
+
+
+def test_empty_history_starts_with_greeting():
+    history = ChatHistory.from_agent_messages("session", [])
+
+    assert history.messages == [{"role": "assistant", "content": "Ask me anything..."}]
+    assert history.image_url is None
+
+
+def test_first_prompt_of_a_session_has_no_answers_before_it():
+    history = ChatHistory.from_agent_messages("session", [])
+    history.append({"role": "user", "content": "What is phidata?"})
+    assert not history.has_answers
+
+    history.append({"role": "assistant", "content": "A framework for building agents"})
+    history.append({"role": "user", "content": "And what else?"})
+    assert history.has_answers
+
+
+def test_only_latest_page_is_visible_until_older_messages_are_requested():
+    messages = [{"role": "user", "content": str(i)} for i in range(45)]
+    history = ChatHistory.from_agent_messages("session", messages, page_size=20)
+
+    assert [m["content"] for m in history.visible_messages()] == [str(i) for i in range(25, 45)]
+    assert history.hidden_count == 25
+
+    history.append({"role": "assistant", "content": "45"})
+    assert len(history.visible_messages()) == 20
+    assert history.visible_messages()[-1]["content"] == "45"
+
+    history.show_older(20)
+    history.show_older(20)
+    assert history.hidden_count == 0
+    assert len(history.visible_messages()) == 46
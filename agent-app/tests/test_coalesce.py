@@ -0,0 +1,157 @@
+import asyncio
+from typing import List
+
+from utils.coalesce import StreamCoalescer
+
+
+async def collect(stream):
+    return [item async for item in stream]
+
+
+def make_start(calls, items, gate=None, error=None):
+    async def start():
+        calls.append(1)
+
+        async def source():
+            for item in items:
+                if gate is not None:
+                    await gate.wait()
+                yield {"content": item}
+            if error is not None:
+                raise error
+
+        return source()
+
+    return start
+
+
+def serialize(item):
+    return item["content"]
+
+
+def test_concurrent_subscribers_share_one_run():
+    async def run():
+        coalescer = StreamCoalescer()
+        calls: List[int] = []
+        gate = asyncio.Event()
+        start = make_start(calls, ["a", "b", "c"], gate=gate)
+        streams = [coalescer.subscribe("key", start, serialize) for _ in range(5)]
+        tasks = [asyncio.create_task(collect(stream)) for stream in streams]
+        await asyncio.sleep(0)
+        gate.set()
+        results = await asyncio.gather(*tasks)
+        return calls, results, coalescer.in_flight
+
+    calls, results, in_flight = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert results == [["a", "b", "c"]] * 5
+    assert in_flight == 0
+
+
+def test_late_subscribers_replay_the_output_so_far():
+    async def run():
+        coalescer = StreamCoalescer()
+        calls: List[int] = []
+        gate = asyncio.Event()
+
+        async def start():
+            calls.append(1)
+
+            async def source():
+                yield {"content": "a"}
+                await gate.wait()
+                yield {"content": "b"}
+
+            return source()
+
+        first = coalescer.subscribe("key", start, serialize)
+        first_item = await first.__anext__()
+        late = asyncio.create_task(collect(coalescer.subscribe("key", make_start(calls, ["x"]), serialize)))
+        await asyncio.sleep(0)
+        gate.set()
+        return calls, [first_item] + await collect(first), await late
+
+    calls, first, late = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert first == late == ["a", "b"]
+
+
+def test_finished_runs_are_not_reused():
+    async def run():
+        coalescer = StreamCoalescer()
+        calls: List[int] = []
+        await collect(coalescer.subscribe("key", make_start(calls, ["a"]), serialize))
+        await collect(coalescer.subscribe("key", make_start(calls, ["b"]), serialize))
+        return calls
+
+    assert len(asyncio.run(run())) == 2
+
+
+def test_errors_reach_every_subscriber():
+    async def run():
+        coalescer = StreamCoalescer()
+        start = make_start([], ["a"], error=RuntimeError("model unavailable"))
+        streams = [coalescer.subscribe("key", start, serialize) for _ in range(2)]
+        return await asyncio.gather(*(collect(stream) for stream in streams), return_exceptions=True)
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_the_run_is_cancelled_when_every_subscriber_leaves():
+    closed = []
+
+    async def start():
+        async def source():
+            try:
+                while True:
+                    yield {"content": "a"}
+                    await asyncio.sleep(0.01)
+            finally:
+                closed.append(True)
+
+        return source()
+
+    async def run():
+        coalescer = StreamCoalescer()
+        streams = [coalescer.subscribe("key", start, serialize) for _ in range(2)]
+        for stream in streams:
+            await stream.__anext__()
+        for stream in streams:
+            await stream.aclose()
+        await asyncio.sleep(0.05)
+        return coalescer.in_flight
+
+    assert asyncio.run(run()) == 0
+    assert closed == [True]
+
+
+def test_different_keys_run_separately():
+    async def run():
+        coalescer = StreamCoalescer()
+        calls: List[int] = []
+        streams = [coalescer.subscribe(key, make_start(calls, [key]), serialize) for key in ["a", "b"]]
+        return calls, await asyncio.gather(*(collect(stream) for stream in streams))
+
+    calls, results = asyncio.run(run())
+
+    assert len(calls) == 2
+    assert results == [["a"], ["b"]]
+
+
+def test_subscribers_that_never_read_hold_no_run_open():
+    async def run():
+        coalescer = StreamCoalescer()
+        calls: List[int] = []
+        # As when the client disconnects before the response starts
+        coalescer.subscribe("key", make_start(calls, ["a"]), serialize)
+        await asyncio.sleep(0.01)
+        return calls, coalescer.in_flight
+
+    calls, in_flight = asyncio.run(run())
+
+    assert calls == []
+    assert in_flight == 0
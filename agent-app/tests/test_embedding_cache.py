@@ -0,0 +1,91 @@
+from typing import List
+
+from openai import OpenAI
+from openai.types import CreateEmbeddingResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from agents.embedder import BatchOpenAIEmbedder
+from agents.embedding_cache import EmbeddingCache, get_content_hash
+from db.tables import EmbeddingCacheEntry
+
+
+def make_cache():
+    engine = create_engine(
+        "sqlite://", poolclass=StaticPool, execution_options={"schema_translate_map": {"public": None}}
+    )
+    EmbeddingCacheEntry.metadata.tables[f"public.{EmbeddingCacheEntry.__tablename__}"].create(engine)
+    return EmbeddingCache(session_factory=sessionmaker(bind=engine))
+
+
+def make_embedder(requests, cache, model="text-embedding-3-small"):
+    def create(input, model, **kwargs):
+        texts = input if isinstance(input, list) else [input]
+        requests.append(list(texts))
+        return CreateEmbeddingResponse.model_validate(
+            {
+                "object": "list",
+                "model": model,
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": [float(len(text)), 1.0]}
+                    for i, text in enumerate(texts)
+                ],
+                "usage": {"prompt_tokens": len(texts), "total_tokens": len(texts)},
+            }
+        )
+
+    client = OpenAI(api_key="test")
+    client.embeddings.create = create  # type: ignore
+    return BatchOpenAIEmbedder(openai_client=client, model=model, cache=cache)
+
+
+def test_content_hash_ignores_whitespace_differences():
+    assert get_content_hash("Hello   world\n") == get_content_hash(" Hello world")
+    assert get_content_hash("Hello world") != get_content_hash("Hello, world")
+
+
+def test_unchanged_chunks_skip_the_embedding_api():
+    requests: List[List[str]] = []
+    cache = make_cache()
+    embedder = make_embedder(requests, cache)
+
+    embedder.prefetch(["first chunk", "second chunk"])
+    assert [embedder.get_embedding_and_usage(text)[0] for text in ["first chunk", "second chunk"]] == [
+        [11.0, 1.0],
+        [12.0, 1.0],
+    ]
+
+    # A new embedder, as after a restart, only embeds the chunk that changed
+    embedder = make_embedder(requests, cache)
+    embedder.prefetch(["first  chunk", "second chunk, edited"])
+    assert embedder.get_embedding_and_usage("first  chunk") == ([11.0, 1.0], None)
+    assert embedder.get_embedding_and_usage("second chunk, edited")[0] == [20.0, 1.0]
+    assert requests == [["first chunk", "second chunk"], ["second chunk, edited"]]
+
+
+def test_documents_embedded_without_prefetch_are_cached():
+    requests: List[List[str]] = []
+    cache = make_cache()
+
+    make_embedder(requests, cache).get_embedding_and_usage("a chunk")
+    make_embedder(requests, cache).get_embedding_and_usage("a chunk")
+    assert requests == [["a chunk"]]
+
+
+def test_embeddings_are_cached_per_model():
+    requests: List[List[str]] = []
+    cache = make_cache()
+
+    make_embedder(requests, cache).prefetch(["a chunk"])
+    make_embedder(requests, cache, model="text-embedding-ada-002").prefetch(["a chunk"])
+    assert len(requests) == 2
+
+
+def test_database_errors_fall_back_to_the_api():
+    requests: List[List[str]] = []
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    embedder = make_embedder(requests, EmbeddingCache(session_factory=sessionmaker(bind=engine)))
+
+    assert embedder.get_embedding_and_usage("a chunk")[0] == [7.0, 1.0]
+    assert requests == [["a chunk"]]
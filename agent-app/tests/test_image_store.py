@@ -0,0 +1,56 @@
+from io import BytesIO
+
+from PIL import Image
+from phi.model.message import Message
+
+from agents.image_refs import resolve_image_refs
+from utils.image_store import ImageStore
+
+
+def encode(image: Image.Image, format: str) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def test_large_images_are_downscaled_to_jpeg(tmp_path):
+    store = ImageStore(str(tmp_path))
+    ref = store.ingest(encode(Image.new("RGBA", (4000, 3000), (255, 0, 0, 128)), "PNG"))
+
+    image = Image.open(store.get_path(ref))
+    assert image.format == "JPEG"
+    assert image.size == (1024, 768)
+
+
+def test_uploads_are_cached_by_content_hash(tmp_path, monkeypatch):
+    store = ImageStore(str(tmp_path))
+    data = encode(Image.new("RGB", (1200, 900), (0, 128, 255)), "PNG")
+    ref = store.ingest(data)
+
+    def prepare(data):
+        raise AssertionError("the upload was processed twice")
+
+    monkeypatch.setattr(store, "prepare", prepare)
+    assert store.ingest(data) == ref
+
+
+def test_small_jpegs_are_kept_as_uploaded(tmp_path):
+    store = ImageStore(str(tmp_path))
+    data = encode(Image.new("RGB", (640, 480), (0, 255, 0)), "JPEG")
+
+    assert store.get_path(store.ingest(data)).read_bytes() == data
+
+
+def test_references_are_resolved_only_for_the_request(tmp_path):
+    store = ImageStore(str(tmp_path))
+    ref = store.ingest(encode(Image.new("RGB", (64, 64)), "JPEG"))
+    message = Message(
+        role="user",
+        content=[{"type": "text", "text": "What is this?"}, {"type": "image_url", "image_url": {"url": ref}}],
+    )
+
+    resolved = resolve_image_refs([message], store=store)
+
+    assert isinstance(resolved[0].content, list) and isinstance(message.content, list)
+    assert resolved[0].content[1]["image_url"]["url"].startswith("data:image/jpeg;base64,")
+    assert message.content[1]["image_url"]["url"] == ref
@@ -0,0 +1,117 @@
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, cast
+
+from openai import OpenAI
+from openai.types import CreateEmbeddingResponse
+from phi.document import Document
+from phi.knowledge.agent import AgentKnowledge
+
+from agents.embedder import BatchOpenAIEmbedder
+from agents.knowledge_ingestion import IngestionStatus, KnowledgeIngestor
+
+
+def make_embedder(requests):
+    def create(input, model, **kwargs):
+        requests.append(list(input) if isinstance(input, list) else [input])
+        texts = input if isinstance(input, list) else [input]
+        return CreateEmbeddingResponse.model_validate(
+            {
+                "object": "list",
+                "model": model,
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": [float(len(text))]}
+                    for i, text in enumerate(texts)
+                ],
+                "usage": {"prompt_tokens": len(texts), "total_tokens": len(texts)},
+            }
+        )
+
+    client = OpenAI(api_key="test")
+    client.embeddings.create = create  # type: ignore
+    return BatchOpenAIEmbedder(openai_client=client)
+
+
+class FakeVectorDb:
+    def __init__(self, embedder):
+        self.embedder = embedder
+        self.rows: Dict[str, Optional[List[float]]] = {}
+        self.on_upsert: Optional[Callable[[], None]] = None
+
+    def create(self):
+        pass
+
+    def upsert(self, documents, filters=None):
+        time.sleep(0.01)
+        for document in documents:
+            document.embed(embedder=self.embedder)
+            self.rows[document.content] = document.embedding
+        if self.on_upsert is not None:
+            self.on_upsert()
+
+
+def make_knowledge(vector_db: FakeVectorDb) -> AgentKnowledge:
+    return cast(AgentKnowledge, SimpleNamespace(vector_db=vector_db))
+
+
+def wait_for(job, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not job.done and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_chunks_are_embedded_in_batched_requests():
+    requests: List[List[str]] = []
+    vector_db = FakeVectorDb(make_embedder(requests))
+    ingestor = KnowledgeIngestor(make_knowledge(vector_db), embed_workers=2, batch_size=4)
+
+    documents = [Document(content="x" * i) for i in range(1, 11)]
+    job = ingestor.submit("doc.pdf", lambda: documents)
+    wait_for(job)
+
+    assert job.status == IngestionStatus.completed
+    assert (job.loaded_chunks, job.total_chunks, job.progress) == (10, 10, 1.0)
+    assert sorted(len(request) for request in requests) == [2, 4, 4]
+    assert vector_db.rows["xxx"] == [3.0]
+
+
+def test_failed_reads_are_reported_on_the_job():
+    def read():
+        raise ValueError("corrupt file")
+
+    ingestor = KnowledgeIngestor(make_knowledge(FakeVectorDb(make_embedder([]))))
+    job = ingestor.submit("broken.pdf", read)
+    wait_for(job)
+
+    assert job.status == IngestionStatus.failed
+    assert job.error == "corrupt file"
+    assert ingestor.get_job(job.job_id) is job
+
+
+def test_batches_are_loaded_while_the_source_is_still_read():
+    vector_db = FakeVectorDb(make_embedder([]))
+    ingestor = KnowledgeIngestor(make_knowledge(vector_db), batch_size=2)
+    first_batch_loaded = threading.Event()
+    vector_db.on_upsert = first_batch_loaded.set
+
+    def read():
+        yield from [Document(content="a"), Document(content="bb")]
+        # The rest of the source only arrives once the first batch is in the vector db
+        assert first_batch_loaded.wait(timeout=5)
+        yield Document(content="ccc")
+
+    job = ingestor.submit("https://example.com", read)
+    wait_for(job)
+
+    assert job.status == IngestionStatus.completed
+    assert sorted(vector_db.rows) == ["a", "bb", "ccc"]
+
+
+def test_on_change_is_called_once_chunks_are_loaded():
+    changed = threading.Event()
+    ingestor = KnowledgeIngestor(make_knowledge(FakeVectorDb(make_embedder([]))), on_change=changed.set)
+
+    ingestor.submit("doc.pdf", lambda: [Document(content="a")])
+
+    assert changed.wait(timeout=5)
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api.metrics import (
+    MetricsMiddleware,
+    agent_runs_in_flight,
+    agent_tokens_total,
+    agent_tool_call_duration_seconds,
+    http_request_duration_seconds,
+    track_agent_run,
+)
+from utils.metrics import MetricsRegistry
+
+
+def test_histograms_render_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency", ["route"], buckets=[0.1, 1])
+
+    for value in [0.05, 0.5, 0.7, 3]:
+        latency.observe(value, route="/v1/health")
+
+    assert registry.render().splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/v1/health",le="0.1"} 1',
+        'latency_seconds_bucket{route="/v1/health",le="1"} 3',
+        'latency_seconds_bucket{route="/v1/health",le="+Inf"} 4',
+        'latency_seconds_sum{route="/v1/health"} 4.25',
+        'latency_seconds_count{route="/v1/health"} 4',
+    ]
+
+
+def test_collectors_run_on_render_and_labels_are_escaped():
+    registry = MetricsRegistry()
+    pool = registry.gauge("pool_connections", "Connections", ["state"])
+    registry.add_collector(lambda: pool.set(3, state='checked "out"'))
+
+    assert 'pool_connections{state="checked \\"out\\""} 3' in registry.render()
+
+
+def test_requests_are_timed_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: str):
+        return {"item_id": item_id}
+
+    client = TestClient(app)
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/missing")
+
+    assert http_request_duration_seconds.get_count(method="GET", route="/items/{item_id}", status="200") == 2
+    assert http_request_duration_seconds.get_count(method="GET", route="unmatched", status="404") == 1
+
+
+def test_agent_runs_record_model_and_tool_calls():
+    model = SimpleNamespace(
+        id="gpt-4o",
+        metrics={
+            "response_times": [0.8, 1.2],
+            "input_tokens": 120,
+            "output_tokens": 30,
+            "tool_call_times": {"duckduckgo_search": [0.4]},
+        },
+    )
+    agent = SimpleNamespace(agent_id="metrics-agent", model=model)
+
+    with track_agent_run(agent):  # type: ignore[arg-type]
+        assert agent_runs_in_flight.get(agent_id="metrics-agent") == 1
+
+    assert agent_runs_in_flight.get(agent_id="metrics-agent") == 0
+    assert agent_tokens_total.get(agent_id="metrics-agent", model="gpt-4o", type="input") == 120
+    assert agent_tokens_total.get(agent_id="metrics-agent", model="gpt-4o", type="output") == 30
+    assert agent_tool_call_duration_seconds.get_count(agent_id="metrics-agent", tool="duckduckgo_search") == 1
@@ -0,0 +1,131 @@
+import json
+from pathlib import Path
+from typing import List, cast
+
+import pytest
+from phi.agent import Agent, RunResponse
+
+from agents.research_pipeline import ResearchStep
+from agents.settings import agent_settings
+
+
+@pytest.fixture
+def batch(monkeypatch, tmp_path):
+    pytest.importorskip("yfinance")
+    # Importing builds the PM research agents and their OpenAI client, which needs a key but makes no request
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from agents import pm_research_batch
+
+    monkeypatch.setattr(pm_research_batch, "agent_response_cache", None)
+    monkeypatch.setattr(agent_settings, "research_metrics_file", str(tmp_path / "metrics.jsonl"))
+    return pm_research_batch
+
+
+class EchoAgent:
+    """Stands in for an Agent: records the prompt and echoes it."""
+
+    name = "Echo"
+    model = None
+
+    def __init__(self, prompts: List[str]):
+        self.prompts = prompts
+
+    def run(self, prompt: str):
+        self.prompts.append(prompt)
+        return RunResponse(content=f"done: {prompt}")
+
+
+def test_business_types_are_read_from_the_named_column(batch, tmp_path):
+    with_header = tmp_path / "with_header.csv"
+    with_header.write_text("id,Business_Type\n1,Fintech\n2, Retail \n3,\n4,Fintech\n", encoding="utf-8")
+    without_header = tmp_path / "without_header.csv"
+    without_header.write_text("Fintech,ignored\nHealthcare\n", encoding="utf-8")
+    empty = tmp_path / "empty.csv"
+    empty.write_text("", encoding="utf-8")
+
+    assert batch.read_business_types(str(with_header)) == ["Fintech", "Retail"]
+    assert batch.read_business_types(str(without_header)) == ["Fintech", "Healthcare"]
+    assert batch.read_business_types(str(empty)) == []
+
+
+def test_checkpoints_keep_sections_and_skip_unreadable_files(batch, tmp_path):
+    checkpoint = batch.SectionCheckpoint(tmp_path / "fintech")
+    assert checkpoint.load_sections() == {} and checkpoint.get_report() is None
+
+    checkpoint.save_section("Industry News", "news")
+    checkpoint.save_section("Market Analysis", "market")
+    (tmp_path / "fintech" / "section_broken.json").write_text("{", encoding="utf-8")
+    checkpoint.save_report("reports/fintech.docx")
+
+    assert checkpoint.load_sections() == {"Industry News": "news", "Market Analysis": "market"}
+    assert checkpoint.get_report() == "reports/fintech.docx"
+    assert not list((tmp_path / "fintech").glob("*.tmp"))
+
+
+def test_failed_industries_are_retried_with_backoff(batch, monkeypatch):
+    attempts: List[str] = []
+    sleeps: List[float] = []
+
+    def flaky_analysis(business_type, **kwargs):
+        attempts.append(business_type)
+        if len(attempts) < 3:
+            raise RuntimeError("rate limited")
+        return "report.docx"
+
+    monkeypatch.setattr(batch, "analyze_industry", flaky_analysis)
+    monkeypatch.setattr(batch.time, "sleep", sleeps.append)
+
+    assert batch.analyze_with_retries("Fintech", retries=2) == "report.docx"
+    assert sleeps == [30, 60]
+
+    attempts.clear()
+    sleeps.clear()
+    with pytest.raises(RuntimeError, match="rate limited"):
+        batch.analyze_with_retries("Fintech", retries=1)
+    assert len(attempts) == 2 and sleeps == [30]
+
+
+def test_analysis_resumes_from_a_partial_checkpoint(batch, monkeypatch, tmp_path):
+    prompts: List[str] = []
+
+    def build_steps(business_type):
+        return [
+            ResearchStep(title=title, agent=cast(Agent, EchoAgent(prompts)), prompt=title.lower(), status="")
+            for title in ["Industry News", "Market Analysis"]
+        ]
+
+    monkeypatch.setattr(batch, "build_research_steps", build_steps)
+    checkpoint_dir, reports_dir = tmp_path / "checkpoints", tmp_path / "reports"
+    batch.SectionCheckpoint(checkpoint_dir / "food_beverage").save_section(
+        "Industry News", "checkpointed news"
+    )
+
+    report = batch.analyze_industry(
+        "Food/Beverage", checkpoint_dir=str(checkpoint_dir), reports_dir=str(reports_dir)
+    )
+
+    # Only the missing section ran, and the slash did not end up in the report's path
+    assert prompts == ["market analysis"]
+    assert Path(report).parent == reports_dir and Path(report).name.startswith(
+        "food_beverage_market_analysis_"
+    )
+    saved = json.loads((checkpoint_dir / "food_beverage" / "report.json").read_text(encoding="utf-8"))
+    assert saved == {"filename": report}
+
+    # A finished industry is not run again
+    assert (
+        batch.analyze_industry(
+            "Food/Beverage", checkpoint_dir=str(checkpoint_dir), reports_dir=str(reports_dir)
+        )
+        == report
+    )
+    assert prompts == ["market analysis"]
+
+
+def test_reports_saved_at_the_same_time_get_their_own_files(batch, tmp_path):
+    from agents.pm_research_1 import ReportFormatter
+
+    filenames = [ReportFormatter().save("Food/Beverage", reports_dir=str(tmp_path)) for _ in range(3)]
+
+    assert len(set(filenames)) == 3
+    assert all(Path(filename).parent == tmp_path for filename in filenames)
@@ -0,0 +1,45 @@
+from agents.research_handoff import build_handoff_digest, estimate_tokens, extract_sources
+
+NEWS = """Running:
+ - google_search(query=solar news)
+
+## Latest developments
+
+- **SunCo** raised $120M in a Series C round in March 2024 (https://example.com/sunco).
+- Analysts expect module prices to fall another 10% by 2025, see https://example.com/prices.
+- Several companies shared their views on the market during the week.
+
+The industry is growing quickly. Installations reached 447 GW in 2023 according to the IEA.
+"""
+
+
+def test_digest_keeps_facts_and_sources():
+    digest = build_handoff_digest([("Industry News", NEWS)], max_tokens=400)
+
+    assert digest.startswith("Key findings from earlier research:")
+    assert "## Industry News" in digest
+    assert "- SunCo raised $120M in a Series C round in March 2024" in digest
+    assert "Installations reached 447 GW in 2023 according to the IEA." in digest
+    assert "Sources: https://example.com/sunco, https://example.com/prices" in digest
+    assert "google_search" not in digest
+
+
+def test_digest_stays_within_budget_and_prefers_figures():
+    long_section = NEWS + "\n".join(f"- Filler observation number {i} about the market" for i in range(200))
+
+    digest = build_handoff_digest([("Industry News", long_section), ("Market", long_section)], 200)
+
+    assert estimate_tokens(digest) <= 200 + 20
+    assert "$120M" in digest
+    assert "Filler observation number 199" not in digest
+
+
+def test_empty_sections_produce_no_digest():
+    assert build_handoff_digest([("Industry News", "  ")], max_tokens=400) == ""
+
+
+def test_sources_are_unique_and_trimmed():
+    assert extract_sources("See https://a.com/x. Also https://a.com/x, and (https://b.com)") == [
+        "https://a.com/x",
+        "https://b.com",
+    ]
@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+from typing import cast
+
+from phi.agent import Agent, RunResponse
+
+from agents.research_metrics import get_step_metrics
+from agents.research_pipeline import ResearchStep
+
+
+def test_step_metrics_from_run_response():
+    agent = SimpleNamespace(name="Web Agent", model=SimpleNamespace(id="gpt-4o"))
+    step = ResearchStep(title="Industry News", agent=cast(Agent, agent), prompt="", status="")
+    step.started_at, step.finished_at = 10.0, 14.5
+    response = SimpleNamespace(
+        model="gpt-4o",
+        metrics={"time": [1.0, 2.0], "prompt_tokens": [100, 300], "completion_tokens": [20, 400]},
+        messages=[
+            SimpleNamespace(role="assistant", metrics={"time": 1.0}),
+            SimpleNamespace(
+                role="tool", tool_name="google_search", metrics={"time": 1.25}, tool_call_error=False
+            ),
+        ],
+    )
+
+    metrics = get_step_metrics(step, cast(RunResponse, response))
+
+    assert metrics.wall_time == 4.5
+    assert (metrics.model_calls, metrics.model_time) == (2, 3.0)
+    assert (metrics.prompt_tokens, metrics.completion_tokens) == (400, 420)
+    assert metrics.tool_time == 1.25
+    assert [t.tool_name for t in metrics.tool_calls] == ["google_search"]
+    assert not metrics.cached
@@ -0,0 +1,162 @@
+import threading
+import time
+from types import SimpleNamespace
+from typing import List, Set, Tuple, cast
+
+import pytest
+from phi.agent import Agent, RunResponse
+
+from agents.research_pipeline import ResearchStep, run_research_steps, validate_steps
+
+
+class SleepyAgent:
+    """Stands in for an Agent: sleeps, then echoes the prompt."""
+
+    def __init__(self, delay: float = 0.1):
+        self.delay = delay
+        self.started_at = 0.0
+
+    def run(self, prompt: str):
+        self.started_at = time.monotonic()
+        time.sleep(self.delay)
+        return RunResponse(content=f"done: {prompt}")
+
+
+def test_independent_steps_run_concurrently():
+    steps = [
+        ResearchStep(title=f"step-{i}", agent=cast(Agent, SleepyAgent(0.2)), prompt=str(i), status="")
+        for i in range(4)
+    ]
+
+    start = time.monotonic()
+    sections = run_research_steps(steps, max_workers=4)
+
+    assert time.monotonic() - start < 0.6
+    assert [section.title for section in sections] == ["step-0", "step-1", "step-2", "step-3"]
+
+
+def test_dependent_step_waits_for_upstream():
+    news, market = SleepyAgent(0.1), SleepyAgent(0.0)
+    steps = [
+        ResearchStep(title="Market", agent=cast(Agent, market), prompt="m", status="", depends_on=("News",)),
+        ResearchStep(title="News", agent=cast(Agent, news), prompt="n", status=""),
+    ]
+    completed: List[str] = []
+
+    sections = run_research_steps(
+        steps, max_workers=2, on_step_complete=lambda s, r: completed.append(s.title)
+    )
+
+    assert completed == ["News", "Market"]
+    assert market.started_at >= news.started_at + news.delay
+    assert {section.title: section.content for section in sections} == {
+        "Market": "done: m",
+        "News": "done: n",
+    }
+
+
+def test_callbacks_run_on_calling_thread():
+    threads: Set[int] = set()
+    steps = [
+        ResearchStep(title=str(i), agent=cast(Agent, SleepyAgent(0.0)), prompt="", status="")
+        for i in range(3)
+    ]
+
+    run_research_steps(steps, on_step_complete=lambda s, r: threads.add(threading.get_ident()))
+
+    assert threads == {threading.get_ident()}
+
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError, match="unknown step"):
+        validate_steps(
+            [
+                ResearchStep(
+                    title="a", agent=cast(Agent, SleepyAgent()), prompt="", status="", depends_on=("b",)
+                )
+            ]
+        )
+    with pytest.raises(ValueError, match="Circular"):
+        validate_steps(
+            [
+                ResearchStep(
+                    title="a", agent=cast(Agent, SleepyAgent()), prompt="", status="", depends_on=("b",)
+                ),
+                ResearchStep(
+                    title="b", agent=cast(Agent, SleepyAgent()), prompt="", status="", depends_on=("a",)
+                ),
+            ]
+        )
+
+
+class StreamingAgent:
+    """Stands in for an Agent that streams its response word by word."""
+
+    def __init__(self, words):
+        self.words = words
+        self.run_response = None
+
+    def run(self, prompt: str, stream: bool = False):
+        assert stream
+        for word in self.words:
+            time.sleep(0.01)
+            yield SimpleNamespace(content=word)
+        self.run_response = RunResponse(content="".join(self.words))
+
+
+def test_deltas_are_delivered_before_completion():
+    steps = [
+        ResearchStep(title="a", agent=cast(Agent, StreamingAgent(["one ", "two"])), prompt="", status=""),
+        ResearchStep(
+            title="b", agent=cast(Agent, StreamingAgent(["three"])), prompt="", status="", depends_on=("a",)
+        ),
+    ]
+    events: List[Tuple[str, str]] = []
+
+    sections = run_research_steps(
+        steps,
+        on_step_delta=lambda s, d: events.append((s.title, d)),
+        on_step_complete=lambda s, r: events.append((s.title, "<done>")),
+    )
+
+    assert events == [("a", "one "), ("a", "two"), ("a", "<done>"), ("b", "three"), ("b", "<done>")]
+    assert [section.content for section in sections] == ["one two", "three"]
+
+
+def test_completed_steps_are_not_run_again():
+    market = SleepyAgent(0.0)
+    steps = [
+        ResearchStep(title="News", agent=cast(Agent, SleepyAgent(0.0)), prompt="n", status=""),
+        ResearchStep(title="Market", agent=cast(Agent, market), prompt="m", status="", depends_on=("News",)),
+    ]
+
+    sections = run_research_steps(steps, completed={"News": "restored"})
+
+    assert [(section.title, section.content) for section in sections] == [
+        ("News", "restored"),
+        ("Market", "done: m"),
+    ]
+    assert steps[0].started_at is None
+
+
+def test_dependent_step_receives_digest_of_upstream_sections():
+    class PromptRecordingAgent(SleepyAgent):
+        def run(self, prompt: str):
+            self.prompt = prompt
+            return RunResponse(content="- Revenue grew 25% to $3.1B in 2024 (https://example.com/report)")
+
+    news, market = PromptRecordingAgent(), PromptRecordingAgent()
+    steps = [
+        ResearchStep(title="News", agent=cast(Agent, news), prompt="Find news", status=""),
+        ResearchStep(
+            title="Market", agent=cast(Agent, market), prompt="Analyze", status="", depends_on=("News",)
+        ),
+    ]
+
+    run_research_steps(steps)
+
+    assert news.prompt == "Find news"
+    assert market.prompt.startswith("Key findings from earlier research:")
+    assert "Revenue grew 25% to $3.1B in 2024" in market.prompt
+    assert "Sources: https://example.com/report" in market.prompt
+    assert market.prompt.endswith("\n\nAnalyze")
@@ -0,0 +1,52 @@
+import time
+from types import SimpleNamespace
+
+from agents.response_cache import ResponseCache
+
+
+def make_agent(model_id: str = "gpt-4o", instructions=None):
+    return SimpleNamespace(
+        name="Test Agent",
+        agent_id="test-agent",
+        model=SimpleNamespace(provider="OpenAI", id=model_id),
+        instructions=instructions or ["Be brief"],
+        tools=None,
+    )
+
+
+def test_responses_are_keyed_by_agent_configuration(tmp_path):
+    cache = ResponseCache(db_file=str(tmp_path / "cache.db"))
+    agent = make_agent()
+
+    cache.set(agent, "prompt", "answer")
+
+    assert cache.get(agent, "prompt") == "answer"
+    assert cache.get(agent, "other prompt") is None
+    assert cache.get(make_agent(model_id="gpt-4o-mini"), "prompt") is None
+    assert cache.get(make_agent(instructions=["Be verbose"]), "prompt") is None
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = ResponseCache(db_file=str(tmp_path / "cache.db"))
+    agent = make_agent()
+
+    cache.set(agent, "prompt", "answer", ttl=0)
+
+    assert cache.get(agent, "prompt") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(db_file=str(tmp_path / "cache.db"), max_entries=2)
+    agent = make_agent()
+
+    cache.set(agent, "a", "1")
+    time.sleep(0.01)
+    cache.set(agent, "b", "2")
+    time.sleep(0.01)
+    cache.get(agent, "a")
+    time.sleep(0.01)
+    cache.set(agent, "c", "3")
+
+    assert cache.get(agent, "a") == "1"
+    assert cache.get(agent, "b") is None
+    assert cache.get(agent, "c") == "3"
@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+from agents.search_broker import SearchBroker, normalize_query
+
+
+def test_normalize_query():
+    assert normalize_query('  "AI   Socks market size?" ') == "ai socks market size"
+    assert normalize_query("AI socks market size") == normalize_query("ai socks  market size.")
+
+
+def test_concurrent_identical_searches_share_one_request():
+    broker = SearchBroker()
+    calls = []
+
+    def search():
+        calls.append(1)
+        time.sleep(0.1)
+        return "results"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(broker.search(("q",), search))) for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["results"] * 5
+    assert len(calls) == 1
+    assert broker.hits == 4
+
+    # Completed results are served from memory
+    assert broker.search(("q",), search) == "results"
+    assert len(calls) == 1
+
+
+def test_failed_searches_are_retried():
+    broker = SearchBroker()
+
+    def fail():
+        raise RuntimeError("rate limited")
+
+    with pytest.raises(RuntimeError):
+        broker.search(("q",), fail)
+    assert broker.search(("q",), lambda: "results") == "results"
+
+
+def test_error_messages_are_not_remembered():
+    broker = SearchBroker()
+
+    assert broker.search(("q",), lambda: "Error: rate limited") == "Error: rate limited"
+    assert broker.search(("q",), lambda: "results") == "results"
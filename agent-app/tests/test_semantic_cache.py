@@ -0,0 +1,143 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, List, cast
+
+from phi.agent import Agent
+from phi.embedder.base import Embedder
+from phi.model.openai import OpenAIChat
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from agents.semantic_cache import SemanticCacheMatch, SemanticResponseCache, record_cached_answer
+
+
+class FakeEmbedder(Embedder):
+    model: str = "text-embedding-3-small"
+    calls: int = 0
+
+    def get_embedding(self, text):
+        self.calls += 1
+        return [float(len(text)), 1.0]
+
+
+class FakeSession:
+    def __init__(self, row, statements, added):
+        self.row = row
+        self.statements = statements
+        self.added = added
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def begin(self):
+        return self
+
+    def add(self, entry):
+        self.added.append(entry)
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+        return SimpleNamespace(first=lambda: self.row)
+
+
+def make_cache(row=None, threshold=0.9):
+    statements: List[Any] = []
+    added: List[Any] = []
+    cache = SemanticResponseCache(
+        session_factory=lambda: cast(Session, FakeSession(row, statements, added)),
+        embedder=FakeEmbedder(),
+        threshold=threshold,
+        ttl=60,
+    )
+    return cache, statements, added
+
+
+def make_agent(user_id="ada", instructions=None):
+    return Agent(
+        agent_id="example-agent",
+        user_id=user_id,
+        model=OpenAIChat(id="gpt-4o", api_key="test"),
+        instructions=instructions,
+    )
+
+
+def test_answers_above_the_threshold_are_served():
+    row = SimpleNamespace(content="Paris", prompt="What is the capital of France?", distance=0.04)
+    cache, statements, _ = make_cache(row=row)
+
+    match = cache.get(make_agent(), "Which city is the capital of France?")
+
+    assert match is not None
+    assert (match.content, match.prompt) == ("Paris", "What is the capital of France?")
+    assert round(match.similarity, 2) == 0.96
+    sql = statements[0].compile(dialect=postgresql.dialect())
+    assert "<=>" in str(sql)
+    assert "semantic_response_cache.user_id IS NOT DISTINCT FROM" in str(sql)
+    assert "semantic_response_cache.expires_at >" in str(sql)
+    assert "ada" in sql.params.values()
+
+
+def test_answers_below_the_threshold_are_misses():
+    row = SimpleNamespace(content="Paris", prompt="What is the capital of France?", distance=0.3)
+    cache, _, _ = make_cache(row=row)
+
+    assert cache.get(make_agent(), "What is the capital of Spain?") is None
+
+
+def test_answers_are_scoped_to_the_agent_configuration():
+    cache, _, added = make_cache()
+
+    cache.set(make_agent(), "Hello", "Hi there")
+    cache.set(make_agent(user_id=None, instructions=["Answer in French"]), "Hello", "Bonjour")
+
+    assert [entry.user_id for entry in added] == ["ada", None]
+    assert added[0].agent_config_key != added[1].agent_config_key
+    assert added[0].embedding_model == "text-embedding-3-small:1536"
+    assert 50 < (added[0].expires_at - datetime.now(timezone.utc)).total_seconds() <= 60
+
+
+def test_a_miss_followed_by_set_embeds_the_prompt_once():
+    cache, _, _ = make_cache()
+
+    assert cache.get(make_agent(), "What is  the capital of France?") is None
+    cache.set(make_agent(), "What is the capital of France?", "Paris")
+
+    assert cache.embedder.calls == 1
+
+
+def test_database_errors_are_misses():
+    def session_factory():
+        raise OperationalError("SELECT", {}, Exception("connection refused"))
+
+    cache = SemanticResponseCache(session_factory=session_factory, embedder=FakeEmbedder())
+
+    assert cache.get(make_agent(), "Hello") is None
+    cache.set(make_agent(), "Hello", "Hi there")
+    cache.invalidate()
+
+
+def test_invalidate_deletes_the_answers_of_an_agent():
+    cache, statements, _ = make_cache()
+
+    cache.invalidate(agent_id="example-agent")
+
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("DELETE FROM public.semantic_response_cache WHERE")
+
+
+def test_cached_answers_are_added_to_the_session():
+    agent = make_agent()
+    match = SemanticCacheMatch(content="Paris", prompt="What is the capital of France?", similarity=0.97)
+
+    response = record_cached_answer(agent, "Capital of France?", match)
+
+    assert response.content == "Paris"
+    assert response.metrics == {"cached": True, "similarity": 0.97}
+    assert [(message["role"], message["content"]) for message in agent.memory.get_messages()] == [
+        ("user", "Capital of France?"),
+        ("assistant", "Paris"),
+    ]
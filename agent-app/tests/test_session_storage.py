@@ -0,0 +1,148 @@
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any, List, cast
+
+from phi.agent.session import AgentSession
+from phi.storage.agent.postgres import PgAgentStorage
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import scoped_session
+
+from agents.session_storage import PaginatedPgAgentStorage
+
+
+class FakeSession:
+    def __init__(self, rows, statements):
+        self.rows = rows
+        self.statements = statements
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+        offset, limit = stmt._offset, stmt._limit
+        return SimpleNamespace(fetchall=lambda: self.rows[offset : offset + limit])
+
+
+def make_storage(count, cache_ttl=10.0, cache_max_entries=None):
+    rows = [
+        SimpleNamespace(session_id=f"session-{i}", name=None, created_at=1000 - i, updated_at=None)
+        for i in range(count)
+    ]
+    statements: List[Any] = []
+    # The engine only connects when used, and every query goes through the fake session
+    storage = PaginatedPgAgentStorage(
+        table_name="agent_sessions",
+        db_engine=create_engine("postgresql+psycopg://user@localhost/db"),
+        cache_ttl=cache_ttl,
+        cache_max_entries=cache_max_entries,
+    )
+    storage._index_created = True
+    storage.Session = cast(scoped_session, lambda: FakeSession(rows, statements))
+    return storage, statements
+
+
+def test_sessions_are_listed_a_page_at_a_time():
+    storage, statements = make_storage(count=5)
+
+    first = storage.list_sessions(user_id="ada", agent_id="example-agent", limit=2)
+    last = storage.list_sessions(user_id="ada", agent_id="example-agent", limit=2, offset=4)
+
+    assert [session.session_id for session in first.sessions] == ["session-0", "session-1"]
+    assert first.has_more
+    assert [session.session_id for session in last.sessions] == ["session-4"]
+    assert not last.has_more
+
+    sql = str(statements[0].compile(dialect=postgresql.dialect()))
+    assert "memory" not in sql
+    assert "WHERE ai.agent_sessions.user_id = " in sql
+    assert "ORDER BY coalesce(ai.agent_sessions.updated_at, ai.agent_sessions.created_at) DESC" in sql
+
+
+def test_search_matches_session_id_and_name():
+    storage, statements = make_storage(count=1)
+
+    storage.list_sessions(user_id="ada", search=" pricing ")
+
+    sql = statements[0].compile(dialect=postgresql.dialect())
+    assert "ILIKE" in str(sql)
+    assert "%pricing%" in sql.params.values()
+
+
+def test_pages_are_cached_until_a_session_is_saved(monkeypatch):
+    storage, statements = make_storage(count=3)
+    monkeypatch.setattr(PgAgentStorage, "upsert", lambda self, session, create_and_retry=True: session)
+
+    storage.list_sessions(user_id="ada")
+    storage.list_sessions(user_id="ada")
+    storage.list_sessions(user_id="grace")
+    assert len(statements) == 2
+
+    storage.upsert(AgentSession(session_id="new", user_id="ada"))
+    storage.list_sessions(user_id="ada")
+    storage.list_sessions(user_id="grace")
+    assert len(statements) == 3
+
+
+def test_expired_pages_are_listed_again():
+    storage, statements = make_storage(count=3, cache_ttl=0)
+
+    storage.list_sessions(user_id="ada")
+    storage.list_sessions(user_id="ada")
+
+    assert len(statements) == 2
+    assert len(storage._cache) == 0
+
+
+def test_the_cache_drops_expired_and_oldest_pages(monkeypatch):
+    storage, statements = make_storage(count=3, cache_max_entries=2)
+
+    for search in ["a", "b", "c"]:
+        storage.list_sessions(user_id="ada", search=search)
+    assert [key[2] for key in storage._cache] == ["b", "c"]
+
+    # Once "b" and "c" expire, caching another page drops them
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 60)
+    storage.list_sessions(user_id="ada", search="d")
+    assert [key[2] for key in storage._cache] == ["d"]
+
+
+class FakeAsyncEngine:
+    def __init__(self, rows, statements):
+        self.session = FakeSession(rows, statements)
+
+    def connect(self):
+        engine = self
+
+        class Connection:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *args):
+                return False
+
+            async def execute(self, stmt):
+                return engine.session.execute(stmt)
+
+        return Connection()
+
+
+def test_sessions_are_listed_through_the_async_engine():
+    storage, statements = make_storage(count=3)
+    rows = [SimpleNamespace(session_id="async-session", name="Pricing", created_at=1, updated_at=2)]
+    storage.async_db_engine = FakeAsyncEngine(rows, statements)
+
+    page = asyncio.run(storage.alist_sessions(user_id="ada", limit=2))
+
+    assert [(session.session_id, session.name, session.last_active_at) for session in page.sessions] == [
+        ("async-session", "Pricing", 2)
+    ]
+    # Pages listed either way share the cache
+    assert storage.list_sessions(user_id="ada", limit=2) is page
+    assert len(statements) == 1
@@ -0,0 +1,99 @@
+import asyncio
+
+from utils.sse import HEARTBEAT, format_event, stream_events
+
+
+async def collect(events, limit=None):
+    collected = []
+    async for event in events:
+        collected.append(event)
+        if limit is not None and len(collected) == limit:
+            break
+    return collected
+
+
+def test_format_event():
+    assert format_event("delta", '{"content": "Hi"}', 3) == 'id: 3\nevent: delta\ndata: {"content": "Hi"}\n\n'
+
+
+def test_items_are_streamed_as_deltas_followed_by_done():
+    async def source():
+        for item in ["a", "b"]:
+            yield item
+
+    events = asyncio.run(collect(stream_events(source(), serialize=str)))
+
+    assert events == [format_event("delta", "a", 1), format_event("delta", "b", 2), format_event("done", "{}", 3)]
+
+
+def test_errors_end_the_stream_with_an_error_event():
+    async def source():
+        yield "a"
+        raise RuntimeError("model unavailable")
+
+    events = asyncio.run(collect(stream_events(source(), serialize=str)))
+
+    assert events[-1] == format_event("error", '{"detail": "model unavailable"}', 2)
+
+
+def test_heartbeats_are_sent_while_waiting():
+    async def source():
+        await asyncio.sleep(0.05)
+        yield "a"
+
+    events = asyncio.run(collect(stream_events(source(), serialize=str, heartbeat_interval=0.01)))
+
+    assert events[0] == HEARTBEAT
+    assert format_event("delta", "a", 1) in events
+
+
+def test_a_slow_client_pauses_the_source():
+    produced = []
+
+    async def source():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    async def run():
+        events = stream_events(source(), serialize=str, buffer_size=2)
+        await collect(events, limit=1)
+        await asyncio.sleep(0.05)
+        # One item sent, two buffered and one waiting for buffer space
+        assert len(produced) <= 4
+        await events.aclose()
+
+    asyncio.run(run())
+
+
+def test_closing_the_stream_closes_the_source():
+    closed = asyncio.Event()
+
+    async def source():
+        try:
+            yield "a"
+            await asyncio.sleep(10)
+            yield "b"
+        finally:
+            closed.set()
+
+    async def run():
+        events = stream_events(source(), serialize=str)
+        await collect(events, limit=1)
+        # As when the client disconnects and the response is cancelled
+        await events.aclose()
+        await asyncio.wait_for(closed.wait(), timeout=1)
+
+    asyncio.run(run())
+
+
+def test_items_are_serialized_before_the_source_changes_them():
+    async def source():
+        item = {"content": "Hello"}
+        yield item
+        item["content"] = " there"
+        yield item
+
+    events = asyncio.run(collect(stream_events(source(), serialize=lambda item: item["content"])))
+
+    assert events[:2] == [format_event("delta", "Hello", 1), format_event("delta", " there", 2)]
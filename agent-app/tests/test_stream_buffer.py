@@ -0,0 +1,26 @@
+from typing import List
+
+from utils.stream_buffer import StreamBuffer
+
+
+def test_deltas_are_coalesced_between_flushes():
+    flushed: List[str] = []
+    buffer = StreamBuffer(flushed.append, min_interval=60, min_chars=10)
+
+    for delta in ["a", "b", "c", "defghijklm", "n"]:
+        buffer.append(delta)
+
+    # The first delta flushes immediately, the next flush waits for 10 new characters
+    assert flushed == ["a", "abcdefghijklm"]
+    assert buffer.close() == "abcdefghijklmn"
+    assert flushed[-1] == "abcdefghijklmn"
+
+
+def test_close_without_pending_text_does_not_flush():
+    flushed: List[str] = []
+    buffer = StreamBuffer(flushed.append, min_interval=0)
+
+    buffer.append("hello")
+    buffer.close()
+
+    assert flushed == ["hello"]
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from threading import Event
+from typing import List
+
+import pytest
+
+from utils.thread_stream import iterate_in_thread
+
+
+def test_items_are_read_off_the_event_loop():
+    loop_thread = threading.get_ident()
+    threads = []
+
+    def blocking_run():
+        for chunk in ["a", "b"]:
+            threads.append(threading.get_ident())
+            # Blocks the thread it runs in, like a storage write or a sync tool
+            time.sleep(0.05)
+            yield chunk
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        chunks = [chunk async for chunk in iterate_in_thread(blocking_run)]
+        ticker.cancel()
+        return chunks, ticks
+
+    chunks, ticks = asyncio.run(main())
+
+    assert chunks == ["a", "b"]
+    assert loop_thread not in threads
+    # The loop kept running while the chunks were produced
+    assert ticks >= 5
+
+
+def test_errors_are_raised_in_the_reader():
+    def failing_run():
+        yield "a"
+        raise RuntimeError("model unavailable")
+
+    async def main():
+        chunks = []
+        with pytest.raises(RuntimeError, match="model unavailable"):
+            async for chunk in iterate_in_thread(failing_run):
+                chunks.append(chunk)
+        return chunks
+
+    assert asyncio.run(main()) == ["a"]
+
+
+def test_closing_early_stops_the_run():
+    closed = Event()
+    produced: List[int] = []
+
+    def endless_run():
+        try:
+            while True:
+                produced.append(len(produced))
+                time.sleep(0.01)
+                yield produced[-1]
+        finally:
+            closed.set()
+
+    async def main():
+        stream = iterate_in_thread(endless_run)
+        assert await stream.__anext__() == 0
+        await stream.aclose()
+
+    asyncio.run(main())
+
+    assert closed.wait(timeout=5)
+    assert len(produced) < 10
@@ -0,0 +1,152 @@
+import asyncio
+import time
+
+import httpx
+
+from agents.website_reader import ConcurrentWebsiteReader, canonicalize_url, get_crawl_domain, is_in_domain
+
+ROBOTS = "User-agent: *\nDisallow: /private\n"
+
+
+def make_site(pages, robots=ROBOTS, latency=0.0):
+    requests = []
+    in_flight = {"now": 0, "max": 0}
+
+    async def handler(request):
+        url = str(request.url)
+        requests.append(url)
+        if request.url.path == "/robots.txt":
+            return httpx.Response(200, text=robots)
+        in_flight["now"] += 1
+        in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        await asyncio.sleep(latency)
+        in_flight["now"] -= 1
+        if request.url.path not in pages:
+            return httpx.Response(404)
+        return httpx.Response(200, html=pages[request.url.path])
+
+    return httpx.MockTransport(handler), requests, in_flight
+
+
+def page(content, links=(), head=""):
+    anchors = "".join(f'<a href="{link}">link</a>' for link in links)
+    return f"<html><head>{head}</head><body><main>{content}</main>{anchors}</body></html>"
+
+
+def test_canonicalize_url():
+    assert canonicalize_url("HTTPS://Docs.Example.com:443/guide/?b=2&a=1&utm_source=x#intro") == (
+        "https://docs.example.com/guide?a=1&b=2"
+    )
+    assert canonicalize_url("https://example.com") == "https://example.com/"
+
+
+def test_crawl_stays_on_the_start_host_and_its_subdomains():
+    assert get_crawl_domain("https://www.example.com/") == "example.com"
+    assert is_in_domain("https://docs.example.com/guide", "example.com")
+    assert is_in_domain("https://example.com/", "example.com")
+    assert not is_in_domain("https://evilexample.com/", "example.com")
+
+    # The last two labels of a .co.uk site are a public suffix, not the site
+    assert get_crawl_domain("https://shop.example.co.uk/") == "shop.example.co.uk"
+    assert not is_in_domain("https://unrelated.co.uk/", get_crawl_domain("https://example.co.uk/"))
+
+
+def test_links_to_lookalike_and_sibling_domains_are_not_crawled():
+    pages = {
+        "/": page("Home", ["https://evilexample.com/", "https://other.co.uk/", "/about"]),
+        "/about": page("About"),
+    }
+    transport, requests, _ = make_site(pages)
+
+    documents = ConcurrentWebsiteReader(transport=transport, delay=0).read("https://example.co.uk/")
+
+    assert sorted(document.content for document in documents) == ["About", "Home"]
+    assert all(url.startswith("https://example.co.uk/") for url in requests)
+
+
+def test_pages_are_crawled_once_and_robots_are_respected():
+    pages = {
+        "/": page("Home", ["/guide", "/guide/", "/guide#install", "/guide?utm_source=nav", "/private/keys"]),
+        "/guide": page("Guide", ["/", "/api", "https://other.org/page"]),
+        "/api": page("Api", ["/guide"]),
+        "/private/keys": page("Secret"),
+    }
+    transport, requests, _ = make_site(pages)
+    reader = ConcurrentWebsiteReader(transport=transport, delay=0)
+
+    documents = reader.read("https://example.com/")
+
+    assert sorted(document.content for document in documents) == ["Api", "Guide", "Home"]
+    assert {document.meta_data["url"] for document in documents} == {
+        "https://example.com/",
+        "https://example.com/guide",
+        "https://example.com/api",
+    }
+    page_requests = [url for url in requests if not url.endswith("/robots.txt")]
+    assert sorted(page_requests) == sorted(
+        ["https://example.com/", "https://example.com/guide", "https://example.com/api"]
+    )
+    assert requests.count("https://example.com/robots.txt") == 1
+
+
+def test_pages_with_a_crawled_canonical_url_are_dropped():
+    pages = {
+        "/": page("Home", ["/print"]),
+        "/print": page("Home again", head='<link rel="canonical" href="https://example.com/">'),
+    }
+    transport, _, _ = make_site(pages)
+
+    documents = ConcurrentWebsiteReader(transport=transport, delay=0).read("https://example.com/")
+
+    assert [document.content for document in documents] == ["Home"]
+
+
+def test_requests_to_a_host_are_limited():
+    links = [f"/page-{i}" for i in range(12)]
+    pages = {"/": page("Home", links), **{link: page(link) for link in links}}
+    transport, _, in_flight = make_site(pages, latency=0.02)
+    reader = ConcurrentWebsiteReader(transport=transport, delay=0, max_connections=8, host_concurrency=3)
+
+    documents = reader.read("https://example.com/")
+
+    assert len(documents) == 13
+    assert in_flight["max"] == 3
+
+
+def test_crawl_stops_at_max_pages():
+    links = [f"/page-{i}" for i in range(10)]
+    pages = {"/": page("Home", links), **{link: page(link) for link in links}}
+    transport, requests, _ = make_site(pages)
+
+    documents = ConcurrentWebsiteReader(transport=transport, delay=0, max_pages=4).read(
+        "https://example.com/"
+    )
+
+    assert len(documents) == 4
+    assert len([url for url in requests if not url.endswith("/robots.txt")]) == 4
+
+
+def test_documents_are_yielded_while_the_crawl_runs():
+    links = [f"/page-{i}" for i in range(5)]
+    pages = {"/": page("Home", links), **{link: page(link) for link in links}}
+    transport, requests, _ = make_site(pages)
+    reader = ConcurrentWebsiteReader(transport=transport, delay=0, max_connections=1)
+
+    documents = reader.iter_documents("https://example.com/")
+    first = next(documents)
+    assert first.content == "Home"
+    assert len(requests) < 7
+    documents.close()
+
+
+def test_requests_to_a_host_are_spaced_by_the_delay():
+    links = [f"/page-{i}" for i in range(3)]
+    pages = {"/": page("Home", links), **{link: page(link) for link in links}}
+    transport, _, _ = make_site(pages)
+    reader = ConcurrentWebsiteReader(transport=transport, delay=0.05)
+
+    start = time.monotonic()
+    documents = reader.read("https://example.com/")
+
+    assert len(documents) == 4
+    assert time.monotonic() - start >= 0.15
@@ -0,0 +1,73 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+# Number of messages rendered initially, and added each time older messages are requested
+HISTORY_PAGE_SIZE = 20
+# Shown in a session without messages, it is not an answer of the agent
+GREETING_MESSAGE: Dict[str, Any] = {"role": "assistant", "content": "Ask me anything..."}
+
+
+def find_image_url(messages: List[Dict[str, Any]]) -> Optional[str]:
+    """Return the first image sent in a user message, if any."""
+
+    for message in messages:
+        if message.get("role") == "user" and isinstance(message.get("content"), list):
+            for item in message["content"]:
+                if item.get("type") == "image_url":
+                    return item["image_url"]["url"]
+    return None
+
+
+@dataclass
+class ChatHistory:
+    """The chat messages of one agent session, kept in Streamlit session state across reruns.
+
+    The history is loaded from the agent once per session and new messages are appended as they
+    are sent, so a rerun never reads the session from the database again. Only the latest
+    `visible_count` messages are rendered; older ones are shown a page at a time on request,
+    which keeps the cost of a rerun constant however long the conversation gets.
+    """
+
+    session_id: Optional[str]
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+    visible_count: int = HISTORY_PAGE_SIZE
+    image_url: Optional[str] = None
+
+    @classmethod
+    def from_agent_messages(
+        cls,
+        session_id: Optional[str],
+        agent_messages: List[Dict[str, Any]],
+        page_size: int = HISTORY_PAGE_SIZE,
+    ) -> "ChatHistory":
+        # System and tool messages are never displayed, so drop them once instead of on every rerun
+        messages = [message for message in agent_messages if message.get("role") not in ("system", "tool")]
+        if not messages:
+            messages = [dict(GREETING_MESSAGE)]
+        return cls(
+            session_id=session_id,
+            messages=messages,
+            visible_count=page_size,
+            image_url=find_image_url(messages),
+        )
+
+    def append(self, message: Dict[str, Any]) -> None:
+        self.messages.append(message)
+
+    @property
+    def has_answers(self) -> bool:
+        """Whether the agent has answered in this session, not counting the greeting."""
+
+        return any(
+            message.get("role") == "assistant" and message != GREETING_MESSAGE for message in self.messages
+        )
+
+    @property
+    def hidden_count(self) -> int:
+        return max(0, len(self.messages) - self.visible_count)
+
+    def visible_messages(self) -> List[Dict[str, Any]]:
+        return self.messages[self.hidden_count :]
+
+    def show_older(self, page_size: int = HISTORY_PAGE_SIZE) -> None:
+        self.visible_count += page_size
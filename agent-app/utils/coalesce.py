@@ -0,0 +1,114 @@
+import asyncio
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+
+class _SharedStream:
+    """One source read by a single task, with every item kept so late subscribers can replay it."""
+
+    def __init__(self) -> None:
+        self.items: List[str] = []
+        self.done = False
+        self.error: Optional[Exception] = None
+        self.subscribers = 0
+        self.changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+
+class StreamCoalescer:
+    """Shares one in-flight stream between concurrent requests with the same key.
+
+    The first request for a key starts the source, later requests for the same key attach to
+    it while it is still running and receive every item from the start, so N identical
+    requests cost a single upstream call. Items are serialized once, as they are read, because
+    sources may reuse and change the item they yield. A key is forgotten as soon as its stream
+    ends, so coalescing never serves a finished result; the source is cancelled when the last
+    subscriber leaves.
+    """
+
+    def __init__(self) -> None:
+        self._streams: Dict[Hashable, _SharedStream] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._streams)
+
+    def subscribe(
+        self,
+        key: Hashable,
+        start: Callable[[], Awaitable[AsyncIterator[Any]]],
+        serialize: Callable[[Any], str],
+    ) -> AsyncGenerator[str, None]:
+        """Return the serialized items of the stream for `key`, starting it if it is not running.
+
+        The request joins the stream when the returned generator is first read, and leaves it
+        when the generator is closed.
+
+        Args:
+            key (Hashable): Identifies requests that produce the same output.
+            start (Callable[[], Awaitable[AsyncIterator[Any]]]): Starts the source, only called
+                by the first request for `key`.
+            serialize (Callable[[Any], str]): Turns an item into the string sent to subscribers.
+        """
+        return self._follow(key, start, serialize)
+
+    async def _read(
+        self,
+        key: Hashable,
+        stream: _SharedStream,
+        start: Callable[[], Awaitable[AsyncIterator[Any]]],
+        serialize: Callable[[Any], str],
+    ) -> None:
+        source: Optional[AsyncIterator[Any]] = None
+        try:
+            source = await start()
+            async for item in source:
+                async with stream.changed:
+                    stream.items.append(serialize(item))
+                    stream.changed.notify_all()
+        except Exception as e:
+            stream.error = e
+        finally:
+            self._forget(key, stream)
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            stream.done = True
+            async with stream.changed:
+                stream.changed.notify_all()
+
+    async def _follow(
+        self,
+        key: Hashable,
+        start: Callable[[], Awaitable[AsyncIterator[Any]]],
+        serialize: Callable[[Any], str],
+    ) -> AsyncGenerator[str, None]:
+        # Subscribes on the first read, so a generator that is never iterated holds no run open
+        stream = self._streams.get(key)
+        if stream is None:
+            stream = _SharedStream()
+            self._streams[key] = stream
+            stream.task = asyncio.create_task(self._read(key, stream, start, serialize))
+        stream.subscribers += 1
+        sent = 0
+        try:
+            while True:
+                async with stream.changed:
+                    await stream.changed.wait_for(lambda: len(stream.items) > sent or stream.done)
+                    items = stream.items[sent:]
+                for item in items:
+                    yield item
+                sent += len(items)
+                if stream.done and sent == len(stream.items):
+                    if stream.error is not None:
+                        raise stream.error
+                    return
+        finally:
+            stream.subscribers -= 1
+            if stream.subscribers == 0 and not stream.done and stream.task is not None:
+                # Nobody is listening anymore, stop the upstream call
+                self._forget(key, stream)
+                stream.task.cancel()
+
+    def _forget(self, key: Hashable, stream: _SharedStream) -> None:
+        if self._streams.get(key) is stream:
+            del self._streams[key]
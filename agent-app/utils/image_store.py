@@ -0,0 +1,121 @@
+import base64
+from functools import lru_cache
+from hashlib import sha256
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Sequence
+
+from PIL import Image, ImageOps
+
+# Prefix of the references stored in chat history instead of inline base64 images
+IMAGE_REF_PREFIX = "image://"
+
+
+def is_image_ref(url: str) -> bool:
+    return url.startswith(IMAGE_REF_PREFIX)
+
+
+@lru_cache(maxsize=32)
+def _read_data_url(path: str) -> str:
+    encoding = base64.b64encode(Path(path).read_bytes()).decode("utf-8")
+    return f"data:image/jpeg;base64,{encoding}"
+
+
+class ImageStore:
+    """Prepares uploaded images for the model and stores them by content hash.
+
+    Images are downscaled to the largest size the model actually looks at, re-encoded as JPEG
+    at the highest quality that fits `target_bytes`, and saved under the SHA-256 of the upload,
+    so the same upload is only processed once. Chat history holds the short reference returned
+    by `ingest`, which is turned back into a data URL only when a request is sent to the model.
+
+    Args:
+        directory (str): Where processed images are stored.
+        max_side (int): Longest side after downscaling.
+        max_short_side (int): Shortest side after downscaling.
+        target_bytes (int): Preferred maximum size of the encoded image.
+        qualities (Sequence[int]): JPEG qualities to try, best first.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_side: int = 2048,
+        max_short_side: int = 768,
+        target_bytes: int = 300_000,
+        qualities: Sequence[int] = (85, 75, 65, 50),
+    ):
+        self.directory = Path(directory)
+        self.max_side = max_side
+        self.max_short_side = max_short_side
+        self.target_bytes = target_bytes
+        self.qualities = qualities
+
+    def get_path(self, ref: str) -> Path:
+        return self.directory / f"{ref[len(IMAGE_REF_PREFIX) :]}.jpg"
+
+    def ingest(self, data: bytes) -> str:
+        """Process an uploaded image, unless it was seen before, and return its reference."""
+
+        ref = f"{IMAGE_REF_PREFIX}{sha256(data).hexdigest()}"
+        path = self.get_path(ref)
+        if not path.exists():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(self.prepare(data))
+            tmp_path.replace(path)
+        return ref
+
+    def prepare(self, data: bytes) -> bytes:
+        """Return the image downscaled and encoded as JPEG."""
+
+        upload = Image.open(BytesIO(data))
+        # Small JPEGs are sent as they are, re-encoding would only lose quality
+        if (
+            upload.format == "JPEG"
+            and len(data) <= self.target_bytes
+            and max(upload.size) <= self.max_side
+            and min(upload.size) <= self.max_short_side
+        ):
+            return data
+
+        image: Image.Image = ImageOps.exif_transpose(upload) or upload
+        scale = min(1.0, self.max_side / max(image.size), self.max_short_side / min(image.size))
+        if scale < 1:
+            size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+            image = image.resize(size, Image.Resampling.LANCZOS)
+        if image.mode != "RGB":
+            # JPEG has no alpha channel, put transparent images on a white background
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            rgba = image.convert("RGBA")
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            image = background
+
+        encoded = b""
+        for quality in self.qualities:
+            buffer = BytesIO()
+            image.save(buffer, format="JPEG", quality=quality, optimize=True)
+            encoded = buffer.getvalue()
+            if len(encoded) <= self.target_bytes:
+                break
+        return encoded
+
+    def get_data_url(self, ref: str) -> Optional[str]:
+        """Return the data URL for a reference, or None if the image is no longer stored."""
+
+        path = self.get_path(ref)
+        if not path.exists():
+            return None
+        return _read_data_url(str(path))
+
+    def get_display_source(self, url: str) -> Optional[str]:
+        """Return something `st.image` can show for an image URL or reference."""
+
+        if not is_image_ref(url):
+            return url
+        path = self.get_path(url)
+        return str(path) if path.exists() else None
+
+
+# Images uploaded in the chat app
+image_store = ImageStore(directory="tmp/images")
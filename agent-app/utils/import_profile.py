@@ -0,0 +1,125 @@
+"""Report where the time to import a module goes.
+
+Usage:
+    python -m utils.import_profile api.main
+    python -m utils.import_profile api.main --top 30 --agents
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    # Microseconds spent in the module itself, and including the modules it imported
+    self_us: int
+    cumulative_us: int
+    # Nesting depth, 0 for the module that was imported
+    depth: int
+
+
+@dataclass
+class ImportProfile:
+    module: str
+    # Seconds from starting the interpreter to the end of the import, as seen by the caller
+    wall_seconds: float
+    timings: List[ImportTiming]
+
+    @property
+    def import_seconds(self) -> float:
+        return sum(timing.cumulative_us for timing in self.timings if timing.depth == 0) / 1e6
+
+
+def parse_importtime(output: str) -> List[ImportTiming]:
+    """Parse the lines written by `python -X importtime`."""
+
+    timings: List[ImportTiming] = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        timings.append(
+            ImportTiming(
+                module=name.strip(), self_us=int(self_us), cumulative_us=int(cumulative_us), depth=depth
+            )
+        )
+    return timings
+
+
+def profile_import(module: str) -> ImportProfile:
+    """Import `module` in a new interpreter with `-X importtime` and return the timings."""
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    wall_seconds = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not import {module}:\n{result.stderr[-2000:]}")
+    return ImportProfile(module=module, wall_seconds=wall_seconds, timings=parse_importtime(result.stderr))
+
+
+def format_report(profile: ImportProfile, top: int = 20) -> str:
+    lines = [
+        f"Import of {profile.module}: {profile.import_seconds:.2f}s importing, "
+        f"{profile.wall_seconds:.2f}s including interpreter start, {len(profile.timings)} modules",
+        "",
+        f"Top {top} top-level packages, by their slowest module including what it imports:",
+    ]
+    # One line per top level package, its other modules are mostly included in the slowest one
+    packages: Dict[str, ImportTiming] = {}
+    for timing in profile.timings:
+        package = timing.module.split(".")[0]
+        if package not in packages or timing.cumulative_us > packages[package].cumulative_us:
+            packages[package] = timing
+    for timing in sorted(packages.values(), key=lambda t: t.cumulative_us, reverse=True)[:top]:
+        lines.append(f"  {timing.cumulative_us / 1e3:9.1f} ms  {timing.module}")
+    lines += ["", f"Top {top} modules by self time:"]
+    for timing in sorted(profile.timings, key=lambda t: t.self_us, reverse=True)[:top]:
+        lines.append(f"  {timing.self_us / 1e3:9.1f} ms  {timing.module}")
+    return "\n".join(lines)
+
+
+def format_agent_build_report() -> str:
+    """Time importing and building each registered agent, the work the Api now does on first use."""
+
+    from agents.registry import agent_registry
+
+    lines = ["Agents, built on first use:"]
+    for agent_id in agent_registry.agent_ids:
+        start = time.perf_counter()
+        agent_registry.get_factory(agent_id)
+        imported_at = time.perf_counter()
+        agent_registry.create_agent(agent_id)
+        built_at = time.perf_counter()
+        lines.append(
+            f"  {agent_id}: {imported_at - start:.2f}s importing, {built_at - imported_at:.2f}s building"
+        )
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report where the time to import a module goes.")
+    parser.add_argument(
+        "module", nargs="?", default="api.main", help="Module to import, defaults to api.main"
+    )
+    parser.add_argument("--top", type=int, default=20, help="Packages and modules listed")
+    parser.add_argument("--agents", action="store_true", help="Also time building each registered agent")
+    args = parser.parse_args()
+
+    print(format_report(profile_import(args.module), top=args.top))
+    if args.agents:
+        print()
+        print(format_agent_build_report())
+
+
+if __name__ == "__main__":
+    main()
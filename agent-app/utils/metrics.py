@@ -0,0 +1,184 @@
+import math
+from bisect import bisect_left
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+# Seconds, suits HTTP requests and single model or tool calls
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """A named metric with one value per combination of label values.
+
+    Args:
+        name (str): Metric name, for example `http_requests_total`.
+        description (str): Help text shown with the metric.
+        label_names (Sequence[str]): Labels every sample is recorded with.
+    """
+
+    type_name = "untyped"
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str, label_names: Sequence[str] = ()):
+        super().__init__(name, description, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        lines = super().render()
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """Counts observations into buckets, so quantiles like p99 can be computed by the scraper.
+
+    Each observation only increments one bucket, cumulative counts are computed on `render`.
+
+    Args:
+        buckets (Sequence[float]): Upper bounds of the buckets, in increasing order.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Per label values: count per bucket, sum of observations
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def get_count(self, **labels: str) -> int:
+        with self._lock:
+            counts, _ = self._values.get(self._key(labels), ([0], [0.0]))
+            return sum(counts)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(key, list(counts), total[0]) for key, (counts, total) in self._values.items()]
+        lines = super().render()
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+MetricT = TypeVar("MetricT", bound=Metric)
+
+
+class MetricsRegistry:
+    """Metrics of the process, rendered in the Prometheus text exposition format.
+
+    Collectors are called on every `render`, for values that are read rather than recorded,
+    like the size of a connection pool.
+    """
+
+    def __init__(self) -> None:
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Callable[[], None]] = []
+
+    def counter(self, name: str, description: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, description, label_names))
+
+    def gauge(self, name: str, description: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, description, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        label_names: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None,
+    ) -> Histogram:
+        return self._register(Histogram(name, description, label_names, buckets or DEFAULT_BUCKETS))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+        lines: List[str] = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric: MetricT) -> MetricT:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
@@ -0,0 +1,74 @@
+import asyncio
+import json
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Optional
+
+# Comment line sent when nothing else was sent for a while, keeps proxies from closing the connection
+HEARTBEAT = ": heartbeat\n\n"
+
+
+def format_event(event: str, data: str, event_id: Optional[int] = None) -> str:
+    """Format one server-sent event. `data` must not contain newlines, JSON dumps never do."""
+
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {data}"]
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_events(
+    source: AsyncIterator[Any],
+    serialize: Callable[[Any], str],
+    buffer_size: int = 64,
+    heartbeat_interval: float = 15,
+) -> AsyncGenerator[str, None]:
+    """Stream the items of `source` as server-sent events.
+
+    `source` is read by a separate task into a buffer of at most `buffer_size` items. Once the
+    buffer is full the task waits, so a slow client pauses the source instead of growing memory.
+    When the stream stops early, because the client disconnected and the response was
+    cancelled, the task is cancelled right away, which closes `source` and whatever it reads from.
+    Each item is sent as a `delta` event, followed by a `done` event, or an `error` event if
+    `source` raised.
+
+    Args:
+        source (AsyncIterator[Any]): The items to stream.
+        serialize (Callable[[Any], str]): Turns an item into the event data, usually JSON.
+        buffer_size (int): Items buffered per stream.
+        heartbeat_interval (float): Seconds without events before a heartbeat is sent.
+    """
+    buffer: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+    end = object()
+
+    async def read_source() -> None:
+        try:
+            async for item in source:
+                # Serialized right away, sources may reuse and change the item they yield
+                await buffer.put(serialize(item))
+            await buffer.put(end)
+        except Exception as e:
+            await buffer.put(e)
+        finally:
+            # Closes the source even when cancelled while waiting for buffer space
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    reader = asyncio.create_task(read_source())
+    event_id = 0
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(buffer.get(), timeout=heartbeat_interval)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+                continue
+            event_id += 1
+            if item is end:
+                yield format_event("done", "{}", event_id)
+                return
+            if isinstance(item, Exception):
+                yield format_event("error", json.dumps({"detail": str(item)}), event_id)
+                return
+            yield format_event("delta", item, event_id)
+    finally:
+        # Not awaited, awaiting in a cancelled response would be cancelled again
+        reader.cancel()
@@ -0,0 +1,52 @@
+from time import monotonic
+from typing import Callable
+
+
+class StreamBuffer:
+    """Accumulates streamed text and flushes it on a time or size cadence.
+
+    Rendering markdown on every delta re-sends the whole growing text each time, which is
+    quadratic in the length of the response. The buffer coalesces deltas and only calls
+    `flush` once `min_interval` seconds have passed or `min_chars` new characters have
+    arrived since the last flush.
+
+    Args:
+        flush (Callable[[str], None]): Called with the full text accumulated so far.
+        min_interval (float): Minimum seconds between two flushes.
+        min_chars (int): Flush early once this many characters are waiting.
+    """
+
+    def __init__(self, flush: Callable[[str], None], min_interval: float = 0.25, min_chars: int = 512):
+        self._flush = flush
+        self.min_interval = min_interval
+        self.min_chars = min_chars
+        self._chunks: list = []
+        self._text = ""
+        self._pending_chars = 0
+        self._last_flush = 0.0
+
+    @property
+    def text(self) -> str:
+        if self._chunks:
+            self._text += "".join(self._chunks)
+            self._chunks = []
+        return self._text
+
+    def append(self, delta: str) -> None:
+        if not delta:
+            return
+        self._chunks.append(delta)
+        self._pending_chars += len(delta)
+        if self._pending_chars >= self.min_chars or monotonic() - self._last_flush >= self.min_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        self._flush(self.text)
+        self._pending_chars = 0
+        self._last_flush = monotonic()
+
+    def close(self) -> str:
+        """Flush anything still pending and return the complete text."""
+        if self._pending_chars:
+            self.flush()
+        return self.text
@@ -0,0 +1,57 @@
+import asyncio
+from threading import Event, Thread
+from typing import Any, AsyncGenerator, Callable, Iterator
+
+
+async def iterate_in_thread(start: Callable[[], Iterator[Any]]) -> AsyncGenerator[Any, None]:
+    """Yield the items of a blocking iterator, read in a thread of its own.
+
+    `start` is called in the thread, and every blocking step of the iterator, like storage
+    reads and writes, sync tools and the model call, runs there, so the event loop is never
+    held. Items are handed over through an `asyncio.Queue`. When this generator is closed
+    early, a cancel flag is set and the thread closes the iterator after its next item, which
+    stops the run and the model call behind it.
+
+    Args:
+        start (Callable[[], Iterator[Any]]): Returns the iterator, like `agent.run(message, stream=True)`.
+    """
+    loop = asyncio.get_running_loop()
+    # Unbounded, a run's items are small and the run keeps all of them anyway
+    items: asyncio.Queue = asyncio.Queue()
+    cancelled = Event()
+    end = object()
+
+    def put(item: Any) -> None:
+        try:
+            loop.call_soon_threadsafe(items.put_nowait, item)
+        except RuntimeError:
+            # The loop was closed, nobody is reading anymore
+            cancelled.set()
+
+    def read() -> None:
+        try:
+            iterator = start()
+            try:
+                for item in iterator:
+                    put(item)
+                    if cancelled.is_set():
+                        break
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+            put(end)
+        except Exception as e:
+            put(e)
+
+    Thread(target=read, daemon=True).start()
+    try:
+        while True:
+            item = await items.get()
+            if item is end:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        cancelled.set()
@@ -1,92 +1,150 @@
+from threading import Lock
+from typing import Callable, Iterator, List, Optional
+
 from phi.agent import Agent
 from phi.model.openai import OpenAIChat
-from phi.storage.agent.sqlite import SqlAgentStorage
-from phi.tools.googlesearch import GoogleSearch
-from phi.tools.yfinance import YFinanceTools
 from phi.playground import Playground, serve_playground_app
 
 
+class LazyAgents(list):
+    """Agents built from their factories the first time the playground reads the list.
+
+    Toolkits import their dependencies (googlesearch, yfinance) when created, so building the
+    agents on the first request keeps them out of server start and `--reload` cycles. Same as
+    `agents.registry.LazyAgentList` in agent-app, which this script cannot import.
+    """
+
+    def __init__(self, factories: List[Callable[[], Agent]]):
+        super().__init__()
+        self.factories: Optional[List[Callable[[], Agent]]] = factories
+        self._lock = Lock()
+
+    def _build(self) -> None:
+        if self.factories is None:
+            return
+        # Concurrent first requests wait for the whole list instead of reading it half built
+        with self._lock:
+            if self.factories is not None:
+                super().extend(factory() for factory in self.factories)
+                self.factories = None
+
+    def __iter__(self) -> Iterator[Agent]:
+        self._build()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        self._build()
+        return super().__len__()
+
+    def __getitem__(self, index):
+        self._build()
+        return super().__getitem__(index)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+
+def google_search():
+    from phi.tools.googlesearch import GoogleSearch
+
+    return GoogleSearch()
+
+
 # Define individual agents
-web_agent = Agent(
-    name="Web Agent",
-    role="Search the web for information",
-    model=OpenAIChat(id="gpt-4o"),
-    tools=[GoogleSearch()],
-    instructions=[
-        "Given a topic by the user, respond with 4 latest news items about that topic.",
-        "Search for 10 news items and select the top 4 unique items.",
-        "Search in English and in French.",
-    ],
-    show_tool_calls=True,
-    markdown=True,
-    debug_mode=True,
-)
-
-finance_agent = Agent(
-    name="Finance Agent",
-    role="Get financial data",
-    model=OpenAIChat(id="gpt-4o"),
-    tools=[YFinanceTools(stock_price=True, analyst_recommendations=True, company_info=True)],
-    instructions=["Use tables to display data"],
-    show_tool_calls=True,
-    markdown=True,
-)
-
-tech_market_agent = Agent(
-    name="Technology and Market Opportunity Expert",
-    role="Analyze technology trends, market dynamics, and identify value creation opportunities",
-    model=OpenAIChat(id="gpt-4o"),
-    tools=[GoogleSearch()],
-    instructions=[
-        "Analyze emerging technology trends and market dynamics",
-        "Identify potential market opportunities",
-        "Evaluate competitive landscapes",
-        "Always include data-driven insights",
-        "Always include sources"
-    ],
-    show_tool_calls=True,
-    markdown=True,
-)
-
-value_capture_agent = Agent(
-    name="Value Capture Strategist",
-    role="Develop strategies for IP protection, market positioning, and competitive advantage",
-    model=OpenAIChat(id="gpt-4o"),
-    tools=[GoogleSearch()],
-    instructions=[
-        "Focus on IP protection strategies",
-        "Develop market positioning recommendations",
-        "Identify competitive advantages",
-        "Provide actionable strategic recommendations",
-        "Always include sources"
-    ],
-    show_tool_calls=True,
-    markdown=True,
-)
-
-org_design_agent = Agent(
-    name="Organizational Design Architect",
-    role="Design optimal organizational structures and collaboration networks",
-    model=OpenAIChat(id="gpt-4o"),
-    tools=[GoogleSearch()],
-    instructions=[
-        "Design team structures and collaboration frameworks",
-        "Optimize for innovation and value delivery",
-        "Consider organizational culture and dynamics",
-        "Provide practical implementation steps",
-        "Always include sources"
-    ],
-    show_tool_calls=True,
-    markdown=True,
-)
-
-app = Playground(agents=[
-    finance_agent, 
-    web_agent, 
-    tech_market_agent, 
-    value_capture_agent, 
-    org_design_agent
-]).get_app()
+def get_web_agent() -> Agent:
+    return Agent(
+        name="Web Agent",
+        role="Search the web for information",
+        model=OpenAIChat(id="gpt-4o"),
+        tools=[google_search()],
+        instructions=[
+            "Given a topic by the user, respond with 4 latest news items about that topic.",
+            "Search for 10 news items and select the top 4 unique items.",
+            "Search in English and in French.",
+        ],
+        show_tool_calls=True,
+        markdown=True,
+        debug_mode=True,
+    )
+
+
+def get_finance_agent() -> Agent:
+    from phi.tools.yfinance import YFinanceTools
+
+    return Agent(
+        name="Finance Agent",
+        role="Get financial data",
+        model=OpenAIChat(id="gpt-4o"),
+        tools=[YFinanceTools(stock_price=True, analyst_recommendations=True, company_info=True)],
+        instructions=["Use tables to display data"],
+        show_tool_calls=True,
+        markdown=True,
+    )
+
+
+def get_tech_market_agent() -> Agent:
+    return Agent(
+        name="Technology and Market Opportunity Expert",
+        role="Analyze technology trends, market dynamics, and identify value creation opportunities",
+        model=OpenAIChat(id="gpt-4o"),
+        tools=[google_search()],
+        instructions=[
+            "Analyze emerging technology trends and market dynamics",
+            "Identify potential market opportunities",
+            "Evaluate competitive landscapes",
+            "Always include data-driven insights",
+            "Always include sources",
+        ],
+        show_tool_calls=True,
+        markdown=True,
+    )
+
+
+def get_value_capture_agent() -> Agent:
+    return Agent(
+        name="Value Capture Strategist",
+        role="Develop strategies for IP protection, market positioning, and competitive advantage",
+        model=OpenAIChat(id="gpt-4o"),
+        tools=[google_search()],
+        instructions=[
+            "Focus on IP protection strategies",
+            "Develop market positioning recommendations",
+            "Identify competitive advantages",
+            "Provide actionable strategic recommendations",
+            "Always include sources",
+        ],
+        show_tool_calls=True,
+        markdown=True,
+    )
+
+
+def get_org_design_agent() -> Agent:
+    return Agent(
+        name="Organizational Design Architect",
+        role="Design optimal organizational structures and collaboration networks",
+        model=OpenAIChat(id="gpt-4o"),
+        tools=[google_search()],
+        instructions=[
+            "Design team structures and collaboration frameworks",
+            "Optimize for innovation and value delivery",
+            "Consider organizational culture and dynamics",
+            "Provide practical implementation steps",
+            "Always include sources",
+        ],
+        show_tool_calls=True,
+        markdown=True,
+    )
+
+
+agent_factories: List[Callable[[], Agent]] = [
+    get_finance_agent,
+    get_web_agent,
+    get_tech_market_agent,
+    get_value_capture_agent,
+    get_org_design_agent,
+]
+
+app = Playground(agents=LazyAgents(agent_factories)).get_app()
 
 if __name__ == "__main__":
     serve_playground_app("playground:app", reload=True)